@@ -31,15 +31,15 @@
 from typing import List
 
 from dimples import DateTime
-from dimples import ID
+from dimples import ID, Document
 from dimples import ReliableMessage
 from dimples import Content
 
 from dimples import BaseCommandProcessor
 from dimples.common import CommonFacebook
-from dimples.utils import SharedCacheManager
 
 from ...utils import Logging
+from ...utils.cache import MemoryCacheManager
 from ...common.protocol import SearchCommand
 from ...database import Database
 from ...database.t_active import ActiveTable
@@ -88,6 +88,9 @@ ActiveTable.CACHE_EXPIRES = 8
 
 g_search_cache = None
 
+# metas of matched users are loaded in batches
+SEARCH_BATCH = 64
+
 
 async def online_users(start: int, limit: int, facebook: CommonFacebook) -> List[ID]:
     assert start >= 0, 'start position error: %d' % start
@@ -121,7 +124,8 @@ async def search_users(keywords: str, start: int, limit: int,
                        database: Database, facebook: CommonFacebook) -> List[ID]:
     global g_search_cache
     if g_search_cache is None:
-        g_search_cache = SharedCacheManager().get_pool(name='search')
+        # keywords come from anyone, keep the results bounded
+        g_search_cache = MemoryCacheManager().get_pool(name='search', max_items=4096)
     # 0. split keywords
     if keywords is None:
         kw_array = []
@@ -147,11 +151,42 @@ async def search_users(keywords: str, start: int, limit: int,
     # 2. do searching
     index = -1
     users = []
-    all_documents = await database.scan_documents()
-    for doc in all_documents:
+    candidates = _match_documents(documents=await database.scan_documents(), kw_array=kw_array)
+    for offset in range(0, len(candidates), SEARCH_BATCH):
+        batch = candidates[offset:offset + SEARCH_BATCH]
+        # 2.2. load metas for this batch in one round-trip
+        await database.get_metas_many(identifiers=batch)
+        for identifier in batch:
+            # check user meta
+            meta = await facebook.get_meta(identifier=identifier)
+            if meta is None:
+                # user meta not found, skip
+                continue
+            # 2.3. check limit
+            index += 1
+            if index < start:
+                # skip
+                continue
+            elif index >= end:
+                # mission accomplished
+                break
+            # got it
+            users.append(identifier)
+        if index >= end:
+            break
+    # 3. cache the search result
+    g_search_cache.update(key=(keywords, start, end), value=users, life_span=600, now=now)
+    return users
+
+
+def _match_documents(documents: List[Document], kw_array: List[str]) -> List[ID]:
+    """ get IDs of documents matched all keywords, without duplicated """
+    candidates = []
+    checked = set()
+    for doc in documents:
         # check duplicated
         identifier = doc.identifier
-        if identifier in users:
+        if identifier in checked:
             # already exists
             continue
         # get user info
@@ -167,26 +202,10 @@ async def search_users(keywords: str, start: int, limit: int,
             if len(kw) > 0 > info.find(kw.lower()):
                 match = False
                 break
-        if not match:
-            continue
-        # 2.2. check user meta
-        meta = await facebook.get_meta(identifier=identifier)
-        if meta is None:
-            # user meta not found, skip
-            continue
-        # 2.3. check limit
-        index += 1
-        if index < start:
-            # skip
-            continue
-        elif index >= end:
-            # mission accomplished
-            break
-        # got it
-        users.append(identifier)
-    # 3. cache the search result
-    g_search_cache.update(key=(keywords, start, end), value=users, life_span=600, now=now)
-    return users
+        if match:
+            checked.add(identifier)
+            candidates.append(identifier)
+    return candidates
 
 
 # noinspection PyUnusedLocal
@@ -36,7 +36,7 @@ from dimples.common import CommonFacebook
 from dimples.client import ClientMessagePacker as SuperPacker
 from dimples.client import ClientMessenger
 
-from ..utils.mtp import MTPUtils
+from ..utils.mtp import MTPUtils, Compressor
 
 
 class ClientPacker(SuperPacker):
@@ -46,8 +46,11 @@ class ClientPacker(SuperPacker):
 
     def __init__(self, facebook: CommonFacebook, messenger: ClientMessenger):
         super().__init__(facebook=facebook, messenger=messenger)
-        # Message Transfer Protocol
+        # Message Transfer Protocol for sending
         self.mtp_format = self.MTP_JSON
+        # compression for sending, as negotiated with the station ('compress' in handshake)
+        self.compression: Optional[str] = None
+        self.compress_dict = False
 
     @property
     def messenger(self) -> ClientMessenger:
@@ -60,25 +63,32 @@ class ClientPacker(SuperPacker):
         # attach_key_digest(msg=msg, messenger=self.messenger)
         if self.mtp_format == self.MTP_JSON:
             # JsON
-            return await super().serialize_message(msg=msg)
+            data = await super().serialize_message(msg=msg)
         else:
             # D-MTP
-            return MTPUtils.serialize_message(msg=msg)
+            data = MTPUtils.serialize_message(msg=msg)
+        algorithm = self.compression
+        if algorithm is not None and len(data) > Compressor.THRESHOLD:
+            packed = Compressor.compress(data=data, algorithm=algorithm, use_dictionary=self.compress_dict)
+            if len(packed) < len(data):
+                return packed
+        return data
 
     # Override
     async def deserialize_message(self, data: bytes) -> Optional[ReliableMessage]:
         if data is None or len(data) < 2:
             return None
+        if Compressor.is_compressed(data=data):
+            data = Compressor.decompress(data=data)
+        # JsON starts with '{', D-MTP starts with length of the first tag;
+        # the format for sending won't be changed here, it should be set
+        # explicitly as negotiated with the station ('mtp' in handshake)
         if data.startswith(b'{'):
             # JsON
-            msg = await super().deserialize_message(data=data)
+            return await super().deserialize_message(data=data)
         else:
             # D-MTP
-            msg = MTPUtils.deserialize_message(data=data)
-            if msg is not None:
-                # FIXME: just change it when first package received
-                self.mtp_format = self.MTP_DMTP
-        return msg
+            return MTPUtils.deserialize_message(data=data)
 
     # # Override
     # def encrypt_message(self, msg: InstantMessage) -> Optional[SecureMessage]:
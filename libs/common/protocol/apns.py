@@ -44,6 +44,7 @@
             "sound"    : "{URL}",
             "badge"    : 0,
             "category" : "{CATEGORY}",
+            "collapse_id" : "{ID}",   // APNs collapse-id / FCM tag (OPTIONAL)
             "alert"    : {
                 "title"    : "{TITLE}",
                 "subtitle" : "{SUBTITLE}",
@@ -131,7 +132,8 @@ class PushInfo(Dictionary):
             "content"  : "{CONTENT},  // alert.body
             "sound"    : "{URL}",
             "badge"    : 0,
-            "category" : "{CATEGORY}"
+            "category" : "{CATEGORY}",
+            "collapse_id" : "{ID}"    // notifications with same ID replace each other
         }
     """
 
@@ -181,12 +183,17 @@ class PushInfo(Dictionary):
     def category(self) -> Optional[str]:
         return self.get_str(key='category', default=None)
 
+    @property
+    def collapse_id(self) -> Optional[str]:
+        return self.get_str(key='collapse_id', default=None)
+
     #
     #   Factory methods
     #
 
     @classmethod
-    def create(cls, alert: PushAlert, sound: str = None, badge: int = 0, category: str = None):  # -> PushInfo:
+    def create(cls, alert: PushAlert, sound: str = None, badge: int = 0, category: str = None,
+               collapse_id: str = None):  # -> PushInfo:
         info = {
             'alert': alert.dictionary,
         }
@@ -196,6 +203,8 @@ class PushInfo(Dictionary):
             info['badge'] = badge
         if category is not None:
             info['category'] = category
+        if collapse_id is not None:
+            info['collapse_id'] = collapse_id
         return cls(dictionary=info)
 
     @classmethod
@@ -259,9 +268,9 @@ class PushItem(Dictionary):
 
     @classmethod
     def create(cls, receiver: ID, title: Optional[str], content: str,
-               image: str = None, sound: str = None, badge: int = 0):  # -> PushItem:
+               image: str = None, sound: str = None, badge: int = 0, collapse_id: str = None):  # -> PushItem:
         alert = PushAlert.create(title=title, body=content, image=image)
-        aps = PushInfo.create(alert=alert, sound=sound, badge=badge)
+        aps = PushInfo.create(alert=alert, sound=sound, badge=badge, collapse_id=collapse_id)
         item = {
             'receiver': str(receiver),
             'aps': aps.dictionary,
@@ -34,6 +34,8 @@ from dimples.common.dbi import *
 from .dos import *
 from .redis import *
 
+from .invalidator import CacheInvalidator
+from .snapshot import CacheSnapshot
 from .database import Database
 
 
@@ -77,9 +79,11 @@ __all__ = [
     'GroupKeysCache',
     'MessageCache',
     'StationCache',
+    'InvalidationCache',
 
     #
     #   Database
     #
+    'CacheInvalidator', 'CacheSnapshot',
     'Database',
 ]
@@ -42,7 +42,6 @@ from dimples import MetaUtils
 from dimples.utils import Config
 from dimples.database import PrivateKeyTable
 from dimples.database import CipherKeyTable
-from dimples.database import MetaTable
 from dimples.database import LoginTable
 from dimples.database import GroupTable
 from dimples.database import GroupHistoryTable
@@ -50,9 +49,13 @@ from dimples.database import GroupKeysTable
 from dimples.database import ReliableMessageTable
 from dimples.database import StationTable
 
+from ..utils import Log
+from ..utils.serializer import Serializers
+
 from .dos import DeviceInfo
 
 # from .t_ans import AddressNameTable
+from .t_meta import MetaTable
 from .t_document import DocumentTable
 from .t_device import DeviceTable
 from .t_user import UserTable
@@ -63,6 +66,8 @@ class Database(AccountDBI, MessageDBI, SessionDBI):
 
     def __init__(self, config: Config):
         super().__init__()
+        # same serializers in all processes sharing the storage & Redis
+        load_serializers(config=config)
         # Entity
         self.__private_table = PrivateKeyTable(config=config)
         self.__meta_table = MetaTable(config=config)
@@ -151,6 +156,9 @@ class Database(AccountDBI, MessageDBI, SessionDBI):
     async def get_meta(self, identifier: ID) -> Optional[Meta]:
         return await self.__meta_table.get_meta(identifier=identifier)
 
+    async def get_metas_many(self, identifiers: List[ID]) -> Dict[ID, Optional[Meta]]:
+        return await self.__meta_table.get_metas_many(identifiers=identifiers)
+
     """
         Document for Accounts
         ~~~~~~~~~~~~~~~~~~~~~
@@ -178,6 +186,9 @@ class Database(AccountDBI, MessageDBI, SessionDBI):
     async def get_documents(self, identifier: ID) -> List[Document]:
         return await self.__document_table.get_documents(identifier=identifier)
 
+    async def get_documents_many(self, identifiers: List[ID]) -> Dict[ID, List[Document]]:
+        return await self.__document_table.get_documents_many(identifiers=identifiers)
+
     async def scan_documents(self) -> List[Document]:
         return await self.__document_table.scan_documents()
 
@@ -237,6 +248,9 @@ class Database(AccountDBI, MessageDBI, SessionDBI):
     async def get_block_command(self, identifier: ID) -> BlockCommand:
         return await self.__user_table.get_block_command(identifier=identifier)
 
+    async def get_block_commands_many(self, identifiers: List[ID]) -> Dict[ID, Optional[BlockCommand]]:
+        return await self.__user_table.get_block_commands_many(identifiers=identifiers)
+
     async def is_blocked(self, receiver: ID, sender: ID, group: ID = None) -> bool:
         cmd = await self.get_block_command(identifier=receiver)
         if cmd is None:
@@ -265,6 +279,9 @@ class Database(AccountDBI, MessageDBI, SessionDBI):
     async def get_mute_command(self, identifier: ID) -> MuteCommand:
         return await self.__user_table.get_mute_command(identifier=identifier)
 
+    async def get_mute_commands_many(self, identifiers: List[ID]) -> Dict[ID, Optional[MuteCommand]]:
+        return await self.__user_table.get_mute_commands_many(identifiers=identifiers)
+
     async def is_muted(self, receiver: ID, sender: ID, group: ID = None) -> bool:
         cmd = await self.get_mute_command(identifier=receiver)
         if cmd is None:
@@ -290,12 +307,18 @@ class Database(AccountDBI, MessageDBI, SessionDBI):
     async def get_devices(self, identifier: ID) -> Optional[List[DeviceInfo]]:
         return await self.__device_table.get_devices(identifier=identifier)
 
+    async def get_devices_many(self, identifiers: List[ID]) -> Dict[ID, Optional[List[DeviceInfo]]]:
+        return await self.__device_table.get_devices_many(identifiers=identifiers)
+
     async def save_devices(self, devices: List[DeviceInfo], identifier: ID) -> bool:
         return await self.__device_table.save_devices(devices=devices, identifier=identifier)
 
     async def add_device(self, device: DeviceInfo, identifier: ID) -> bool:
         return await self.__device_table.add_device(device=device, identifier=identifier)
 
+    async def remove_device(self, token: str, identifier: ID) -> bool:
+        return await self.__device_table.remove_device(token=token, identifier=identifier)
+
     """
         Group members
         ~~~~~~~~~~~~~
@@ -452,6 +475,10 @@ class Database(AccountDBI, MessageDBI, SessionDBI):
     async def remove_socket_address(self, identifier: ID, address: Tuple[str, int]) -> Set[Tuple[str, int]]:
         return await self.__active_table.remove_socket_address(identifier=identifier, address=address)
 
+    async def update_socket_addresses(self, changes: List[Tuple[ID, Tuple[str, int], bool]]) -> int:
+        """ apply (ID, socket_address, online) in order, return count of users changed """
+        return await self.__active_table.update_socket_addresses(changes=changes)
+
     #
     #   Provider DBI
     #
@@ -497,3 +524,11 @@ class Database(AccountDBI, MessageDBI, SessionDBI):
     # Override
     async def remove_stations(self, provider: ID) -> bool:
         return await self.__station_table.remove_stations(provider=provider)
+
+
+def load_serializers(config: Config):
+    """ load serializers for local storage & Redis caches from 'config.ini' """
+    for error in Serializers.load(config=config):
+        Log.error(msg=error)
+    Log.info(msg='serializers: storage = %s, cache = %s, available: %s'
+                 % (Serializers.STORAGE.name, Serializers.CACHE.name, Serializers.available()))
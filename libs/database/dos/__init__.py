@@ -31,6 +31,8 @@
 
 from dimples.database.dos import *
 
+from .base import Storage
+
 from .ans import AddressNameStorage
 from .document import DocumentStorage
 from .device import DeviceStorage, DeviceInfo
@@ -27,7 +27,7 @@ from typing import Dict
 
 from dimples import ID, ANYONE, EVERYONE, FOUNDER
 
-from dimples.database.dos import Storage
+from .base import Storage
 
 
 class AddressNameStorage(Storage):
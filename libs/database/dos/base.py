@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2019 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+from typing import Union, Dict, List
+
+from dimples.utils import File, Log
+from dimples.database.dos import Storage as SuperStorage
+
+from ...utils.serializer import Serializers
+
+
+class Storage(SuperStorage):
+    """
+        DOS Storage
+        ~~~~~~~~~~~
+
+        Read/write JsON files with the storage serializer ('orjson' if
+        installed), bytes are converted in one step without the text layer.
+    """
+
+    @classmethod  # Override
+    async def read_json(cls, path: str) -> Union[Dict, List, None]:
+        try:
+            data = await File(path=path).read()
+            if data is None:
+                # file not found
+                return None
+            return Serializers.STORAGE.decode(data=data)
+        except Exception as error:
+            Log.error(msg='Storage >\t%s' % error)
+
+    @classmethod  # Override
+    async def write_json(cls, container: Union[Dict, List], path: str) -> bool:
+        try:
+            data = Serializers.STORAGE.encode(obj=container)
+            return await File(path=path).write(data=data)
+        except Exception as error:
+            Log.error(msg='Storage >\t%s' % error)
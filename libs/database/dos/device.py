@@ -30,34 +30,50 @@ from dimples import DateTime
 from dimples import ID
 from dimples.utils import is_before
 from dimples.database.dos.base import template_replace
-from dimples.database.dos import Storage
+
+from .base import Storage
 
 
 class DeviceInfo:
+    """
+        Device Info
+        ~~~~~~~~~~~
+
+        Fields read by the push path are normalized once when parsing,
+        the original dictionary is kept for other fields & 'to_json()'.
+    """
+
+    __slots__ = ('__info', '__token', '__topic', '__sandbox', '__platform', '__channel')
 
     def __init__(self, info: Dict[str, Any]):
         super().__init__()
         self.__info = info
+        # device token
+        token = info.get('token')
+        if token is None:
+            token = info.get('device_token')
+            if token is None:
+                device = info.get('device')
+                if isinstance(device, Dict):
+                    token = device.get('token')
+        self.__token = token
+        # push info
+        self.__topic = info.get('topic')
+        self.__sandbox = Converter.get_bool(value=info.get('sandbox'), default=None)
+        self.__platform = info.get('platform')
+        self.__channel = info.get('channel')
 
     @property
     def token(self) -> str:               # Hex encoded
-        value = self.__info.get('token')
-        if value is None:
-            value = self.__info.get('device_token')
-            if value is None:
-                device = self.__info.get('device')
-                if isinstance(device, Dict):
-                    value = device.get('token')
-        return value
+        return self.__token
 
     @property
     def topic(self) -> Optional[str]:     # 'chat.dim.sechat'
-        return self.__info.get('topic')
+        return self.__topic
 
     @property
     def sandbox(self) -> Optional[bool]:
-        value = self.__info.get('sandbox')
-        return Converter.get_bool(value=value, default=None)
+        return self.__sandbox
 
     @property
     def time(self) -> Optional[DateTime]:
@@ -70,7 +86,7 @@ class DeviceInfo:
 
     @property
     def platform(self) -> Optional[str]:  # 'iOS'
-        return self.__info.get('platform')
+        return self.__platform
 
     @property
     def system(self) -> Optional[str]:    # 'iPadOS 16.3'
@@ -78,7 +94,7 @@ class DeviceInfo:
 
     @property
     def channel(self) -> Optional[str]:   # 'Firebase'
-        return self.__info.get('channel')
+        return self.__channel
 
     def __str__(self) -> str:
         clazz = self.__class__.__name__
@@ -123,7 +139,7 @@ class DeviceInfo:
             elif isinstance(item, Dict):
                 info = item
             elif isinstance(item, str):
-                info = {'token': str}
+                info = {'token': item}
             else:
                 continue
             devices.append(info)
@@ -190,6 +206,14 @@ def insert_device(info: DeviceInfo, devices: List[DeviceInfo]) -> Optional[List[
     return devices
 
 
+def remove_device(token: str, devices: List[DeviceInfo]) -> Optional[List[DeviceInfo]]:
+    array = [item for item in devices if item.token != token]
+    if len(array) == len(devices):
+        # device token not exists
+        return None
+    return array
+
+
 def find_device(info: DeviceInfo, devices: List[DeviceInfo]) -> int:
     index = 0
     for item in devices:
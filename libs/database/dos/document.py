@@ -33,8 +33,10 @@ from dimples.database.dos.base import template_replace
 from dimples.database.dos.document import parse_document
 from dimples.database import DocumentStorage as SuperStorage
 
+from .base import Storage
 
-class DocumentStorage(SuperStorage):
+
+class DocumentStorage(Storage, SuperStorage):
 
     # compatible with v1.0
     doc_path_old = '{PUBLIC}/{ADDRESS}/profile.js'
@@ -31,8 +31,10 @@ from dimples import MuteCommand, BlockCommand
 from dimples.database.dos.base import template_replace
 from dimples.database import UserStorage as SuperStorage
 
+from .base import Storage
 
-class UserStorage(SuperStorage):
+
+class UserStorage(Storage, SuperStorage):
 
     """
         Contacts Command
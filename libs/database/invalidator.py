@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2021 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+"""
+    Cache Invalidation
+    ~~~~~~~~~~~~~~~~~~
+
+    Evict memory caches in other processes (station, archivist, announcer, ...)
+    after values saved, via Redis pub/sub
+"""
+
+import os
+import threading
+import time
+from typing import Optional, Any, Set, List
+
+from aiou.mem import CachePool
+
+from mkm.types import Converter
+from dimples import ID
+
+from ..utils import Singleton, Log, Logging, Config
+from ..utils import utf8_encode, utf8_decode
+from ..utils import json_encode, json_decode
+from ..utils.cache import BoundedCachePool, MemoryCacheManager
+
+from .redis import InvalidationCache
+
+
+@Singleton
+class CacheInvalidator(Logging):
+    """
+        Invalidation Bus
+        ~~~~~~~~~~~~~~~~
+
+        Each process subscribes the same Redis channel in a background thread;
+        when a value saved, the key is published, and the other processes
+        erase it from their memory pools, so the next reading will get the
+        new value from Redis.
+
+        While the bus is running, values in the pools using it can be cached
+        longer ('invalidation_expires'); on reconnected, these pools will be
+        cleared, because messages may be lost while disconnected.
+
+        config.ini:
+            [redis]
+            invalidation         = on      # default is on when redis enabled
+            invalidation_expires = 3600    # memory cache duration (seconds)
+    """
+
+    SECTION = 'redis'
+
+    RECONNECT_INTERVAL = 2.0  # seconds
+
+    def __init__(self):
+        super().__init__()
+        # random token to ignore messages sent by this process
+        self.__origin = os.urandom(8).hex()
+        self.__cache: Optional[InvalidationCache] = None
+        self.__thread: Optional[threading.Thread] = None
+        self.__running = False
+        self.__subscribed = False
+        # memory cache duration while bus running
+        self.__expires = 0
+        # names of pools cached longer
+        self.__pools: Set[str] = set()
+        self.__lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        """ subscribed to the bus, messages from other processes will be received """
+        return self.__running and self.__subscribed
+
+    def start(self, config: Config) -> bool:
+        options = config.get_section(section=self.SECTION)
+        if options is None:
+            options = {}
+        if not Converter.get_bool(value=options.get('invalidation'), default=True):
+            self.warning(msg='[BUS] cache invalidation disabled')
+            return False
+        elif config.redis_connector is None:
+            self.warning(msg='[BUS] redis not enabled, cache invalidation disabled')
+            return False
+        self.__expires = Converter.get_int(value=options.get('invalidation_expires'), default=0)
+        self.__cache = InvalidationCache(config=config)
+        self.__running = True
+        thr = threading.Thread(target=self.__run, daemon=True)
+        thr.start()
+        self.__thread = thr
+        self.info(msg='[BUS] cache invalidation started, expires: %d' % self.__expires)
+        return True
+
+    def stop(self):
+        self.__running = False
+        thr = self.__thread
+        if thr is not None:
+            self.__thread = None
+            thr.join(timeout=2.0)
+
+    def expires(self, cache_pool: CachePool, duration: float) -> float:
+        """ cache duration for the pool, longer while the bus is running """
+        if duration < self.__expires and self.alive and isinstance(cache_pool, BoundedCachePool):
+            name = cache_pool.name
+            if name not in self.__pools:
+                with self.__lock:
+                    self.__pools.add(name)
+            return self.__expires
+        return duration
+
+    async def invalidate(self, cache_pool: CachePool, keys: List[Any]) -> bool:
+        """ broadcast the keys saved, to evict them from other processes """
+        cache = self.__cache
+        if cache is None or not self.__running:
+            return False
+        elif not isinstance(cache_pool, BoundedCachePool):
+            # unnamed pool
+            return False
+        info = {
+            'origin': self.__origin,
+            'pool': cache_pool.name,
+            'keys': [str(key) for key in keys],
+        }
+        data = utf8_encode(string=json_encode(obj=info))
+        try:
+            return await cache.publish(data=data)
+        except Exception as error:
+            self.error(msg='[BUS] failed to publish: %s, %s' % (info, error))
+            return False
+
+    #
+    #   Background Thread
+    #
+
+    def __run(self):
+        pubsub = None
+        reconnecting = False
+        while self.__running:
+            try:
+                if pubsub is None:
+                    pubsub = self.__cache.subscribe()
+                    if pubsub is None:
+                        self.error(msg='[BUS] redis not connected, cache invalidation stopped')
+                        break
+                    self.__subscribed = True
+                    if reconnecting:
+                        count = self.__clear()
+                        self.warning(msg='[BUS] reconnected, %d item(s) cleared' % count)
+                message = pubsub.get_message(timeout=1.0)
+                if message is not None:
+                    self.__process(data=message.get('data'))
+            except Exception as error:
+                self.error(msg='[BUS] subscriber error: %s' % error)
+                self.__subscribed = False
+                reconnecting = True
+                pubsub = _close(pubsub=pubsub)
+                time.sleep(self.RECONNECT_INTERVAL)
+        self.__subscribed = False
+        _close(pubsub=pubsub)
+
+    def __process(self, data: Any):
+        if not isinstance(data, bytes):
+            return
+        info = json_decode(string=utf8_decode(data=data))
+        if not isinstance(info, dict) or info.get('origin') == self.__origin:
+            # sent by myself
+            return
+        pool = MemoryCacheManager().all_pools().get(info.get('pool'))
+        if pool is None:
+            # this process doesn't use this pool
+            return
+        for key in info.get('keys', []):
+            identifier = ID.parse(identifier=key)
+            pool.erase(key=key if identifier is None else identifier)
+
+    def __clear(self) -> int:
+        """ clear pools cached longer, invalidation messages may be lost while disconnected """
+        with self.__lock:
+            names = set(self.__pools)
+        count = 0
+        all_pools = MemoryCacheManager().all_pools()
+        for name in names:
+            pool = all_pools.get(name)
+            if pool is None:
+                continue
+            for key in pool.all_keys():
+                pool.erase(key=key)
+                count += 1
+        return count
+
+
+def _close(pubsub) -> None:
+    if pubsub is not None:
+        try:
+            pubsub.close()
+        except Exception as error:
+            Log.error(msg='[BUS] failed to close subscriber: %s' % error)
@@ -31,14 +31,20 @@
 
 from dimples.database.redis import *
 
+from .base import BatchCache, Missing, MISSING
+from .meta import MetaCache
+from .document import DocumentCache
 from .user import UserCache
+from .login import LoginCache
 from .device import DeviceCache
 from .ans import AddressNameCache
+from .bus import InvalidationCache
 
 
 __all__ = [
 
-    'RedisConnector', 'RedisCache',
+    'RedisConnector', 'RedisCache', 'BatchCache',
+    'Missing', 'MISSING',
 
     'MetaCache', 'DocumentCache',
     'LoginCache',
@@ -49,5 +55,6 @@ __all__ = [
     'UserCache',
     'DeviceCache',
     'AddressNameCache',
+    'InvalidationCache',
 
 ]
@@ -23,15 +23,20 @@
 # SOFTWARE.
 # ==============================================================================
 
-from typing import Optional, Set, Dict
+from typing import Optional, Union, Set
 
 from dimples import utf8_encode, utf8_decode
 from dimples import ID
+from dimples.utils import Config
 from dimples.database.redis import RedisCache
 
 
 class AddressNameCache(RedisCache):
 
+    def __init__(self, config: Config):
+        super().__init__(config=config)
+        self.__indexed = False  # reverse index built
+
     @property  # Override
     def db_name(self) -> Optional[str]:
         return 'dim'
@@ -44,14 +49,39 @@ class AddressNameCache(RedisCache):
         Address Name Service
         ~~~~~~~~~~~~~~~~~~~~
 
-        redis key: 'dim.ans'
+        redis key: 'dim.ans'              - name => ID
+        redis key: 'dim.ans.{ID}.names'   - set of names for ID (reverse index)
+        redis key: 'dim.ans.indexed'      - flag for reverse index built
     """
     def __cache_name(self) -> str:
         return '%s.%s' % (self.db_name, self.tbl_name)
 
-    async def save_record(self, name: str, identifier: ID):
+    def __names_cache_name(self, identifier: Union[ID, str]) -> str:
+        return '%s.%s.%s.names' % (self.db_name, self.tbl_name, identifier)
+
+    def __indexed_cache_name(self) -> str:
+        return '%s.%s.indexed' % (self.db_name, self.tbl_name)
+
+    async def save_record(self, name: str, identifier: ID) -> bool:
+        redis = self.redis
+        if redis is None:
+            return False
         value = utf8_encode(string=str(identifier))
-        return await self.hset(name=self.__cache_name(), key=name, value=value)
+        name_key = self.__cache_name()
+
+        def update(pipe):
+            # move the name from old ID to new ID
+            old = pipe.hget(name_key, name)
+            pipe.multi()
+            pipe.hset(name_key, name, value)
+            if old is not None:
+                pipe.srem(self.__names_cache_name(identifier=utf8_decode(data=old)), name)
+            if identifier is not None:
+                pipe.sadd(self.__names_cache_name(identifier=identifier), name)
+
+        # WATCH 'dim.ans', then MULTI/EXEC
+        redis.transaction(update, name_key)
+        return True
 
     async def get_record(self, name: str) -> Optional[ID]:
         value = await self.hget(name=self.__cache_name(), key=name)
@@ -59,20 +89,25 @@ class AddressNameCache(RedisCache):
             identifier = utf8_decode(data=value)
             return ID.parse(identifier=identifier)
 
-    async def get_names(self, identifier: ID) -> Set[str]:
-        records = await self.hgetall(name=self.__cache_name())
-        if records is None:
-            return set()
-        else:
-            return get_names(records=records, identifier=identifier)
-
-
-def get_names(records: Dict[bytes, bytes], identifier: ID) -> Set[str]:
-    strings = set()
-    for key in records:
-        value = records[key]
-        if value is None:
-            continue
-        elif identifier == utf8_decode(data=value):
-            strings.add(utf8_decode(data=key))
-    return strings
+    async def get_names(self, identifier: ID) -> Optional[Set[str]]:
+        """ get names for ID from reverse index, None on redis not available """
+        redis = self.redis
+        if redis is None:
+            return None
+        elif not self.__indexed:
+            self.__build_index(redis=redis)
+            self.__indexed = True
+        members = redis.smembers(self.__names_cache_name(identifier=identifier))
+        return {utf8_decode(data=item) for item in members}
+
+    def __build_index(self, redis):
+        """ build reverse index for records saved by old versions """
+        indexed_key = self.__indexed_cache_name()
+        if redis.exists(indexed_key):
+            return
+        records = redis.hgetall(self.__cache_name())
+        pipe = redis.pipeline(transaction=True)
+        for key, value in records.items():
+            pipe.sadd(self.__names_cache_name(identifier=utf8_decode(data=value)), utf8_decode(data=key))
+        pipe.set(indexed_key, b'1')
+        pipe.execute()
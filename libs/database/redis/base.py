@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2021 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+from abc import ABC
+from typing import Optional, List, Dict
+
+from dimples.database.redis import RedisCache
+
+
+class Missing:
+    """ Value not found in local storage (cached in Redis with a shorter time) """
+
+    def __str__(self) -> str:
+        return '<Missing />'
+
+    def __repr__(self) -> str:
+        return '<Missing />'
+
+
+MISSING = Missing()
+
+
+class BatchCache(RedisCache, ABC):
+    """
+        Batch Access
+        ~~~~~~~~~~~~
+
+        Get/set values for many keys in one round-trip (MGET / pipeline)
+    """
+
+    # placeholder for values not found in local storage,
+    # it will be overwritten when the real value saved
+    EMPTY = b''
+    EMPTY_EXPIRES = 600  # seconds
+
+    @classmethod
+    def is_empty(cls, value: Optional[bytes]) -> bool:
+        return value is not None and len(value) == 0
+
+    async def save_empty(self, names: List[str]) -> bool:
+        """ Mark values missing, so the local storage won't be checked again before expired """
+        mapping = {name: self.EMPTY for name in names}
+        return await self.mset(mapping=mapping, expires=self.EMPTY_EXPIRES)
+
+    async def mget(self, names: List[str]) -> List[Optional[bytes]]:
+        """ Get values with names, None for not found """
+        redis = self.redis
+        if redis is None or len(names) == 0:
+            return [None] * len(names)
+        return redis.mget(names)
+
+    async def mset(self, mapping: Dict[str, bytes], expires: Optional[int] = None) -> bool:
+        """ Set values with names (MSET cannot set expires, so use pipeline) """
+        redis = self.redis
+        if redis is None:
+            return False
+        elif len(mapping) == 0:
+            return True
+        pipe = redis.pipeline(transaction=False)
+        for name, value in mapping.items():
+            pipe.set(name=name, value=value, ex=expires)
+        pipe.execute()
+        return True
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2021 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+from typing import Optional
+
+from redis.client import PubSub
+
+from dimples.utils import Config
+from dimples.database.redis import RedisCache
+
+
+class InvalidationCache(RedisCache):
+
+    def __init__(self, config: Config):
+        super().__init__(config=config)
+
+    @property  # Override
+    def db_name(self) -> Optional[str]:
+        return 'dim'
+
+    @property  # Override
+    def tbl_name(self) -> str:
+        return 'cache'
+
+    """
+        Cache Invalidation Bus
+        ~~~~~~~~~~~~~~~~~~~~~~
+
+        redis channel: 'dim.cache.invalidate'
+            {"origin": "...", "pool": "devices", "keys": ["{ID}", ...]}
+    """
+    def __channel_name(self) -> str:
+        return '%s.%s.invalidate' % (self.db_name, self.tbl_name)
+
+    async def publish(self, data: bytes) -> bool:
+        """ broadcast to all processes sharing this Redis """
+        redis = self.redis
+        if redis is None:
+            return False
+        redis.publish(self.__channel_name(), data)
+        return True
+
+    def subscribe(self) -> Optional[PubSub]:
+        """ blocking subscriber, call 'get_message()' in background thread """
+        redis = self.redis
+        if redis is None:
+            return None
+        pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.__channel_name())
+        return pubsub
@@ -23,17 +23,19 @@
 # SOFTWARE.
 # ==============================================================================
 
-from typing import List, Optional
+from typing import Optional, Union, List, Dict
 
-from dimples import json_encode, json_decode, utf8_encode, utf8_decode
 from dimples import ID
-from dimples.database.redis import RedisCache
+
+from ...utils.serializer import Serializers
 
 from ..dos.device import insert_device
 from ..dos import DeviceInfo
 
+from .base import BatchCache, Missing, MISSING
+
 
-class DeviceCache(RedisCache):
+class DeviceCache(BatchCache):
 
     # device info cached in Redis will be removed after 30 minutes, after that
     # it will be reloaded from local storage if it's still need.
@@ -56,30 +58,63 @@ class DeviceCache(RedisCache):
     def __cache_name(self, identifier: ID) -> str:
         return '%s.%s.%s.devices' % (self.db_name, self.tbl_name, identifier)
 
-    async def get_devices(self, identifier: ID) -> Optional[List[DeviceInfo]]:
+    async def get_devices(self, identifier: ID) -> Union[List[DeviceInfo], Missing, None]:
         name = self.__cache_name(identifier=identifier)
         value = await self.get(name=name)
-        if value is not None:
-            js = utf8_decode(data=value)
-            assert js is not None, 'failed to decode string: %s' % value
-            array = json_decode(string=js)
-            assert isinstance(array, List), 'devices error: %s' % value
-            return DeviceInfo.convert(array=array)
+        if value is None:
+            return None
+        elif self.is_empty(value=value):
+            return MISSING
+        return _decode_devices(value=value)
 
     async def save_devices(self, devices: List[DeviceInfo], identifier: ID) -> bool:
-        array = DeviceInfo.revert(array=devices)
-        js = json_encode(obj=array)
-        value = utf8_encode(string=js)
+        value = _encode_devices(devices=devices)
         name = self.__cache_name(identifier=identifier)
         return await self.set(name=name, value=value, expires=self.EXPIRES)
 
+    async def get_devices_many(self, identifiers: List[ID]) -> Dict[ID, Union[List[DeviceInfo], Missing]]:
+        """ get devices for users in one round-trip, missed users won't be returned """
+        names = [self.__cache_name(identifier=identifier) for identifier in identifiers]
+        values = await self.mget(names=names)
+        results = {}
+        for identifier, value in zip(identifiers, values):
+            if value is None:
+                continue
+            elif self.is_empty(value=value):
+                results[identifier] = MISSING
+            else:
+                results[identifier] = _decode_devices(value=value)
+        return results
+
+    async def save_devices_many(self, devices: Dict[ID, List[DeviceInfo]]) -> bool:
+        mapping = {}
+        for identifier, array in devices.items():
+            name = self.__cache_name(identifier=identifier)
+            mapping[name] = _encode_devices(devices=array)
+        return await self.mset(mapping=mapping, expires=self.EXPIRES)
+
+    async def save_devices_missing(self, identifiers: List[ID]) -> bool:
+        names = [self.__cache_name(identifier=identifier) for identifier in identifiers]
+        return await self.save_empty(names=names)
+
     async def add_device(self, device: DeviceInfo, identifier: ID) -> bool:
         # get all devices info with ID
         array = await self.get_devices(identifier=identifier)
-        if array is None:
+        if array is None or array is MISSING:
             array = [device]
         else:
             array = insert_device(info=device, devices=array)
             if array is None:
                 return False
         return await self.save_devices(devices=array, identifier=identifier)
+
+
+def _encode_devices(devices: List[DeviceInfo]) -> bytes:
+    array = DeviceInfo.revert(array=devices)
+    return Serializers.CACHE.encode(obj=array)
+
+
+def _decode_devices(value: bytes) -> List[DeviceInfo]:
+    array = Serializers.CACHE.decode(data=value)
+    assert isinstance(array, List), 'devices error: %s' % value
+    return DeviceInfo.convert(array=array)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2021 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+from typing import Union, List, Dict
+
+from dimples import ID, Document
+from dimples.database.dos.document import parse_document
+from dimples.database.redis import DocumentCache as SuperCache
+
+from ...utils.serializer import Serializers
+
+from .base import BatchCache, Missing, MISSING
+
+
+class DocumentCache(BatchCache, SuperCache):
+
+    """
+        Document for Entities (User/Group)
+        ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+        redis key: 'mkm.document.{ID}'
+    """
+    def __cache_name(self, identifier: ID) -> str:
+        return '%s.%s.%s' % (self.db_name, self.tbl_name, identifier)
+
+    # Override
+    async def save_documents(self, documents: List[Document], identifier: ID) -> bool:
+        value = _encode_documents(documents=documents, identifier=identifier)
+        name = self.__cache_name(identifier=identifier)
+        return await self.set(name=name, value=value, expires=self.EXPIRES)
+
+    # Override
+    async def load_documents(self, identifier: ID) -> Union[List[Document], Missing, None]:
+        name = self.__cache_name(identifier=identifier)
+        value = await self.get(name=name)
+        if value is None:
+            return None
+        elif self.is_empty(value=value):
+            return MISSING
+        return _decode_documents(value=value, identifier=identifier)
+
+    async def save_documents_many(self, documents: Dict[ID, List[Document]]) -> bool:
+        mapping = {}
+        for identifier, array in documents.items():
+            name = self.__cache_name(identifier=identifier)
+            mapping[name] = _encode_documents(documents=array, identifier=identifier)
+        return await self.mset(mapping=mapping, expires=self.EXPIRES)
+
+    async def load_documents_many(self, identifiers: List[ID]) -> Dict[ID, Union[List[Document], Missing]]:
+        """ get documents for entities in one round-trip, missed entities won't be returned """
+        names = [self.__cache_name(identifier=identifier) for identifier in identifiers]
+        values = await self.mget(names=names)
+        results = {}
+        for identifier, value in zip(identifiers, values):
+            if value is None:
+                continue
+            elif self.is_empty(value=value):
+                results[identifier] = MISSING
+            else:
+                results[identifier] = _decode_documents(value=value, identifier=identifier)
+        return results
+
+    async def save_documents_missing(self, identifiers: List[ID]) -> bool:
+        names = [self.__cache_name(identifier=identifier) for identifier in identifiers]
+        return await self.save_empty(names=names)
+
+
+def _encode_documents(documents: List[Document], identifier: ID) -> bytes:
+    array = []
+    for doc in documents:
+        assert doc.identifier == identifier, 'document ID not matched: %s, %s' % (identifier, doc)
+        array.append(doc.dictionary)
+    return Serializers.CACHE.encode(obj=array)
+
+
+def _decode_documents(value: bytes, identifier: ID) -> List[Document]:
+    info = Serializers.CACHE.decode(data=value)
+    if isinstance(info, Dict):
+        # compatible with v1.0
+        info = [info]
+    else:
+        assert isinstance(info, List), 'document error: %s' % value
+    array = []
+    for item in info:
+        doc = parse_document(dictionary=item, identifier=identifier)
+        if doc is not None:
+            array.append(doc)
+    return array
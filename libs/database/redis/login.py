@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2023 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+from typing import Set, Tuple, Dict
+
+from dimples import ID
+from dimples.database.redis import LoginCache as SuperCache
+from dimples.database.redis.login import serialize_socket_addresses, deserialize_socket_addresses
+from dimples.database.redis.login import is_empty
+
+
+class LoginCache(SuperCache):
+
+    """
+        Session Online
+        ~~~~~~~~~~~~~~
+
+        redis key: 'mkm.user.active_sockets'
+    """
+    def __active_sockets_cache_name(self) -> str:
+        return '%s.%s.active_sockets' % (self.db_name, self.tbl_name)
+
+    async def update_socket_addresses(self,
+                                      changes: Dict[ID, Tuple[Set[Tuple[str, int]], Set[Tuple[str, int]]]]) -> bool:
+        """
+        Add/remove socket addresses for many users in one transaction,
+        the addresses stored by other stations are kept
+
+        :param changes: ID => (addresses added, addresses removed)
+        :return: False on redis not connected
+        """
+        redis = self.redis
+        if redis is None:
+            return False
+        elif len(changes) == 0:
+            return True
+        name = self.__active_sockets_cache_name()
+        fields = [str(identifier) for identifier in changes.keys()]
+
+        def update(pipe):
+            # merge with the addresses stored
+            values = pipe.hmget(name, fields)
+            mapping = {}
+            removed = []
+            for field, value, (adding, removing) in zip(fields, values, changes.values()):
+                addresses = set() if is_empty(value=value) else deserialize_socket_addresses(value=value)
+                addresses = addresses.difference(removing).union(adding)
+                value = serialize_socket_addresses(addresses=addresses)
+                if value is None:
+                    removed.append(field)
+                else:
+                    mapping[field] = value
+            pipe.multi()
+            if len(mapping) > 0:
+                pipe.hset(name=name, mapping=mapping)
+            if len(removed) > 0:
+                pipe.hdel(name, *removed)
+
+        # WATCH 'mkm.user.active_sockets', then MULTI/EXEC
+        redis.transaction(update, name)
+        return True
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2021 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+from typing import Optional, List, Dict
+
+from dimples import ID, Meta
+from dimples.common.compat import Compatible
+from dimples.database.redis import MetaCache as SuperCache
+
+from ...utils.serializer import Serializers
+
+from .base import BatchCache
+
+
+class MetaCache(BatchCache, SuperCache):
+
+    """
+        Meta key for Entities (User/Group)
+        ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+        redis key: 'mkm.meta.{ID}'
+    """
+    def __cache_name(self, identifier: ID) -> str:
+        return '%s.%s.%s' % (self.db_name, self.tbl_name, identifier)
+
+    # Override
+    async def get_meta(self, identifier: ID) -> Optional[Meta]:
+        name = self.__cache_name(identifier=identifier)
+        value = await self.get(name=name)
+        if value is not None:
+            return self.__decode_meta(value=value)
+
+    # Override
+    async def save_meta(self, meta: Meta, identifier: ID) -> bool:
+        value = Serializers.CACHE.encode(obj=meta.dictionary)
+        name = self.__cache_name(identifier=identifier)
+        return await self.set(name=name, value=value, expires=self.EXPIRES)
+
+    async def save_metas_many(self, metas: Dict[ID, Meta]) -> bool:
+        mapping = {}
+        for identifier, meta in metas.items():
+            name = self.__cache_name(identifier=identifier)
+            mapping[name] = Serializers.CACHE.encode(obj=meta.dictionary)
+        return await self.mset(mapping=mapping, expires=self.EXPIRES)
+
+    async def get_metas_many(self, identifiers: List[ID]) -> Dict[ID, Meta]:
+        """ get metas for entities in one round-trip, missed entities won't be returned """
+        names = [self.__cache_name(identifier=identifier) for identifier in identifiers]
+        values = await self.mget(names=names)
+        results = {}
+        for identifier, value in zip(identifiers, values):
+            if value is None:
+                continue
+            meta = self.__decode_meta(value=value)
+            if meta is not None:
+                results[identifier] = meta
+        return results
+
+    def __decode_meta(self, value: bytes) -> Optional[Meta]:
+        info = Serializers.CACHE.decode(data=value)
+        assert info is not None, 'meta error: %s' % value
+        Compatible.fix_meta_version(meta=info)
+        try:
+            return Meta.parse(meta=info)
+        except Exception as error:
+            self.error(msg='meta error: %s, %s' % (error, info))
@@ -23,16 +23,19 @@
 # SOFTWARE.
 # ==============================================================================
 
-from typing import Optional
+from typing import Optional, Union, List, Dict
 
-from dimples import utf8_encode, utf8_decode, json_encode, json_decode
 from dimples import ID, Content, Command
 from dimples import MuteCommand, BlockCommand
 
 from dimples.database.redis import UserCache as SuperCache
 
+from ...utils.serializer import Serializers
 
-class UserCache(SuperCache):
+from .base import BatchCache, Missing, MISSING
+
+
+class UserCache(BatchCache, SuperCache):
 
     """
         Contacts Command
@@ -50,24 +53,33 @@ class UserCache(SuperCache):
     async def get_contacts_command(self, identifier: ID) -> Optional[Command]:
         key = self.__contacts_command_cache_name(identifier=identifier)
         dictionary = await self.__load_command(key=key)
-        if dictionary is not None:
+        if isinstance(dictionary, Dict):
             return Content.parse(content=dictionary)  # -> StorageCommand
 
     async def __save_command(self, key: str, content: Command) -> bool:
-        dictionary = content.dictionary
-        js = json_encode(obj=dictionary)
-        value = utf8_encode(string=js)
+        value = Serializers.CACHE.encode(obj=content.dictionary)
         return await self.set(name=key, value=value, expires=self.EXPIRES)
 
-    async def __load_command(self, key: str) -> Optional[dict]:
+    async def __load_command(self, key: str) -> Union[dict, Missing, None]:
         value = await self.get(name=key)
         if value is None:
             return None
-        js = utf8_decode(data=value)
-        dictionary = json_decode(string=js)
+        elif self.is_empty(value=value):
+            return MISSING
+        dictionary = Serializers.CACHE.decode(data=value)
         assert dictionary is not None, 'cmd error: %s' % value
         return dictionary
 
+    async def __save_commands(self, keys: List[str], contents: List[Command]) -> bool:
+        mapping = {}
+        for key, content in zip(keys, contents):
+            mapping[key] = Serializers.CACHE.encode(obj=content.dictionary)
+        return await self.mset(mapping=mapping, expires=self.EXPIRES)
+
+    async def __load_commands(self, keys: List[str]) -> List[Union[dict, Missing, None]]:
+        values = await self.mget(names=keys)
+        return [_decode_command(value=value) for value in values]
+
     """
         Block Command
         ~~~~~~~~~~~~~
@@ -81,11 +93,32 @@ class UserCache(SuperCache):
         key = self.__block_command_cache_name(identifier=identifier)
         return await self.__save_command(key=key, content=content)
 
-    async def get_block_command(self, identifier: ID) -> Optional[BlockCommand]:
+    async def get_block_command(self, identifier: ID) -> Union[BlockCommand, Missing, None]:
         key = self.__block_command_cache_name(identifier=identifier)
         dictionary = await self.__load_command(key=key)
-        if dictionary is not None:
+        if isinstance(dictionary, Dict):
             return BlockCommand(content=dictionary)
+        return dictionary
+
+    async def save_block_commands_many(self, contents: Dict[ID, BlockCommand]) -> bool:
+        keys = [self.__block_command_cache_name(identifier=identifier) for identifier in contents]
+        return await self.__save_commands(keys=keys, contents=list(contents.values()))
+
+    async def get_block_commands_many(self, identifiers: List[ID]) -> Dict[ID, Union[BlockCommand, Missing]]:
+        """ get block commands for users in one round-trip, missed users won't be returned """
+        keys = [self.__block_command_cache_name(identifier=identifier) for identifier in identifiers]
+        array = await self.__load_commands(keys=keys)
+        results = {}
+        for identifier, dictionary in zip(identifiers, array):
+            if isinstance(dictionary, Dict):
+                results[identifier] = BlockCommand(content=dictionary)
+            elif dictionary is MISSING:
+                results[identifier] = MISSING
+        return results
+
+    async def save_block_commands_missing(self, identifiers: List[ID]) -> bool:
+        keys = [self.__block_command_cache_name(identifier=identifier) for identifier in identifiers]
+        return await self.save_empty(names=keys)
 
     """
         Mute Command
@@ -100,8 +133,37 @@ class UserCache(SuperCache):
         key = self.__mute_command_cache_name(identifier=identifier)
         return await self.__save_command(key=key, content=content)
 
-    async def get_mute_command(self, identifier: ID) -> Optional[MuteCommand]:
+    async def get_mute_command(self, identifier: ID) -> Union[MuteCommand, Missing, None]:
         key = self.__mute_command_cache_name(identifier=identifier)
         dictionary = await self.__load_command(key=key)
-        if dictionary is not None:
+        if isinstance(dictionary, Dict):
             return MuteCommand(content=dictionary)
+        return dictionary
+
+    async def save_mute_commands_many(self, contents: Dict[ID, MuteCommand]) -> bool:
+        keys = [self.__mute_command_cache_name(identifier=identifier) for identifier in contents]
+        return await self.__save_commands(keys=keys, contents=list(contents.values()))
+
+    async def get_mute_commands_many(self, identifiers: List[ID]) -> Dict[ID, Union[MuteCommand, Missing]]:
+        """ get mute commands for users in one round-trip, missed users won't be returned """
+        keys = [self.__mute_command_cache_name(identifier=identifier) for identifier in identifiers]
+        array = await self.__load_commands(keys=keys)
+        results = {}
+        for identifier, dictionary in zip(identifiers, array):
+            if isinstance(dictionary, Dict):
+                results[identifier] = MuteCommand(content=dictionary)
+            elif dictionary is MISSING:
+                results[identifier] = MISSING
+        return results
+
+    async def save_mute_commands_missing(self, identifiers: List[ID]) -> bool:
+        keys = [self.__mute_command_cache_name(identifier=identifier) for identifier in identifiers]
+        return await self.save_empty(names=keys)
+
+
+def _decode_command(value: Optional[bytes]) -> Union[dict, Missing, None]:
+    if value is None:
+        return None
+    elif BatchCache.is_empty(value=value):
+        return MISSING
+    return Serializers.CACHE.decode(data=value)
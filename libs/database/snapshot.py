@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2021 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+"""
+    Cache Snapshot
+    ~~~~~~~~~~~~~~
+
+    Hot entries of the memory pools are written on graceful shutdown,
+    and reloaded lazily at startup, so the reconnecting users won't
+    hammer Redis & local storage after restarted.
+"""
+
+import mmap
+import os
+import threading
+import time
+from typing import Optional, Any, Callable, Tuple, List, Dict
+
+from mkm.types import Converter
+from dimples import ID, Document, Content, Command
+
+from dimples.database.dos.document import parse_document
+
+from ..utils import Singleton, Logging, Config
+from ..utils.cache import BoundedCachePool, MemoryCacheManager
+from ..utils.serializer import Serializers
+
+from .dos import DeviceInfo
+
+
+@Singleton
+class CacheSnapshot(Logging):
+    """
+        Warm-start Snapshot
+        ~~~~~~~~~~~~~~~~~~~
+
+        File format (one entry per line):
+            DIM.CACHE.SNAPSHOT <TAB> {version} <TAB> {time} <LF>
+            {pool} <TAB> {key} <TAB> {JsON value} <LF>
+            ...
+
+        At startup, the file is mapped into memory, and only the keys are
+        indexed; a value will be decoded when its key is missed in the pool,
+        before checking Redis & local storage, then removed from the index.
+        The file is deleted after mapped, so a crash won't leave an old one
+        to be reloaded again.
+
+        Entries restored are valid until 'snapshot_expires' seconds after
+        written, same as the memory cache, so the stale values won't stay
+        longer than before restarted.
+
+        config.ini:
+            [memory]
+            snapshot           = /var/dim/cache.snapshot
+            snapshot_expires   = 300      # seconds
+            snapshot_max_items = 65536    # for each pool
+    """
+
+    SECTION = 'memory'
+
+    MAGIC = b'DIM.CACHE.SNAPSHOT'
+    VERSION = 1
+
+    EXPIRES = 300  # seconds
+    MAX_ITEMS = 1 << 16  # 65536
+
+    def __init__(self):
+        super().__init__()
+        self.__path: Optional[str] = None
+        self.__expires = self.EXPIRES
+        self.__max_items = self.MAX_ITEMS
+        # mapped file
+        self.__file = None
+        self.__buffer: Optional[mmap.mmap] = None
+        # pool name => key => (start, end)
+        self.__index: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        self.__expired = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def path(self) -> Optional[str]:
+        return self.__path
+
+    def load(self, config: Config) -> int:
+        """ map the snapshot written by last shutdown, return count of entries indexed """
+        options = config.get_section(section=self.SECTION)
+        if options is None:
+            return 0
+        path = options.get('snapshot')
+        if path is None or len(path) == 0:
+            return 0
+        self.__path = path
+        self.__expires = Converter.get_int(value=options.get('snapshot_expires'), default=self.EXPIRES)
+        self.__max_items = Converter.get_int(value=options.get('snapshot_max_items'), default=self.MAX_ITEMS)
+        if not os.path.exists(path):
+            self.info(msg='[SNAPSHOT] cache snapshot not found: %s' % path)
+            return 0
+        self.close()
+        try:
+            count = self.__map(path=path)
+        except Exception as error:
+            self.error(msg='[SNAPSHOT] failed to load cache snapshot: %s, %s' % (path, error))
+            self.close()
+            count = 0
+        # used once
+        os.remove(path)
+        return count
+
+    def __map(self, path: str) -> int:
+        file = open(path, 'rb')
+        if os.fstat(file.fileno()).st_size == 0:
+            file.close()
+            return 0
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        # header
+        end = buffer.find(b'\n')
+        fields = buffer[:end].split(b'\t')
+        if len(fields) != 3 or fields[0] != self.MAGIC or int(fields[1]) != self.VERSION:
+            self.error(msg='[SNAPSHOT] cache snapshot error: %s' % buffer[:end])
+            buffer.close()
+            file.close()
+            return 0
+        expired = float(fields[2]) + self.__expires
+        now = time.time()
+        if expired <= now:
+            self.warning(msg='[SNAPSHOT] cache snapshot expired: %s, %d seconds ago'
+                             % (path, now - expired + self.__expires))
+            buffer.close()
+            file.close()
+            return 0
+        # index keys
+        index: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        count = 0
+        size = len(buffer)
+        start = end + 1
+        while start < size:
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                end = size
+            t1 = buffer.find(b'\t', start, end)
+            t2 = buffer.find(b'\t', t1 + 1, end)
+            if 0 < t1 < t2:
+                name = buffer[start:t1].decode('utf-8')
+                key = buffer[t1 + 1:t2].decode('utf-8')
+                table = index.get(name)
+                if table is None:
+                    table = {}
+                    index[name] = table
+                table[key] = (t2 + 1, end)
+                count += 1
+            start = end + 1
+        with self.__lock:
+            self.__file = file
+            self.__buffer = buffer
+            self.__index = index
+            self.__expired = expired
+        self.info(msg='[SNAPSHOT] cache snapshot mapped: %s, %d entries, %d bytes, pools: %s'
+                      % (path, count, size, {name: len(table) for name, table in index.items()}))
+        return count
+
+    def close(self):
+        with self.__lock:
+            buffer = self.__buffer
+            file = self.__file
+            self.__buffer = None
+            self.__file = None
+            self.__index = {}
+        if buffer is not None:
+            buffer.close()
+        if file is not None:
+            file.close()
+
+    def take(self, cache_pool: Any, key: Any, now: float) -> Tuple[bool, Optional[Any], float]:
+        """
+        Take the entry for the key from snapshot
+
+        :return: (True, value, remaining seconds) on found (value is None for missing),
+                 or (False, None, 0)
+        """
+        if len(self.__index) == 0 or not isinstance(cache_pool, BoundedCachePool):
+            return False, None, 0
+        name = cache_pool.name
+        codec = _codecs.get(name)
+        if codec is None:
+            return False, None, 0
+        with self.__lock:
+            if now >= self.__expired:
+                expired = True
+                data = None
+            else:
+                expired = False
+                table = self.__index.get(name)
+                pos = None if table is None else table.pop(str(key), None)
+                data = None if pos is None else self.__buffer[pos[0]:pos[1]]
+        if expired:
+            self.info(msg='[SNAPSHOT] cache snapshot expired, closing')
+            self.close()
+            return False, None, 0
+        elif data is None:
+            return False, None, 0
+        try:
+            value = Serializers.STORAGE.decode(data=data)
+            if value is not None:
+                value = codec[1](value, key)
+        except Exception as error:
+            self.error(msg='[SNAPSHOT] failed to decode entry: %s, %s, %s' % (name, key, error))
+            return False, None, 0
+        return True, value, self.__expired - now
+
+    def save(self) -> int:
+        """ write hot entries on graceful shutdown, return count of entries written """
+        path = self.__path
+        if path is None:
+            return 0
+        now = time.time()
+        count = 0
+        tmp = '%s.tmp' % path
+        try:
+            with open(tmp, 'wb') as file:
+                file.write(b'%s\t%d\t%.3f\n' % (self.MAGIC, self.VERSION, now))
+                for pool in _snapshot_pools():
+                    encode = _codecs[pool.name][0]
+                    prefix = pool.name.encode('utf-8')
+                    for key, value in pool.hot_items(now=now, limit=self.__max_items):
+                        try:
+                            data = Serializers.STORAGE.encode(obj=None if value is None else encode(value))
+                        except Exception as error:
+                            self.error(msg='[SNAPSHOT] failed to encode entry: %s, %s, %s' % (pool.name, key, error))
+                            continue
+                        file.write(b'%s\t%s\t%s\n' % (prefix, str(key).encode('utf-8'), data))
+                        count += 1
+            os.replace(tmp, path)
+        except Exception as error:
+            self.error(msg='[SNAPSHOT] failed to write cache snapshot: %s, %s' % (path, error))
+            return 0
+        self.info(msg='[SNAPSHOT] cache snapshot written: %s, %d entries, %.3f seconds'
+                      % (path, count, time.time() - now))
+        return count
+
+
+def _snapshot_pools() -> List[BoundedCachePool]:
+    all_pools = MemoryCacheManager().all_pools()
+    return [all_pools[name] for name in _codecs if name in all_pools]
+
+
+#
+#   Codecs for values in pools: (encode, decode)
+#
+
+def _encode_documents(documents: List[Document]) -> List[Dict]:
+    return [doc.dictionary for doc in documents]
+
+
+def _decode_documents(array: List[Dict], identifier: ID) -> List[Document]:
+    documents = []
+    for item in array:
+        doc = parse_document(dictionary=item, identifier=identifier)
+        if doc is not None:
+            documents.append(doc)
+    return documents
+
+
+def _encode_devices(devices: List[DeviceInfo]) -> List[Dict]:
+    return DeviceInfo.revert(array=devices)
+
+
+def _decode_devices(array: List[Dict], identifier: ID) -> List[DeviceInfo]:
+    return DeviceInfo.convert(array=array)
+
+
+def _encode_command(content: Command) -> Dict:
+    return content.dictionary
+
+
+def _decode_command(info: Dict, identifier: ID) -> Optional[Command]:
+    return Content.parse(content=info)
+
+
+def _encode_identifiers(array: List[ID]) -> List[str]:
+    return ID.revert(array=array)
+
+
+def _decode_identifiers(array: List[str], identifier: ID) -> List[ID]:
+    return ID.convert(array=array)
+
+
+_codecs: Dict[str, Tuple[Callable[[Any], Any], Callable[[Any, Any], Any]]] = {
+    'documents': (_encode_documents, _decode_documents),
+    'devices': (_encode_devices, _decode_devices),
+    'cmd.block': (_encode_command, _decode_command),
+    'cmd.mute': (_encode_command, _decode_command),
+    'cmd.contacts': (_encode_command, _decode_command),
+    'contacts': (_encode_identifiers, _decode_identifiers),
+}
@@ -24,15 +24,16 @@
 # ==============================================================================
 
 import threading
-from typing import Dict, Set, Tuple, Optional
+from typing import Dict, Set, Tuple, List, Optional
 
 from aiou.mem import CachePool
 
 from dimples import ID
-from dimples.utils import SharedCacheManager
 from dimples.utils import Config
 from dimples.database import DbTask
 
+from ..utils.cache import MemoryCacheManager
+
 from .redis import LoginCache
 
 
@@ -80,8 +81,9 @@ class ActiveTable:
     def __init__(self, config: Config):
         super().__init__()
         self._socket_address: Dict[ID, Set[Tuple[str, int]]] = {}  # ID => set(socket_address)
-        man = SharedCacheManager()
-        self._cache = man.get_pool(name='session')  # 'active_users' => Set(ID)
+        man = MemoryCacheManager()
+        # one key only, no need to estimate size
+        self._cache = man.get_pool(name='session', config=config, max_bytes=0)  # 'active_users' => Set(ID)
         self._redis = LoginCache(config=config)
         self._lock = threading.Lock()
 
@@ -107,27 +109,52 @@ class ActiveTable:
 
     async def add_socket_address(self, identifier: ID, address: Tuple[str, int]) -> Set[Tuple[str, int]]:
         """ wrote by station only """
+        await self.update_socket_addresses(changes=[(identifier, address, True)])
         with self._lock:
-            # 1. add into local cache
-            sockets = self._socket_address.get(identifier)
-            if sockets is None:
-                sockets = set()
-                self._socket_address[identifier] = sockets
-            sockets.add(address)
-            # 2. store into Redis Server
-            await self._redis.save_socket_addresses(identifier=identifier, addresses=sockets)
-            return sockets
+            return set(self._socket_address.get(identifier, set()))
 
     async def remove_socket_address(self, identifier: ID, address: Tuple[str, int]) -> Set[Tuple[str, int]]:
         """ wrote by station only """
+        await self.update_socket_addresses(changes=[(identifier, address, False)])
         with self._lock:
-            # 1. remove from local cache
             sockets = self._socket_address.get(identifier)
-            if sockets is not None:
-                sockets.discard(address)
-                if len(sockets) == 0:
-                    self._socket_address.pop(identifier, None)
-                    sockets = None
-            # 2. store into Redis Server
-            await self._redis.save_socket_addresses(identifier=identifier, addresses=sockets)
-            return sockets
+            return None if sockets is None else set(sockets)
+
+    async def update_socket_addresses(self, changes: List[Tuple[ID, Tuple[str, int], bool]]) -> int:
+        """
+        Apply changes in order, and store the users changed in one transaction
+
+        Only the addresses changed here are added into (or removed from) the
+        records in Redis, instead of overwriting them with the local ones,
+        so the addresses stored by other stations (e.g.: the new station
+        while this one draining) are kept.
+
+        :param changes: list of (ID, socket_address, online)
+        :return: count of users changed
+        """
+        with self._lock:
+            # ID => (addresses added, addresses removed)
+            deltas: Dict[ID, Tuple[Set[Tuple[str, int]], Set[Tuple[str, int]]]] = {}
+            for identifier, address, online in changes:
+                # 1. update local cache
+                sockets = self._socket_address.get(identifier)
+                if online:
+                    if sockets is None:
+                        sockets = set()
+                        self._socket_address[identifier] = sockets
+                    sockets.add(address)
+                elif sockets is not None:
+                    sockets.discard(address)
+                    if len(sockets) == 0:
+                        self._socket_address.pop(identifier, None)
+                # 2. merge changes, the last one wins
+                added, removed = deltas.setdefault(identifier, (set(), set()))
+                if online:
+                    added.add(address)
+                    removed.discard(address)
+                else:
+                    removed.add(address)
+                    added.discard(address)
+            # 3. store into Redis Server
+            await self._redis.update_socket_addresses(changes=deltas)
+            return len(deltas)
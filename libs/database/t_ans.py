@@ -116,7 +116,9 @@ class NameTask(AnsTask):
 
     # Override
     async def _load_redis_cache(self) -> Optional[Set[str]]:
-        return await self._redis.get_names(identifier=self._identifier)
+        names = await self._redis.get_names(identifier=self._identifier)
+        if names is not None and len(names) > 0:
+            return names
 
 
 class AddressNameTable:
@@ -128,6 +130,9 @@ class AddressNameTable:
         self._redis = AddressNameCache(config=config)
         self._dos = AddressNameStorage(config=config)
         self._lock = threading.RLock()
+        # reverse index: ID => Set[str], built from the records loaded
+        self._index: Dict[ID, Set[str]] = {}
+        self._index_records: Optional[Dict[str, ID]] = None
 
     def show_info(self):
         self._dos.show_info()
@@ -151,17 +156,30 @@ class AddressNameTable:
         records = await task.load()
         return {} if records is None else records
 
+    def _get_index(self, records: Dict[str, ID]) -> Dict[ID, Set[str]]:
+        """ get reverse index, rebuild it when records reloaded """
+        with self._lock:
+            if self._index_records is not records:
+                self._index = build_index(records=records)
+                self._index_records = records
+            return self._index
+
     async def save_record(self, name: str, identifier: ID) -> bool:
         now = DateTime.current_timestamp()
         with self._lock:
             #
             #  1. update memory cache
             #
-            if identifier is not None:
-                # remove: ID => Set[str]
-                self._cache.erase(key=identifier)
             all_records = await self._load_records()
+            index = self._get_index(records=all_records)
+            old = all_records.get(name)
             all_records[name] = identifier
+            move_name(index=index, name=name, old=old, new=identifier)
+            # remove: ID => Set[str]
+            if old is not None:
+                self._cache.erase(key=old)
+            if identifier is not None:
+                self._cache.erase(key=identifier)
             self._cache.update(key=AllTask.ALL_KEY, value=all_records, life_span=AnsTask.MEM_CACHE_EXPIRES, now=now)
             #
             #  2. update redis server
@@ -209,21 +227,43 @@ class AddressNameTable:
         #
         task = self._new_all_task()
         all_records = await task.load()
-        if isinstance(all_records, Dict):
-            names = get_names(records=all_records, identifier=identifier)
-        else:
-            names = set()
         #
         #   3. update memory cache
         #
         with self._lock:
+            if isinstance(all_records, Dict):
+                index = self._get_index(records=all_records)
+                names = set(index.get(identifier, ()))
+            else:
+                names = set()
             self._cache.update(key=identifier, value=names, life_span=AnsTask.MEM_CACHE_EXPIRES)
         return names
 
 
-def get_names(records: Dict[str, ID], identifier: ID) -> Set[str]:
-    strings = set()
-    for key in records:
-        if identifier == records[key]:
-            strings.add(key)
-    return strings
+def build_index(records: Dict[str, ID]) -> Dict[ID, Set[str]]:
+    """ ID => names """
+    index = {}
+    for name, identifier in records.items():
+        if identifier is None:
+            continue
+        names = index.get(identifier)
+        if names is None:
+            index[identifier] = {name}
+        else:
+            names.add(name)
+    return index
+
+
+def move_name(index: Dict[ID, Set[str]], name: str, old: Optional[ID], new: Optional[ID]):
+    if old is not None:
+        names = index.get(old)
+        if names is not None:
+            names.discard(name)
+            if len(names) == 0:
+                index.pop(old, None)
+    if new is not None:
+        names = index.get(new)
+        if names is None:
+            index[new] = {name}
+        else:
+            names.add(name)
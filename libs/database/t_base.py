@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2019 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import TypeVar, Generic, Optional, Tuple, List, Dict
+
+from aiou.mem import CachePool, CacheHolder
+
+from dimples.database import DbTask
+
+from ..utils.cache import BoundedCachePool
+from ..utils.flight import SingleFlight
+
+from .redis import MISSING
+from .invalidator import CacheInvalidator
+from .snapshot import CacheSnapshot
+
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+
+# (cache pool, key) => loading
+g_flights = SingleFlight()
+
+
+def _avoided(cache_pool: CachePool, redis: int = 0, storage: int = 0):
+    if isinstance(cache_pool, BoundedCachePool):
+        cache_pool.avoided(redis=redis, storage=storage)
+
+
+def probe_cache(cache_pool: CachePool, key) -> Tuple[bool, Optional[V]]:
+    """
+    Direct memory cache probe for read path, without creating task
+
+    :return: (True, value) on cached (value is None for missing), or (False, None)
+    """
+    now = time.time()
+    value, holder = cache_pool.fetch(key=key, now=now)
+    if value is not None:
+        return True, value
+    elif holder is not None and holder.is_alive(now=now):
+        # value is missing, no need to check it again
+        _avoided(cache_pool=cache_pool, redis=1, storage=1)
+        return True, None
+    return False, None
+
+
+def _update(cache_pool: CachePool, key, holder: Optional[CacheHolder], value, life_span: float, now: float):
+    """ update memory cache, return the newest value """
+    newest, current = cache_pool.fetch(key=key, now=now)
+    if current is not None and current is not holder:
+        # updated by others while loading
+        return newest
+    elif isinstance(cache_pool, BoundedCachePool) and cache_pool.erased_since(key=key, when=now):
+        # invalidated while loading, the value may be read before the new one saved,
+        # return it to this reader, but don't cache it
+        return value
+    cache_pool.update(key=key, value=value, life_span=life_span, now=now)
+    return value
+
+
+class CacheTask(DbTask, ABC):
+    """
+        Database Task
+        ~~~~~~~~~~~~~
+
+        Same as DbTask, but values not found in local storage are cached
+        for a shorter time (in memory and in Redis), so the storage won't be
+        checked again for each message to the users without data.
+
+        Concurrent loading for the same key is coalesced into one flight,
+        instead of holding the table lock while querying Redis & storage,
+        so the threads (or coroutines) loading other keys won't be blocked.
+
+        Saved keys are broadcast to evict the stale values in other processes,
+        so the values can be cached longer while the invalidation bus running.
+    """
+
+    # missing values in memory
+    EMPTY_EXPIRES = 120  # seconds
+
+    @property  # Override
+    def cache_expires(self) -> float:
+        return CacheInvalidator().expires(cache_pool=self.cache_pool, duration=super().cache_expires)
+
+    # Override
+    async def save(self, value: V) -> bool:
+        ok = await super().save(value=value)
+        # evict the old value from other processes
+        await CacheInvalidator().invalidate(cache_pool=self.cache_pool, keys=[self.cache_key()])
+        return ok
+
+    # Override
+    async def load(self) -> Optional[V]:
+        now = time.time()
+        key = self.cache_key()
+        cache_pool = self.cache_pool
+        #
+        #  1. check memory cache
+        #
+        value, holder = cache_pool.fetch(key=key, now=now)
+        if value is not None:
+            # got it from cache
+            return value
+        elif holder is None:
+            # holder not exists, means it is the first querying
+            pass
+        elif holder.is_alive(now=now):
+            # value is missing, no need to check it again
+            _avoided(cache_pool=cache_pool, redis=1, storage=1)
+            return None
+        #
+        #  2. load in one flight,
+        #     or wait for the result if another thread (or coroutine) is loading it
+        #
+        value = await g_flights.run(key=(cache_pool, key), loader=lambda: self.__load(key=key, now=now))
+        #
+        #  3. OK, return cached value
+        #
+        return value
+
+    async def __load(self, key: K, now: float) -> Optional[V]:
+        cache_pool = self.cache_pool
+        # check again to make sure the cache not exists.
+        # (maybe the cache was updated before this flight started)
+        value, holder = cache_pool.fetch(key=key, now=now)
+        if value is not None:
+            return value
+        elif holder is None:
+            pass
+        elif holder.is_alive(now=now):
+            return None
+        else:
+            # holder exists, renew the expired time for other threads
+            holder.renewal(duration=self.cache_refresh, now=now)
+        # 2.0. check warm-start snapshot
+        restored, value, remaining = CacheSnapshot().take(cache_pool=cache_pool, key=key, now=now)
+        if restored:
+            life_span = min(remaining, self.EMPTY_EXPIRES if value is None else self.cache_expires)
+            return _update(cache_pool=cache_pool, key=key, holder=holder, value=value, life_span=life_span, now=now)
+        # 2.1. check redis server
+        value = await self._load_redis_cache()
+        if value is MISSING:
+            # missing value cached in redis server
+            _avoided(cache_pool=cache_pool, storage=1)
+            value = None
+        elif value is None:
+            # 2.2. check local storage
+            value = await self._load_local_storage()
+            if value is None:
+                # 2.3. mark missing in redis server
+                await self._save_redis_missing()
+            else:
+                # 2.3. update redis server
+                await self._save_redis_cache(value=value)
+        # update memory cache, unless a new value saved while loading
+        life_span = self.EMPTY_EXPIRES if value is None else self.cache_expires
+        return _update(cache_pool=cache_pool, key=key, holder=holder, value=value, life_span=life_span, now=now)
+
+    # protected
+    async def _save_redis_missing(self) -> bool:
+        """ mark value missing in redis server """
+        return False
+
+
+class BatchTask(Generic[K, V], ABC):
+    """
+        Batch Loading
+        ~~~~~~~~~~~~~
+
+        Same levels as DbTask, but for many keys at once:
+            1. memory cache (and warm-start snapshot);
+            2. redis server, in one round-trip;
+            3. local storage, in parallel, and update redis in one round-trip.
+
+        Keys loading by other tasks (single or batch) are awaited, not loaded again.
+
+        Missing values are cached for a shorter time, same as CacheTask.
+    """
+
+    EMPTY_EXPIRES = CacheTask.EMPTY_EXPIRES
+
+    def __init__(self, cache_pool: CachePool, cache_expires: float, mutex_lock: threading.Lock):
+        super().__init__()
+        assert cache_expires > 0, 'cache duration error: %s' % cache_expires
+        self.__cache_pool = cache_pool
+        self.__cache_expires = cache_expires
+        self.__lock = mutex_lock
+
+    async def load(self, keys: List[K]) -> Dict[K, Optional[V]]:
+        now = time.time()
+        cache_pool = self.__cache_pool
+        results: Dict[K, Optional[V]] = {}
+        missed: List[K] = []
+        avoided = 0
+        #
+        #  1. check memory cache
+        #
+        with self.__lock:
+            for key in keys:
+                if key in results:
+                    # duplicated
+                    continue
+                value, holder = cache_pool.fetch(key=key, now=now)
+                if value is not None:
+                    results[key] = value
+                elif holder is not None and holder.is_alive(now=now):
+                    # value is missing
+                    results[key] = None
+                    avoided += 1
+                else:
+                    results[key] = None
+                    missed.append(key)
+        if avoided > 0:
+            _avoided(cache_pool=cache_pool, redis=avoided, storage=avoided)
+        if len(missed) == 0:
+            return results
+        #
+        #  2. join the flights for keys loading by others
+        #
+        waiting: Dict[K, asyncio.Future] = {}
+        loading: List[K] = []
+        for key in missed:
+            future = g_flights.acquire(key=(cache_pool, key))
+            if future is None:
+                loading.append(key)
+            else:
+                waiting[key] = future
+        if len(loading) > 0:
+            try:
+                loaded = await self.__load(keys=loading, now=now)
+            except BaseException as error:
+                for key in loading:
+                    g_flights.release(key=(cache_pool, key), error=error)
+                raise error
+            for key in loading:
+                value = loaded.get(key)
+                g_flights.release(key=(cache_pool, key), value=value)
+                results[key] = value
+        if len(waiting) > 0:
+            values = await asyncio.gather(*waiting.values(), return_exceptions=True)
+            retry: List[K] = []
+            for key, value in zip(waiting.keys(), values):
+                if value is SingleFlight.RETRY:
+                    # the loader was cancelled, load them again
+                    retry.append(key)
+                else:
+                    results[key] = None if isinstance(value, BaseException) else value
+            if len(retry) > 0:
+                results.update(await self.load(keys=retry))
+        return results
+
+    async def __load(self, keys: List[K], now: float) -> Dict[K, Optional[V]]:
+        cache_pool = self.__cache_pool
+        results: Dict[K, Optional[V]] = {}
+        holders = {}
+        missed: List[K] = []
+        # check again, maybe the flights for these keys finished just now
+        with self.__lock:
+            for key in keys:
+                value, holder = cache_pool.fetch(key=key, now=now)
+                if value is not None or (holder is not None and holder.is_alive(now=now)):
+                    results[key] = value
+                else:
+                    holders[key] = holder
+                    missed.append(key)
+        if len(missed) == 0:
+            return results
+        #
+        #  2.0. check warm-start snapshot
+        #
+        snapshot = CacheSnapshot()
+        restored: Dict[K, Tuple[Optional[V], float]] = {}
+        for key in missed:
+            found, value, remaining = snapshot.take(cache_pool=cache_pool, key=key, now=now)
+            if found:
+                life_span = self.EMPTY_EXPIRES if value is None else self.__cache_expires
+                restored[key] = (value, min(remaining, life_span))
+        if len(restored) > 0:
+            with self.__lock:
+                for key, (value, life_span) in restored.items():
+                    results[key] = _update(cache_pool=cache_pool, key=key, holder=holders.get(key),
+                                           value=value, life_span=life_span, now=now)
+            missed = [key for key in missed if key not in restored]
+            if len(missed) == 0:
+                return results
+        #
+        #  2.1. check redis server
+        #
+        loaded = await self._load_redis_caches(keys=missed)
+        empty = {key for key, value in loaded.items() if value is MISSING}
+        if len(empty) > 0:
+            _avoided(cache_pool=cache_pool, storage=len(empty))
+            for key in empty:
+                loaded.pop(key)
+        missed = [key for key in missed if loaded.get(key) is None]
+        #
+        #  2.2. check local storage
+        #
+        loading = [key for key in missed if key not in empty]
+        if len(loading) > 0:
+            values = await asyncio.gather(*[self._load_local_storage(key=key) for key in loading])
+            stored = {}
+            for key, value in zip(loading, values):
+                if value is not None:
+                    stored[key] = value
+            if len(stored) > 0:
+                await self._save_redis_caches(values=stored)
+                loaded.update(stored)
+            if len(stored) < len(loading):
+                await self._save_redis_missing(keys=[key for key in loading if key not in stored])
+        #
+        #  2.3. update memory cache, unless new values saved while loading
+        #
+        with self.__lock:
+            for key in missed:
+                if key not in loaded:
+                    results[key] = _update(cache_pool=cache_pool, key=key, holder=holders.get(key),
+                                           value=None, life_span=self.EMPTY_EXPIRES, now=now)
+            life_span = CacheInvalidator().expires(cache_pool=cache_pool, duration=self.__cache_expires)
+            for key, value in loaded.items():
+                results[key] = _update(cache_pool=cache_pool, key=key, holder=holders.get(key),
+                                       value=value, life_span=life_span, now=now)
+        return results
+
+    @abstractmethod
+    async def _load_redis_caches(self, keys: List[K]) -> Dict[K, V]:
+        """ get values from redis server, in one round-trip """
+        raise NotImplemented
+
+    @abstractmethod
+    async def _save_redis_caches(self, values: Dict[K, V]) -> bool:
+        """ save values into redis server, in one round-trip """
+        raise NotImplemented
+
+    @abstractmethod
+    async def _load_local_storage(self, key: K) -> Optional[V]:
+        """ get value from local storage """
+        raise NotImplemented
+
+    # protected
+    async def _save_redis_missing(self, keys: List[K]) -> bool:
+        """ mark values missing in redis server, in one round-trip """
+        return False
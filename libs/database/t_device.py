@@ -24,21 +24,23 @@
 # ==============================================================================
 
 import threading
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 from aiou.mem import CachePool
 
 from dimples import ID
-from dimples.utils import SharedCacheManager
 from dimples.utils import Config
-from dimples.database import DbTask
 
-from .redis import DeviceCache
+from ..utils.cache import MemoryCacheManager
+
+from .redis import DeviceCache, MISSING
 from .dos import DeviceStorage, DeviceInfo
-from .dos.device import insert_device
+from .dos.device import insert_device, remove_device
+
+from .t_base import CacheTask, BatchTask, probe_cache
 
 
-class DevTask(DbTask):
+class DevTask(CacheTask):
 
     MEM_CACHE_EXPIRES = 300  # seconds
     MEM_CACHE_REFRESH = 32   # seconds
@@ -61,7 +63,9 @@ class DevTask(DbTask):
     # Override
     async def _load_redis_cache(self) -> Optional[List[DeviceInfo]]:
         devices = await self._redis.get_devices(identifier=self._identifier)
-        if devices is None or len(devices) == 0:
+        if devices is None or devices is MISSING:
+            return devices
+        elif len(devices) == 0:
             return None
         else:
             return devices
@@ -82,13 +86,47 @@ class DevTask(DbTask):
     async def _save_local_storage(self, value: List[DeviceInfo]) -> bool:
         return await self._dos.save_devices(devices=value, identifier=self._identifier)
 
+    # Override
+    async def _save_redis_missing(self) -> bool:
+        return await self._redis.save_devices_missing(identifiers=[self._identifier])
+
+
+class DevBatchTask(BatchTask):
+
+    def __init__(self, cache_pool: CachePool, redis: DeviceCache, storage: DeviceStorage,
+                 mutex_lock: threading.Lock):
+        super().__init__(cache_pool=cache_pool, cache_expires=DevTask.MEM_CACHE_EXPIRES, mutex_lock=mutex_lock)
+        self._redis = redis
+        self._dos = storage
+
+    # Override
+    async def _load_redis_caches(self, keys: List[ID]) -> Dict[ID, List[DeviceInfo]]:
+        devices = await self._redis.get_devices_many(identifiers=keys)
+        return {identifier: array for identifier, array in devices.items() if array is MISSING or len(array) > 0}
+
+    # Override
+    async def _save_redis_caches(self, values: Dict[ID, List[DeviceInfo]]) -> bool:
+        return await self._redis.save_devices_many(devices=values)
+
+    # Override
+    async def _save_redis_missing(self, keys: List[ID]) -> bool:
+        return await self._redis.save_devices_missing(identifiers=keys)
+
+    # Override
+    async def _load_local_storage(self, key: ID) -> Optional[List[DeviceInfo]]:
+        devices = await self._dos.get_devices(identifier=key)
+        if devices is None or len(devices) == 0:
+            return None
+        else:
+            return devices
+
 
 class DeviceTable:
 
     def __init__(self, config: Config):
         super().__init__()
-        man = SharedCacheManager()
-        self._cache = man.get_pool(name='devices')  # ID => DeviceInfo
+        man = MemoryCacheManager()
+        self._cache = man.get_pool(name='devices', config=config)  # ID => DeviceInfo
         self._redis = DeviceCache(config=config)
         self._dos = DeviceStorage(config=config)
         self._lock = threading.Lock()
@@ -101,10 +139,22 @@ class DeviceTable:
                        cache_pool=self._cache, redis=self._redis, storage=self._dos,
                        mutex_lock=self._lock)
 
+    def _new_batch_task(self) -> DevBatchTask:
+        return DevBatchTask(cache_pool=self._cache, redis=self._redis, storage=self._dos,
+                            mutex_lock=self._lock)
+
     async def get_devices(self, identifier: ID) -> Optional[List[DeviceInfo]]:
+        cached, devices = probe_cache(cache_pool=self._cache, key=identifier)
+        if cached:
+            return devices
         task = self._new_task(identifier=identifier)
         return await task.load()
 
+    async def get_devices_many(self, identifiers: List[ID]) -> Dict[ID, Optional[List[DeviceInfo]]]:
+        """ get devices for many users, with one redis round-trip """
+        task = self._new_batch_task()
+        return await task.load(keys=identifiers)
+
     async def save_devices(self, devices: List[DeviceInfo], identifier: ID) -> bool:
         task = self._new_task(identifier=identifier)
         return await task.save(value=devices)
@@ -119,3 +169,13 @@ class DeviceTable:
             if array is None:
                 return False
         return await self.save_devices(devices=array, identifier=identifier)
+
+    async def remove_device(self, token: str, identifier: ID) -> bool:
+        # get all devices info with ID
+        array = await self.get_devices(identifier=identifier)
+        if array is None:
+            return False
+        array = remove_device(token=token, devices=array)
+        if array is None:
+            return False
+        return await self.save_devices(devices=array, identifier=identifier)
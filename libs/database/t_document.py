@@ -24,21 +24,24 @@
 # ==============================================================================
 
 import threading
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 from aiou.mem import CachePool
 
 from dimples import ID, Document, DocumentUtils
 from dimples import DocumentDBI
-from dimples.utils import SharedCacheManager
 from dimples.utils import Config
 from dimples.database import DbTask
 
-from .redis import DocumentCache
+from ..utils.cache import MemoryCacheManager
+
+from .redis import DocumentCache, MISSING
 from .dos import DocumentStorage
 
+from .t_base import CacheTask, BatchTask, probe_cache
+
 
-class DocTask(DbTask):
+class DocTask(CacheTask):
 
     MEM_CACHE_EXPIRES = 300  # seconds
     MEM_CACHE_REFRESH = 32   # seconds
@@ -61,7 +64,9 @@ class DocTask(DbTask):
     # Override
     async def _load_redis_cache(self) -> Optional[List[Document]]:
         docs = await self._redis.load_documents(identifier=self._identifier)
-        if docs is None or len(docs) == 0:
+        if docs is None or docs is MISSING:
+            return docs
+        elif len(docs) == 0:
             return None
         else:
             return docs
@@ -82,6 +87,40 @@ class DocTask(DbTask):
     async def _save_local_storage(self, value: List[Document]) -> bool:
         return await self._dos.save_documents(documents=value, identifier=self._identifier)
 
+    # Override
+    async def _save_redis_missing(self) -> bool:
+        return await self._redis.save_documents_missing(identifiers=[self._identifier])
+
+
+class DocBatchTask(BatchTask):
+
+    def __init__(self, cache_pool: CachePool, redis: DocumentCache, storage: DocumentStorage,
+                 mutex_lock: threading.Lock):
+        super().__init__(cache_pool=cache_pool, cache_expires=DocTask.MEM_CACHE_EXPIRES, mutex_lock=mutex_lock)
+        self._redis = redis
+        self._dos = storage
+
+    # Override
+    async def _load_redis_caches(self, keys: List[ID]) -> Dict[ID, List[Document]]:
+        documents = await self._redis.load_documents_many(identifiers=keys)
+        return {identifier: docs for identifier, docs in documents.items() if docs is MISSING or len(docs) > 0}
+
+    # Override
+    async def _save_redis_caches(self, values: Dict[ID, List[Document]]) -> bool:
+        return await self._redis.save_documents_many(documents=values)
+
+    # Override
+    async def _save_redis_missing(self, keys: List[ID]) -> bool:
+        return await self._redis.save_documents_missing(identifiers=keys)
+
+    # Override
+    async def _load_local_storage(self, key: ID) -> Optional[List[Document]]:
+        docs = await self._dos.load_documents(identifier=key)
+        if docs is None or len(docs) == 0:
+            return None
+        else:
+            return docs
+
 
 class ScanTask(DbTask):
 
@@ -125,8 +164,10 @@ class DocumentTable(DocumentDBI):
 
     def __init__(self, config: Config):
         super().__init__()
-        man = SharedCacheManager()
-        self._cache = man.get_pool(name='documents')  # ID => List[Document]
+        man = MemoryCacheManager()
+        self._cache = man.get_pool(name='documents', config=config)  # ID => List[Document]
+        # all documents for Search Engine, too large to be estimated
+        self._scan_cache = man.get_pool(name='documents.all', config=config, max_items=1, max_bytes=0)
         self._redis = DocumentCache(config=config)
         self._dos = DocumentStorage(config=config)
         self._lock = threading.Lock()
@@ -139,8 +180,12 @@ class DocumentTable(DocumentDBI):
                        cache_pool=self._cache, redis=self._redis, storage=self._dos,
                        mutex_lock=self._lock)
 
+    def _new_batch_task(self) -> DocBatchTask:
+        return DocBatchTask(cache_pool=self._cache, redis=self._redis, storage=self._dos,
+                            mutex_lock=self._lock)
+
     def _new_scan_task(self) -> ScanTask:
-        return ScanTask(cache_pool=self._cache, storage=self._dos,
+        return ScanTask(cache_pool=self._scan_cache, storage=self._dos,
                         mutex_lock=self._lock)
 
     #
@@ -167,7 +212,7 @@ class DocumentTable(DocumentDBI):
         my_documents.append(document)
         # update cache for Search Engine
         with self._lock:
-            all_documents, _ = self._cache.fetch(key=ScanTask.ALL_KEY)
+            all_documents, _ = self._scan_cache.fetch(key=ScanTask.ALL_KEY)
             if all_documents is not None:
                 assert isinstance(all_documents, List), 'all_documents error: %s' % all_documents
                 all_documents.append(document)
@@ -179,13 +224,21 @@ class DocumentTable(DocumentDBI):
 
     # Override
     async def get_documents(self, identifier: ID) -> List[Document]:
-        #
-        #  build task for loading
-        #
-        task = self._new_doc_task(identifier=identifier)
-        docs = await task.load()
+        cached, docs = probe_cache(cache_pool=self._cache, key=identifier)
+        if not cached:
+            #
+            #  build task for loading
+            #
+            task = self._new_doc_task(identifier=identifier)
+            docs = await task.load()
         return [] if docs is None else docs
 
+    async def get_documents_many(self, identifiers: List[ID]) -> Dict[ID, List[Document]]:
+        """ get documents for many entities, with one redis round-trip """
+        task = self._new_batch_task()
+        results = await task.load(keys=identifiers)
+        return {identifier: ([] if docs is None else docs) for identifier, docs in results.items()}
+
     async def scan_documents(self) -> List[Document]:
         """ Scan all documents from data directory """
         task = self._new_scan_task()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2019 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+import threading
+from typing import Optional, List, Dict
+
+from aiou.mem import CachePool
+
+from dimples import ID, Meta
+from dimples.utils import Config
+from dimples.database import MetaTable as SuperTable
+from dimples.database.t_meta import TaiTask
+
+from ..utils.cache import MemoryCacheManager
+
+from .redis import MetaCache
+from .dos import MetaStorage
+
+from .t_base import BatchTask
+
+
+class MetaBatchTask(BatchTask):
+
+    def __init__(self, cache_pool: CachePool, redis: MetaCache, storage: MetaStorage,
+                 mutex_lock: threading.Lock):
+        super().__init__(cache_pool=cache_pool, cache_expires=TaiTask.MEM_CACHE_EXPIRES, mutex_lock=mutex_lock)
+        self._redis = redis
+        self._dos = storage
+
+    # Override
+    async def _load_redis_caches(self, keys: List[ID]) -> Dict[ID, Meta]:
+        return await self._redis.get_metas_many(identifiers=keys)
+
+    # Override
+    async def _save_redis_caches(self, values: Dict[ID, Meta]) -> bool:
+        return await self._redis.save_metas_many(metas=values)
+
+    # Override
+    async def _load_local_storage(self, key: ID) -> Optional[Meta]:
+        return await self._dos.get_meta(identifier=key)
+
+
+class MetaTable(SuperTable):
+
+    def __init__(self, config: Config):
+        super().__init__(config=config)
+        # bounded memory cache
+        self._cache = MemoryCacheManager().get_pool(name='meta', config=config)
+        # redis cache with batch access
+        self._redis = MetaCache(config=config)
+
+    def _new_batch_task(self) -> MetaBatchTask:
+        return MetaBatchTask(cache_pool=self._cache, redis=self._redis, storage=self._dos,
+                             mutex_lock=self._lock)
+
+    async def get_metas_many(self, identifiers: List[ID]) -> Dict[ID, Optional[Meta]]:
+        """ get metas for many entities, with one redis round-trip """
+        task = self._new_batch_task()
+        metas = await task.load(keys=identifiers)
+        # same as 'get_meta()', check missed metas again after 5 minutes
+        with self._lock:
+            for identifier, meta in metas.items():
+                if meta is None:
+                    self._cache.update(key=identifier, value=None, life_span=300)
+        return metas
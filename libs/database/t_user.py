@@ -24,23 +24,26 @@
 # ==============================================================================
 
 import threading
-from typing import Optional, List
+from abc import ABC
+from typing import Optional, List, Dict
 
 from aiou.mem import CachePool
 
 from dimples import ID, Command
 from dimples import BlockCommand, MuteCommand
 from dimples.utils import is_before
-from dimples.utils import SharedCacheManager
 from dimples.database import UserDBI, ContactDBI
 from dimples.utils import Config
-from dimples.database import DbTask
+
+from ..utils.cache import MemoryCacheManager
 
 from .redis import UserCache
 from .dos import UserStorage
 
+from .t_base import CacheTask, BatchTask, probe_cache
+
 
-class UsrTask(DbTask):
+class UsrTask(CacheTask):
 
     MEM_CACHE_EXPIRES = 300  # seconds
     MEM_CACHE_REFRESH = 32   # seconds
@@ -114,6 +117,10 @@ class BloTask(UsrTask):
     async def _save_local_storage(self, value: BlockCommand) -> bool:
         return await self._dos.save_block_command(content=value, identifier=self._user)
 
+    # Override
+    async def _save_redis_missing(self) -> bool:
+        return await self._redis.save_block_commands_missing(identifiers=[self._user])
+
 
 class MutTask(UsrTask):
 
@@ -133,17 +140,68 @@ class MutTask(UsrTask):
     async def _save_local_storage(self, value: MuteCommand) -> bool:
         return await self._dos.save_mute_command(content=value, identifier=self._user)
 
+    # Override
+    async def _save_redis_missing(self) -> bool:
+        return await self._redis.save_mute_commands_missing(identifiers=[self._user])
+
+
+class UsrBatchTask(BatchTask, ABC):
+
+    def __init__(self, cache_pool: CachePool, redis: UserCache, storage: UserStorage,
+                 mutex_lock: threading.Lock):
+        super().__init__(cache_pool=cache_pool, cache_expires=UsrTask.MEM_CACHE_EXPIRES, mutex_lock=mutex_lock)
+        self._redis = redis
+        self._dos = storage
+
+
+class BloBatchTask(UsrBatchTask):
+
+    # Override
+    async def _load_redis_caches(self, keys: List[ID]) -> Dict[ID, BlockCommand]:
+        return await self._redis.get_block_commands_many(identifiers=keys)
+
+    # Override
+    async def _save_redis_caches(self, values: Dict[ID, BlockCommand]) -> bool:
+        return await self._redis.save_block_commands_many(contents=values)
+
+    # Override
+    async def _load_local_storage(self, key: ID) -> Optional[BlockCommand]:
+        return await self._dos.get_block_command(identifier=key)
+
+    # Override
+    async def _save_redis_missing(self, keys: List[ID]) -> bool:
+        return await self._redis.save_block_commands_missing(identifiers=keys)
+
+
+class MutBatchTask(UsrBatchTask):
+
+    # Override
+    async def _load_redis_caches(self, keys: List[ID]) -> Dict[ID, MuteCommand]:
+        return await self._redis.get_mute_commands_many(identifiers=keys)
+
+    # Override
+    async def _save_redis_caches(self, values: Dict[ID, MuteCommand]) -> bool:
+        return await self._redis.save_mute_commands_many(contents=values)
+
+    # Override
+    async def _load_local_storage(self, key: ID) -> Optional[MuteCommand]:
+        return await self._dos.get_mute_command(identifier=key)
+
+    # Override
+    async def _save_redis_missing(self, keys: List[ID]) -> bool:
+        return await self._redis.save_mute_commands_missing(identifiers=keys)
+
 
 class UserTable(UserDBI, ContactDBI):
     """ Implementations of UserDBI """
 
     def __init__(self, config: Config):
         super().__init__()
-        man = SharedCacheManager()
-        self._cmd_contacts = man.get_pool(name='cmd.contacts')  # ID => StorageCommand
-        self._cmd_block = man.get_pool(name='cmd.block')        # ID => BlockCommand
-        self._cmd_mute = man.get_pool(name='cmd.mute')          # ID => MuteCommand
-        self._cache = man.get_pool(name='contacts')             # ID => List[ID]
+        man = MemoryCacheManager()
+        self._cmd_contacts = man.get_pool(name='cmd.contacts', config=config)  # ID => StorageCommand
+        self._cmd_block = man.get_pool(name='cmd.block', config=config)        # ID => BlockCommand
+        self._cmd_mute = man.get_pool(name='cmd.mute', config=config)          # ID => MuteCommand
+        self._cache = man.get_pool(name='contacts', config=config)             # ID => List[ID]
         self._redis = UserCache(config=config)
         self._dos = UserStorage(config=config)
         self._lock = threading.Lock()
@@ -167,6 +225,14 @@ class UserTable(UserDBI, ContactDBI):
         return MutTask(user=user, cache_pool=self._cmd_mute,
                        redis=self._redis, storage=self._dos, mutex_lock=self._lock)
 
+    def _new_blo_batch_task(self) -> BloBatchTask:
+        return BloBatchTask(cache_pool=self._cmd_block,
+                            redis=self._redis, storage=self._dos, mutex_lock=self._lock)
+
+    def _new_mut_batch_task(self) -> MutBatchTask:
+        return MutBatchTask(cache_pool=self._cmd_mute,
+                            redis=self._redis, storage=self._dos, mutex_lock=self._lock)
+
     #
     #   User DBI
     #
@@ -185,8 +251,10 @@ class UserTable(UserDBI, ContactDBI):
 
     # Override
     async def get_contacts(self, user: ID) -> List[ID]:
-        task = self._new_task(user=user)
-        contacts = await task.load()
+        cached, contacts = probe_cache(cache_pool=self._cache, key=user)
+        if not cached:
+            task = self._new_task(user=user)
+            contacts = await task.load()
         return [] if contacts is None else contacts
 
     # Override
@@ -218,6 +286,9 @@ class UserTable(UserDBI, ContactDBI):
         return await task.save(value=content)
 
     async def get_contacts_command(self, identifier: ID) -> Optional[Command]:
+        cached, content = probe_cache(cache_pool=self._cmd_contacts, key=identifier)
+        if cached:
+            return content
         task = self._new_con_task(user=identifier)
         return await task.load()
 
@@ -245,9 +316,17 @@ class UserTable(UserDBI, ContactDBI):
         return await task.save(value=content)
 
     async def get_block_command(self, identifier: ID) -> Optional[BlockCommand]:
+        cached, content = probe_cache(cache_pool=self._cmd_block, key=identifier)
+        if cached:
+            return content
         task = self._new_blo_task(user=identifier)
         return await task.load()
 
+    async def get_block_commands_many(self, identifiers: List[ID]) -> Dict[ID, Optional[BlockCommand]]:
+        """ get block commands for many users, with one redis round-trip """
+        task = self._new_blo_batch_task()
+        return await task.load(keys=identifiers)
+
     #
     #   Mute List
     #
@@ -272,5 +351,13 @@ class UserTable(UserDBI, ContactDBI):
         return await task.save(value=content)
 
     async def get_mute_command(self, identifier: ID) -> Optional[MuteCommand]:
+        cached, content = probe_cache(cache_pool=self._cmd_mute, key=identifier)
+        if cached:
+            return content
         task = self._new_mut_task(user=identifier)
         return await task.load()
+
+    async def get_mute_commands_many(self, identifiers: List[ID]) -> Dict[ID, Optional[MuteCommand]]:
+        """ get mute commands for many users, with one redis round-trip """
+        task = self._new_mut_batch_task()
+        return await task.load(keys=identifiers)
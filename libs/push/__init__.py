@@ -30,12 +30,14 @@
 """
 
 from .manager import PushNotificationService, PushNotificationClient
+from .feedback import DeviceFeedback
 from .android_pns import AndroidPushNotificationService
 from .apple_pns import ApplePushNotificationService
 
 __all__ = [
 
     'PushNotificationService', 'PushNotificationClient',
+    'DeviceFeedback',
 
     'AndroidPushNotificationService',
     'ApplePushNotificationService',
@@ -10,6 +10,7 @@
 
 import firebase_admin
 from firebase_admin import credentials
+from firebase_admin import exceptions
 from firebase_admin import messaging
 
 from dimples import DateTime
@@ -20,6 +21,7 @@ from ..common import PushInfo
 from ..database import DeviceInfo
 
 from .manager import PushNotificationService
+from .feedback import DeviceFeedback
 
 
 class AndroidPushNotificationService(PushNotificationService, Logging):
@@ -59,6 +61,7 @@ class AndroidPushNotificationService(PushNotificationService, Logging):
             now = DateTime.current_timestamp()
             message = messaging.Message(
                 android=messaging.AndroidConfig(
+                    collapse_key=notification.tag,
                     notification=notification,
                     data={
                         'badge_count': badge,
@@ -72,15 +75,21 @@ class AndroidPushNotificationService(PushNotificationService, Logging):
             )
             # send message
             return messaging.send(message)
+        except exceptions.NotFoundError:
+            # NOT_FOUND / UNREGISTERED: the device token is no longer valid,
+            # let the caller remove it
+            raise
         except Exception as e:
             self.error(msg='failed to push notification: %s' % e)
 
-    def send_message(self, title: str, body: str, image: str, badge: int, sound: str, token: str):
+    def send_message(self, title: str, body: str, image: str, badge: int, sound: str, token: str,
+                     tag: str = None):
         notification = messaging.AndroidNotification(
             title=title,
             body=body,
             sound=sound,
             image=image,
+            tag=tag,
             notification_count=badge,
         )
         responses = self.send_notification(notification=notification, token=token)
@@ -99,6 +108,7 @@ class AndroidPushNotificationService(PushNotificationService, Logging):
         image = aps.image
         badge = aps.badge
         sound = aps.sound
+        tag = aps.collapse_id
         # 2. check channel
         channel = device.channel
         platform = device.platform
@@ -109,5 +119,14 @@ class AndroidPushNotificationService(PushNotificationService, Logging):
             self.warning(msg='C2DM channel not support yet: %s, %s' % (channel, receiver))
             return False
         token = device.token
-        res = self.send_message(title=title, body=content, image=image, badge=badge, sound=sound, token=token)
-        return res is not None
+        try:
+            res = self.send_message(title=title, body=content, image=image, badge=badge, sound=sound, token=token,
+                                    tag=tag)
+        except exceptions.NotFoundError as error:
+            self.error(msg='invalid device token: %s, error: %s' % (token, error))
+            await DeviceFeedback().token_invalid(token=token, receiver=receiver, reason='FCM: %s' % error.code)
+            return False
+        if res is None:
+            return False
+        DeviceFeedback().token_valid(token=token)
+        return True
@@ -39,7 +39,7 @@
 from typing import Optional
 
 from apns2.client import APNsClient, NotificationPriority
-from apns2.errors import APNsException
+from apns2.errors import APNsException, Unregistered, BadDeviceToken
 from apns2.payload import Payload, PayloadAlert
 
 from dimples import ID
@@ -49,6 +49,7 @@ from ..common import PushInfo
 from ..database import DeviceInfo
 
 from .manager import PushNotificationService
+from .feedback import DeviceFeedback
 
 
 class ApplePushNotificationService(PushNotificationService, Logging):
@@ -115,6 +116,13 @@ class ApplePushNotificationService(PushNotificationService, Logging):
         except IOError as error:
             self.error('connection lost: %s, sandbox: %s' % (error, sandbox))
             return -408  # Request Timeout
+        except Unregistered as error:
+            self.error('invalid device token: %s, error %s' % (token_hex, error))
+            return -410  # Gone
+        except BadDeviceToken as error:
+            # maybe the token is for the other environment (sandbox/production)
+            self.error('bad device token: %s, sandbox: %s, error %s' % (token_hex, sandbox, error))
+            return -421  # Misdirected Request
         except APNsException as error:
             self.error('failed to push notification: %s, error %s' % (notification, error))
             return -400  # Bad Request
@@ -131,6 +139,7 @@ class ApplePushNotificationService(PushNotificationService, Logging):
         image = aps.image
         badge = aps.badge
         sound = aps.sound
+        collapse_id = aps.collapse_id
         # 2. send
         alert = PayloadAlert(title=title, body=content, launch_image=image)
         payload = Payload(alert=alert, badge=badge, sound=sound)
@@ -148,7 +157,8 @@ class ApplePushNotificationService(PushNotificationService, Logging):
         if sandbox is None:
             sandbox = self.use_sandbox
         # first try
-        result = self.send_notification(notification=payload, token_hex=token, topic=topic, sandbox=sandbox)
+        result = self.send_notification(notification=payload, token_hex=token, topic=topic, sandbox=sandbox,
+                                        collapse_id=collapse_id)
         if result == -503:  # Service Unavailable
             # connection failed
             return False
@@ -160,7 +170,19 @@ class ApplePushNotificationService(PushNotificationService, Logging):
             else:
                 self.__client_prod = None
             # try again
-            result = self.send_notification(notification=payload, token_hex=token, topic=topic, sandbox=sandbox)
+            result = self.send_notification(notification=payload, token_hex=token, topic=topic, sandbox=sandbox,
+                                            collapse_id=collapse_id)
+        if result == -421:  # Misdirected Request
+            # a token from development build is bad for production, and vice versa,
+            # so try the other environment before reporting it
+            self.warning(msg='try %s environment for %s' % ('production' if sandbox else 'sandbox', receiver))
+            result = self.send_notification(notification=payload, token_hex=token, topic=topic, sandbox=not sandbox,
+                                            collapse_id=collapse_id)
         if result == 200:  # OK
             self.info(msg='notification sent for %s, badge=%d' % (receiver, badge))
+            DeviceFeedback().token_valid(token=token)
             return True
+        elif result == -410:  # Gone
+            await DeviceFeedback().token_invalid(token=token, receiver=receiver, reason='APNs: Unregistered')
+        elif result == -421:  # Misdirected Request
+            await DeviceFeedback().token_invalid(token=token, receiver=receiver, reason='APNs: BadDeviceToken')
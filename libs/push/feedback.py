@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2019 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+"""
+    Device Token Feedback
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Collect invalid-token responses from APNs/FCM and remove dead tokens
+"""
+
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple, Dict
+
+from dimples import ID
+
+from ..utils import Singleton, Logging
+
+
+@Singleton
+class DeviceFeedback(Logging):
+
+    class Delegate(ABC):
+        """
+            Feedback Delegate
+            ~~~~~~~~~~~~~~~~~
+        """
+
+        @abstractmethod
+        async def remove_device(self, token: str, identifier: ID) -> bool:
+            """ remove device with token """
+            pass
+
+    # remove the token after failed so many times
+    MAX_FAILURES = 3
+
+    # forget failures of the token not failed again in a week
+    FAILURES_EXPIRES = 3600 * 24 * 7
+    # max tokens with failures, the least recently failed will be forgot
+    MAX_TOKENS = 1 << 16
+
+    # keep daily stats for one week
+    STATS_DAYS = 7
+
+    def __init__(self):
+        super().__init__()
+        # delegate to remove device token
+        self.__delegate: Optional[weakref.ReferenceType] = None  # Feedback Delegate
+        # token => (failures, last failed time), least recently failed first
+        self.__failures: OrderedDict[str, Tuple[int, float]] = OrderedDict()
+        # 'YYYY-mm-dd' => count
+        self.__pruned: Dict[str, int] = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def delegate(self) -> Delegate:
+        if self.__delegate is not None:
+            return self.__delegate()
+
+    @delegate.setter
+    def delegate(self, value: Delegate):
+        self.__delegate = weakref.ref(value)
+
+    def failures(self, token: str) -> int:
+        """ get failure count of the device token """
+        with self.__lock:
+            pair = self.__failures.get(token)
+            return 0 if pair is None else pair[0]
+
+    def pruned(self, day: str = None) -> int:
+        """ get count of tokens pruned in the day ('YYYY-mm-dd', default is today) """
+        if day is None:
+            day = _today()
+        with self.__lock:
+            return self.__pruned.get(day, 0)
+
+    def pruned_stats(self) -> Dict[str, int]:
+        """ get count of tokens pruned per day """
+        with self.__lock:
+            return self.__pruned.copy()
+
+    def token_valid(self, token: str):
+        """ push success, reset failure counter for this token """
+        with self.__lock:
+            self.__failures.pop(token, None)
+
+    async def token_invalid(self, token: str, receiver: ID, reason: str = None) -> bool:
+        """
+        Push failed with invalid token (APNs: Unregistered, BadDeviceToken;
+        FCM: NOT_FOUND, UNREGISTERED), remove it after too many failures.
+
+        :param token:    device token
+        :param receiver: user ID
+        :param reason:   error from push service
+        :return: True on token removed
+        """
+        now = time.time()
+        with self.__lock:
+            pair = self.__failures.pop(token, None)
+            count = 1 if pair is None else pair[0] + 1
+            if count < self.MAX_FAILURES:
+                self.__failures[token] = (count, now)
+                self.__purge_failures(now=now)
+                count = 0
+        if count == 0:
+            self.warning(msg='invalid device token: %s, user: %s, error: %s' % (token, receiver, reason))
+            return False
+        delegate = self.delegate
+        if delegate is None:
+            self.error(msg='feedback delegate not set, cannot remove device token: %s, %s' % (token, receiver))
+            return False
+        elif not await delegate.remove_device(token=token, identifier=receiver):
+            self.error(msg='failed to remove device token: %s, user: %s' % (token, receiver))
+            return False
+        # increase daily counter
+        with self.__lock:
+            today = _today()
+            if today not in self.__pruned and len(self.__pruned) > 0:
+                # first one today, report the last day
+                last = max(self.__pruned.keys())
+                self.info(msg='device tokens pruned on %s: %d' % (last, self.__pruned[last]))
+            self.__pruned[today] = self.__pruned.get(today, 0) + 1
+            total = self.__pruned[today]
+            _purge_stats(stats=self.__pruned, days=self.STATS_DAYS)
+        self.warning(msg='device token removed after %d failures: %s, user: %s, error: %s, pruned today: %d'
+                         % (count, token, receiver, reason, total))
+        return True
+
+    def __purge_failures(self, now: float):
+        failures = self.__failures
+        expired = now - self.FAILURES_EXPIRES
+        while len(failures) > 0:
+            token, pair = next(iter(failures.items()))
+            if len(failures) > self.MAX_TOKENS or pair[1] < expired:
+                failures.pop(token)
+            else:
+                break
+
+
+def _today() -> str:
+    return time.strftime('%Y-%m-%d', time.localtime())
+
+
+def _purge_stats(stats: Dict[str, int], days: int):
+    if len(stats) <= days:
+        return
+    # 'YYYY-mm-dd' sorted by date
+    keys = sorted(stats.keys())
+    for day in keys[:len(keys) - days]:
+        stats.pop(day, None)
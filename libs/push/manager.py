@@ -10,7 +10,7 @@
 import threading
 import weakref
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 from dimples import DateTime
 from dimples import ID
@@ -60,6 +60,11 @@ class PushNotificationClient(Runner, Logging):
             """ get devices with token in hex format """
             pass
 
+        @abstractmethod
+        async def get_devices_many(self, identifiers: List[ID]) -> Dict[ID, Optional[List[DeviceInfo]]]:
+            """ get devices for many users at once """
+            pass
+
     def __init__(self):
         super().__init__(interval=Runner.INTERVAL_SLOW)
         self.__apple: Optional[PushNotificationService] = None
@@ -121,16 +126,25 @@ class PushNotificationClient(Runner, Logging):
         if task.is_expired:
             self.warning(msg='task expired, drop %d item(s).' % len(array))
             array = []
+        if len(array) == 0:
+            return True
+        # get devices for all receivers in one round-trip
+        try:
+            receivers = [item.receiver for item in array]
+            all_devices = await self.delegate.get_devices_many(identifiers=receivers)
+        except Exception as error:
+            self.error(msg='failed to get devices for %d item(s): %s' % (len(array), error))
+            return True
         # push items
         for item in array:
+            receiver = item.receiver
             try:
-                await self.__push(aps=item.info, receiver=item.receiver)
+                await self.__push(aps=item.info, receiver=receiver, devices=all_devices.get(receiver))
             except Exception as error:
                 self.error(msg='push error: %s, item: %s' % (error, item))
         return True
 
-    async def __push(self, aps: PushInfo, receiver: ID) -> bool:
-        devices = await self.delegate.get_devices(identifier=receiver)
+    async def __push(self, aps: PushInfo, receiver: ID, devices: Optional[List[DeviceInfo]]) -> bool:
         if devices is None or len(devices) == 0:
             self.warning('cannot get device token for user %s' % receiver)
             return False
@@ -47,6 +47,10 @@ from .processor import ServerProcessorCreator
 
 from .emitter import ServerEmitter
 from .monitor import Monitor
+from .drain import SessionDrainer
+from .reaper import SessionReaper
+from .quota import SessionQuota
+from .changes import SessionChangeWriter
 from .push import DefaultPushService
 
 
@@ -76,5 +80,9 @@ __all__ = [
 
     'ServerEmitter',
     'Monitor',
+    'SessionDrainer',
+    'SessionReaper',
+    'SessionQuota',
+    'SessionChangeWriter',
 
 ]
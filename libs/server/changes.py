@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2024 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+"""
+    Session Changes
+    ~~~~~~~~~~~~~~~
+
+    Store socket addresses for users changed by sessions
+"""
+
+import threading
+import time
+from typing import Optional, Tuple, List
+
+from dimples import ID
+from dimples.server import ServerSession
+
+from ..utils import Singleton, Logging
+from ..utils import Runner
+from ..database import Database
+
+
+@Singleton
+class SessionChangeWriter(Runner, Logging):
+    """
+        Session Change Writer
+        ~~~~~~~~~~~~~~~~~~~~~
+
+        Changes of sessions (ID set, active toggled) are queued as
+        (ID, socket address, online) in the order they happened,
+        instead of spawning a task for each change;
+        one writer applies them in batches, and stores the socket addresses
+        of all users changed in a batch with one round-trip to Redis,
+        so 'ID changed' is always committed before the 'active' toggle
+        following it in the same session.
+    """
+
+    BATCH_SIZE = 1024
+
+    def __init__(self):
+        super().__init__(interval=Runner.INTERVAL_SLOW)
+        self.__changes: List[Tuple[Database, ID, Tuple[str, int], bool]] = []
+        self.__busy = False
+        self.__lock = threading.Lock()
+        # auto start
+        self.start()
+
+    def start(self):
+        thr = Runner.async_thread(coro=self.run())
+        thr.start()
+
+    def id_changed(self, session: ServerSession, new_id: Optional[ID], old_id: Optional[ID]):
+        db = session.database
+        assert isinstance(db, Database), 'database error: %s' % db
+        remote = session.remote_address
+        with self.__lock:
+            if old_id is not None:
+                # remove socket address for old user
+                self.__changes.append((db, old_id, remote, False))
+            if new_id is not None:  # and session.active:
+                # store socket address for new user
+                self.__changes.append((db, new_id, remote, True))
+
+    def active_changed(self, session: ServerSession, active: bool):
+        identifier = session.identifier
+        if identifier is None:
+            # user not login yet
+            return
+        db = session.database
+        assert isinstance(db, Database), 'database error: %s' % db
+        remote = session.remote_address
+        with self.__lock:
+            self.__changes.append((db, identifier, remote, active))
+
+    @property
+    def pending(self) -> int:
+        with self.__lock:
+            return len(self.__changes)
+
+    async def flush(self, timeout: float = 10) -> bool:
+        """ wait for all pending changes committed (before shutdown) """
+        expired = time.time() + timeout
+        while self.__busy or self.pending > 0:
+            if time.time() > expired:
+                self.error(msg='[SESSION] flush timeout, pending changes: %d' % self.pending)
+                return False
+            await Runner.sleep(seconds=Runner.INTERVAL_SLOW)
+        return True
+
+    # Override
+    async def process(self) -> bool:
+        with self.__lock:
+            changes = self.__changes[:self.BATCH_SIZE]
+            if len(changes) == 0:
+                return False
+            del self.__changes[:self.BATCH_SIZE]
+            self.__busy = True
+        try:
+            # all sessions share the same database, split the batch just in case
+            start = 0
+            while start < len(changes):
+                db = changes[start][0]
+                end = start + 1
+                while end < len(changes) and changes[end][0] is db:
+                    end += 1
+                array = [(identifier, remote, online) for _, identifier, remote, online in changes[start:end]]
+                count = await db.update_socket_addresses(changes=array)
+                self.info(msg='[SESSION] %d change(s) committed for %d user(s)' % (len(array), count))
+                start = end
+        except Exception as error:
+            self.error(msg='[SESSION] failed to commit %d change(s): %s' % (len(changes), error))
+        finally:
+            self.__busy = False
+        return True
@@ -23,7 +23,7 @@
 # SOFTWARE.
 # ==============================================================================
 
-from typing import List
+from typing import Optional, Tuple, List
 
 from dimples import ReliableMessage
 from dimples import Content, HandshakeCommand
@@ -43,7 +43,32 @@ class ServerHandshakeProcessor(HandshakeCommandProcessor):
         title = content.title
         if title == self.ASK_LOGIN:
             # C -> S: Hello world!
-            return await super().process_content(content=content, r_msg=r_msg)
+            responses = await super().process_content(content=content, r_msg=r_msg)
+            formats = content.get('mtp')
+            if isinstance(formats, List):
+                # C -> S: 'mtp': ['dmtp', 'json']
+                # S -> C: 'mtp': 'dmtp'
+                # the client should accept the chosen format from this response
+                mtp = self._negotiate_format(formats=formats)
+                for res in responses:
+                    if isinstance(res, HandshakeCommand):
+                        res['mtp'] = mtp
+            algorithms = content.get('compress')
+            if isinstance(algorithms, List):
+                # C -> S: 'compress': ['zstd', 'zlib'], 'compress_dict': 12345678
+                # S -> C: 'compress': 'zstd', 'compress_dict': 12345678
+                # 'compress_dict' is the ID of the shared dictionary, it will be
+                # responded only when both sides have the same one
+                dict_id = content.get('compress_dict')
+                if not isinstance(dict_id, int):
+                    dict_id = 0
+                algorithm, dict_id = self._negotiate_compression(algorithms=algorithms, dictionary_id=dict_id)
+                for res in responses:
+                    if isinstance(res, HandshakeCommand):
+                        res['compress'] = algorithm
+                        if dict_id != 0:
+                            res['compress_dict'] = dict_id
+            return responses
         elif title == self.TEST_SPEED:
             # C -> S: Nice to meet you!
             messenger = self.messenger
@@ -63,3 +88,25 @@ class ServerHandshakeProcessor(HandshakeCommandProcessor):
                     'title': title,
                 }
             })
+
+    def _negotiate_format(self, formats: List[str]) -> str:
+        """ let the packer (ServerPacker) choose message format """
+        packer = self.messenger.packer
+        negotiate = getattr(packer, 'negotiate', None)
+        if negotiate is None:
+            # packer not support D-MTP
+            return 'json'
+        return negotiate(formats=formats)
+
+    def _negotiate_compression(self, algorithms: List[str], dictionary_id: int) -> Tuple[Optional[str], int]:
+        """ let the packer (ServerPacker) choose compression algorithm """
+        packer = self.messenger.packer
+        negotiate = getattr(packer, 'negotiate_compression', None)
+        if negotiate is None:
+            # packer not support compression
+            return None, 0
+        algorithm = negotiate(algorithms=algorithms, dictionary_id=dictionary_id)
+        session = self.messenger.session
+        if algorithm is None or not getattr(session, 'compress_dict', False):
+            return algorithm, 0
+        return algorithm, dictionary_id
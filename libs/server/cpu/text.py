@@ -30,11 +30,12 @@
     Text commands
 """
 
+import heapq
 import random
 import threading
 import weakref
 from socketserver import StreamRequestHandler
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, List, Dict, Iterable
 
 from dimples import ID
 from dimples import ReliableMessage
@@ -43,6 +44,11 @@ from dimples import BaseContentProcessor
 from dimples.server import SessionCenter, ServerSession
 
 from ...utils import Singleton, Logging
+from ...utils.mtp import MTPStatistics
+from ...utils.cache import MemoryCacheManager
+
+from ..reaper import SessionReaper
+from ..quota import SessionQuota
 
 
 class TextContentProcessor(BaseContentProcessor, Logging):
@@ -59,67 +65,306 @@ class TextContentProcessor(BaseContentProcessor, Logging):
         self.info(msg='received text message from %s: "%s"' % (r_msg.sender, text))
         if text is None or len(text) == 0:
             return []
-        else:
-            text = text.lower()
         # text commands
-        if text == 'all users':
-            return _all_users()
-        if text == 'active users':
-            return _active_users()
-        if text == 'request handlers':
-            return _request_handlers()
+        text, options = parse_command(text=text)
+        if text in ['all users', 'active users', 'request handlers']:
+            page = Pagination(options=options)
+            if page.summary:
+                return _summary()
+            elif text == 'all users':
+                return _all_users(page=page)
+            elif text == 'active users':
+                return _active_users(page=page)
+            else:
+                return _request_handlers(page=page)
+        if text == 'mtp stats':
+            return _mtp_stats()
+        if text == 'cache stats':
+            return _cache_stats()
+        if text == 'session stats':
+            return _session_stats()
         # error
         return []
 
 
-def _all_users() -> List[Content]:
+def parse_command(text: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Split text command and options
+
+        'active users offset=100 limit=50 filter=moky stream'
+            => ('active users', {'offset': '100', 'limit': '50', 'filter': 'moky', 'stream': ''})
+
+    :param text: text content
+    :return: command in lowercase, and options (values are case-sensitive)
+    """
+    words = []
+    options = {}
+    for item in text.split():
+        pos = item.find('=')
+        if pos > 0:
+            options[item[:pos].lower()] = item[pos + 1:]
+        elif item.lower() in Pagination.FLAGS:
+            options[item.lower()] = ''
+        else:
+            words.append(item.lower())
+    return ' '.join(words), options
+
+
+class Pagination:
+    """
+        Pagination for Admin Views
+        ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+        options:
+            offset=0      - skip rows
+            limit=100     - max rows (default 100, or all rows when streaming)
+            filter=moky   - only rows containing this keyword (ignore case)
+            stream        - split rows into messages with 100 rows each
+            summary       - aggregated counts only
+    """
+
+    FLAGS = ['stream', 'summary']
+
+    LIMIT = 100       # rows in one message
+    PAGE_SIZE = 100   # rows in each message when streaming
+    MAX_ROWS = 10000  # rows for all messages when streaming
+
+    def __init__(self, options: Dict[str, str]):
+        super().__init__()
+        self.__stream = 'stream' in options
+        self.__summary = 'summary' in options
+        self.__offset = _get_number(value=options.get('offset'))
+        limit = _get_number(value=options.get('limit'))
+        if limit == 0:
+            limit = self.MAX_ROWS if self.__stream else self.LIMIT
+        self.__limit = min(limit, self.MAX_ROWS)
+        keyword = options.get('filter')
+        self.__keyword = keyword.lower() if keyword else None
+
+    @property
+    def stream(self) -> bool:
+        return self.__stream
+
+    @property
+    def summary(self) -> bool:
+        return self.__summary
+
+    def select(self, rows: Iterable[str]) -> Tuple[List[str], int]:
+        """ rows in this page, and count of all matched rows """
+        keyword = self.__keyword
+        start = self.__offset
+        end = start + self.__limit
+        page = []
+        total = 0
+        for item in rows:
+            if keyword is not None and keyword not in item.lower():
+                continue
+            if start <= total < end:
+                page.append(item)
+            total += 1
+        return page, total
+
+    def footer(self, count: int, total: int, name: str) -> str:
+        end = self.__offset + count
+        text = 'Rows %d-%d of %d %s.' % (self.__offset + 1 if count > 0 else 0, end, total, name)
+        if end < total:
+            text += ' Send "offset=%d" for more.' % end
+        return text
+
+    def contents(self, title: str, header: List[str], rows: List[str], footer: str) -> List[Content]:
+        """ build markdown contents, split into pages when streaming """
+        size = self.PAGE_SIZE if self.__stream else len(rows)
+        if size == 0 or len(rows) <= size:
+            pages = [rows]
+        else:
+            pages = [rows[start:start + size] for start in range(0, len(rows), size)]
+        contents = []
+        count = len(pages)
+        for index in range(count):
+            lines = [title if count == 1 else '%s (%d/%d)' % (title, index + 1, count), '']
+            if len(header) > 0:
+                lines.extend(header)
+            lines.extend(pages[index])
+            if index == count - 1:
+                lines.append('')
+                lines.append(footer)
+            content = TextContent.create(text='\n'.join(lines))
+            content['format'] = 'markdown'
+            contents.append(content)
+        return contents
+
+
+def _get_number(value: Optional[str]) -> int:
+    if value is None or not value.isdigit():
+        return 0
+    return int(value)
+
+
+def _all_users(page: Pagination) -> List[Content]:
     center = SessionCenter()
     all_users = center.all_users()
-    text = '%d users\n' % len(all_users)
-    text += '\n----\n'
+    # sorted, so the pages won't change between requests
+    rows, total = page.select(rows=('- %s' % user for user in sorted(all_users, key=str)))
+    footer = page.footer(count=len(rows), total=total, name='users')
+    return page.contents(title='%d users' % len(all_users), header=['----'], rows=rows, footer=footer)
+
+
+def _active_users(page: Pagination) -> List[Content]:
+    center = SessionCenter()
+    all_users = center.all_users()
+
+    def active_rows() -> Iterable[str]:
+        for user in sorted(all_users, key=str):
+            active_sessions = center.active_sessions(identifier=user)
+            if len(active_sessions) == 0:
+                continue
+            sockets = ' '.join(['_%s_' % str(sess.remote_address) for sess in active_sessions])
+            yield '| %s | %s |' % (user, sockets)
+
+    rows, total = page.select(rows=active_rows())
+    footer = page.footer(count=len(rows), total=total, name='active users')
+    return page.contents(title='Totally %d users' % len(all_users), header=['| ID | Sockets |', '|----|---------|'],
+                         rows=rows, footer=footer)
+
+
+def _request_handlers(page: Pagination) -> List[Content]:
+    marker = RequestHandlerMarker()
+    all_handlers = sorted(marker.all_handlers, key=lambda info: info.tag)
+    rows, total = page.select(rows=('| %d | _%s_ | %s |' % (info.tag, info.client_address, info.identifier)
+                                    for info in all_handlers))
+    footer = page.footer(count=len(rows), total=total, name='request handlers')
+    footer += '\n\n' + _top_sessions(sessions=marker.all_sessions, limit=TOP_SESSIONS)
+    return page.contents(title='Totally %d handlers' % len(all_handlers),
+                         header=['| Tag | Sockets | ID |', '|-----|---------|----|'], rows=rows, footer=footer)
+
+
+def _summary() -> List[Content]:
+    """ aggregated counts for users, sockets & handlers """
+    center = SessionCenter()
+    all_users = center.all_users()
+    active_users = 0
+    active_sockets = 0
     for user in all_users:
-        text += '- %s\n' % user
+        count = len(center.active_sessions(identifier=user))
+        if count > 0:
+            active_users += 1
+            active_sockets += count
+    marker = RequestHandlerMarker()
+    all_handlers = marker.all_handlers
+    anonymous = 0
+    for info in all_handlers:
+        if info.identifier is None:
+            anonymous += 1
+    lines = [
+        'Summary',
+        '',
+        '| Users | Active Users | Active Sockets | Handlers | Not Login |',
+        '|-------|--------------|----------------|----------|-----------|',
+        '| %d | %d | %d | %d | %d |' % (len(all_users), active_users, active_sockets, len(all_handlers), anonymous),
+        '',
+        _top_sessions(sessions=marker.all_sessions, limit=TOP_SESSIONS),
+    ]
+    content = TextContent.create(text='\n'.join(lines))
+    content['format'] = 'markdown'
+    return [content]
+
+
+TOP_SESSIONS = 10
+
+
+def _top_sessions(sessions: List[ServerSession], limit: int) -> str:
+    """ sessions holding most bytes for outgoing messages """
+    # 'pending_bytes' & 'pending_messages' are defined in the station's ServerSession
+    sessions = [item for item in sessions if hasattr(item, 'pending_bytes')]
+    total = 0
+    for item in sessions:
+        total += item.pending_bytes
+    stats = SessionQuota().stats
+    lines = [
+        'Top %d sessions by pending bytes' % limit,
+        '',
+        '| Sockets | ID | Messages | Bytes |',
+        '|---------|----|----------|-------|',
+    ]
+    for item in heapq.nlargest(limit, sessions, key=lambda sess: sess.pending_bytes):
+        lines.append('| _%s_ | %s | %d | %d |' % (item.remote_address, item.identifier,
+                                                 item.pending_messages, item.pending_bytes))
+    lines.append('')
+    lines.append('Pending %d bytes in %d sessions; refused %d messages (%d bytes), closed %d sessions.'
+                 % (total, len(sessions), stats['refused'], stats['refused_bytes'], stats['closed']))
+    lines.append('Limits: %d bytes, %d messages, close at %d bytes.'
+                 % (stats['max_bytes'], stats['max_messages'], stats['close_bytes']))
+    return '\n'.join(lines)
+
+
+def _mtp_stats() -> List[Content]:
+    summary = MTPStatistics().summary()
+    text = 'Message Transfer Protocol\n'
+    text += '\n'
+    text += '| Direction | Format | Messages | Bytes | Saved |\n'
+    text += '|-----------|--------|----------|-------|-------|\n'
+    for direction in ['sent', 'received']:
+        table = summary[direction]
+        for mtp in sorted(table.keys()):
+            counters = table[mtp]
+            text += '| %s | %s | %d | %d | %d |\n' % (direction, mtp, counters['messages'],
+                                                     counters['bytes'], counters['saved'])
+    text += '\n'
+    text += '"Saved" is estimated with sampled sizes in JsON.\n'
+    text += '\n'
+    text += '| Compression | Messages | Bytes | Saved | CPU (ms) |\n'
+    text += '|-------------|----------|-------|-------|----------|\n'
+    table = summary['compressed']
+    for name in sorted(table.keys()):
+        counters = table[name]
+        text += '| %s | %d | %d | %d | %.1f |\n' % (name, counters['messages'], counters['bytes'],
+                                                  counters['saved'], counters['cpu_ms'])
+    counters = summary['decompressed']
+    text += '| _decompressed_ | %d | %d | %d | %.1f |\n' % (counters['messages'], counters['bytes'],
+                                                         counters['saved'], counters['cpu_ms'])
     content = TextContent.create(text=text)
     content['format'] = 'markdown'
     return [content]
 
 
-def _active_users() -> List[Content]:
-    center = SessionCenter()
-    all_users = center.all_users()
-    text = 'Totally %d users\n' % len(all_users)
+def _cache_stats() -> List[Content]:
+    statistics = MemoryCacheManager().statistics()
+    text = 'Memory Caches\n'
     text += '\n'
-    text += '| ID | Sockets |\n'
-    text += '|----|---------|\n'
-    count = 0
-    for user in all_users:
-        active_sessions = center.active_sessions(identifier=user)
-        if len(active_sessions) == 0:
-            continue
-        else:
-            count += 1
-        text += '| %s |' % user
-        for sess in active_sessions:
-            text += ' _%s_' % str(sess.remote_address)
-        text += ' |\n'
+    text += '| Pool | Items | KB | Hits | Misses | Evictions | Expirations | Limits |\n'
+    text += '|------|-------|----|------|--------|-----------|-------------|--------|\n'
+    for name in sorted(statistics.keys()):
+        stats = statistics[name]
+        text += '| %s | %d | %d | %d | %d | %d | %d | %d, %d KB |\n' % (name, stats['items'], stats['bytes'] // 1024,
+                                                                      stats['hits'], stats['misses'],
+                                                                      stats['evictions'], stats['expirations'],
+                                                                      stats['max_items'], stats['max_bytes'] // 1024)
+    text += '\n'
+    text += '"KB" is estimated, "0" in limits means unlimited.\n'
+    text += '\n'
+    text += '| Pool | Redis probes avoided | Storage probes avoided |\n'
+    text += '|------|----------------------|------------------------|\n'
+    for name in sorted(statistics.keys()):
+        stats = statistics[name]
+        if stats['avoided_redis'] > 0 or stats['avoided_storage'] > 0:
+            text += '| %s | %d | %d |\n' % (name, stats['avoided_redis'], stats['avoided_storage'])
     text += '\n'
-    text += '%d active users.' % count
+    text += 'Probes avoided by caching the missing values.'
     content = TextContent.create(text=text)
     content['format'] = 'markdown'
     return [content]
 
 
-def _request_handlers() -> List[Content]:
-    marker = RequestHandlerMarker()
-    all_handlers = marker.all_handlers
-    text = 'Totally %d handlers\n' % len(all_handlers)
+def _session_stats() -> List[Content]:
+    stats = SessionReaper().stats
+    text = 'Session Reaper\n'
     text += '\n'
-    text += '| Tag | Sockets | ID |\n'
-    text += '|-----|---------|----|\n'
-    for info in all_handlers:
-        text += '| %d | _%s_ | %s |\n' % (info.tag, info.client_address, info.identifier)
+    text += '| Sessions | Added | Removed | Rescheduled | Handshake Closed | Idle Closed |\n'
+    text += '|----------|-------|---------|-------------|------------------|-------------|\n'
+    text += '| %d | %d | %d | %d | %d | %d |\n' % (stats['sessions'], stats['added'], stats['removed'],
+                                               stats['rescheduled'], stats['handshake_closed'], stats['idle_closed'])
     text += '\n'
-    text += '%d request handlers.' % len(all_handlers)
+    text += 'Timeouts: handshake %d seconds, idle %d seconds.' % (stats['handshake_timeout'], stats['idle_timeout'])
     content = TextContent.create(text=text)
     content['format'] = 'markdown'
     return [content]
@@ -148,45 +393,77 @@ class RequestHandlerInfo:
 
 @Singleton
 class RequestHandlerMarker(Logging):
+    """
+        Request Handlers
+        ~~~~~~~~~~~~~~~~
+
+        Handlers are kept by tags with weak references, each one has a
+        finalizer to remove itself after collected, so setup & remove
+        won't scan all handlers; listing works on a snapshot.
+    """
 
     def __init__(self):
         super().__init__()
-        self.__handlers = set()
-        self.__lock = threading.Lock()
+        self.__handlers: Dict[int, weakref.ReferenceType] = {}  # tag => handler
+        # reentrant, finalizers may run while the lock is held in the same thread
+        self.__lock = threading.RLock()
+
+    def __all_handlers(self) -> List[StreamRequestHandler]:
+        with self.__lock:
+            array = list(self.__handlers.values())
+        handlers = []
+        for ref in array:
+            item = ref()
+            if item is not None:
+                handlers.append(item)
+        return handlers
 
     @property
     def all_handlers(self) -> List[RequestHandlerInfo]:
-        with self.__lock:
-            handlers = []
-            array = self.__handlers.copy()
-            for ref in array:
-                item: StreamRequestHandler = ref()
-                if item is None:
-                    self.__handlers.remove(ref)
-                    continue
-                tag = getattr(item, '_cli_req_tag', 0)
-                client_address = item.client_address
-                identifier = _get_session_id(handler=item)
-                info = RequestHandlerInfo(tag=tag, client_address=client_address, identifier=identifier)
-                handlers.append(info)
-            return handlers
+        handlers = []
+        for item in self.__all_handlers():
+            tag = getattr(item, '_cli_req_tag', 0)
+            client_address = item.client_address
+            identifier = _get_session_id(handler=item)
+            info = RequestHandlerInfo(tag=tag, client_address=client_address, identifier=identifier)
+            handlers.append(info)
+        return handlers
 
     def setup_handler(self, handler: StreamRequestHandler):
         with self.__lock:
             tag = random.randint(2**30, 2**32 - 1)
+            while tag in self.__handlers:
+                tag = random.randint(2**30, 2**32 - 1)
             setattr(handler, '_cli_req_tag', tag)
-            ref = weakref.ref(handler)
-            self.__handlers.add(ref)
+            self.__handlers[tag] = weakref.ref(handler)
+        finalizer = weakref.finalize(handler, self.__discard, tag)
+        setattr(handler, '_cli_req_finalizer', finalizer)
+
+    def __discard(self, tag: int):
+        """ called by finalizer after handler collected """
+        with self.__lock:
+            ref = self.__handlers.get(tag)
+            if ref is not None and ref() is None:
+                self.__handlers.pop(tag, None)
 
     def remove_handler(self, handler: StreamRequestHandler):
+        finalizer = getattr(handler, '_cli_req_finalizer', None)
+        if finalizer is not None:
+            finalizer.detach()
+        tag = getattr(handler, '_cli_req_tag', None)
         with self.__lock:
-            array = self.__handlers.copy()
-            for ref in array:
-                item = ref()
-                if item is None:
-                    self.__handlers.remove(ref)
-                elif item == handler:
-                    self.__handlers.remove(ref)
+            ref = self.__handlers.get(tag)
+            if ref is not None and ref() is handler:
+                self.__handlers.pop(tag, None)
+
+    @property
+    def all_sessions(self) -> List[ServerSession]:
+        sessions = []
+        for item in self.__all_handlers():
+            session = _get_session(handler=item)
+            if session is not None:
+                sessions.append(session)
+        return sessions
 
     # noinspection PyMethodMayBeStatic
     def link_session(self, session: ServerSession, handler: StreamRequestHandler):
@@ -194,11 +471,14 @@ class RequestHandlerMarker(Logging):
         setattr(handler, '_session_ref', ref)
 
 
+def _get_session(handler) -> Optional[ServerSession]:
+    ref = getattr(handler, '_session_ref', None)
+    if ref is not None:
+        return ref()
+
+
 def _get_session_id(handler) -> Optional[ID]:
-    ref = getattr(handler, '_session_ref')
-    if ref is None:
-        return None
-    session: ServerSession = ref()
+    session = _get_session(handler=handler)
     if session is None:
         return None
     else:
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2023 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+"""
+    Graceful Drain
+    ~~~~~~~~~~~~~~
+
+    Close the sessions progressively before the station shutdown,
+    so the clients won't reconnect (and handshake) all at once
+"""
+
+from typing import List
+
+from ..utils import Logging
+from ..utils import Runner
+
+from .cpu.text import RequestHandlerMarker
+from .session import ServerSession
+
+
+class SessionDrainer(Logging):
+    """
+        Session Drainer
+        ~~~~~~~~~~~~~~~
+
+        Sessions are closed in batches spread over the period, in order:
+            1. not login yet, or inactive (app in background);
+            2. idle longest (nothing received for a long time).
+        The busy sessions are closed last, and they can finish their work.
+    """
+
+    INTERVAL = 1.0  # seconds
+
+    def __init__(self, period: float):
+        super().__init__()
+        self.__period = period
+
+    async def drain(self) -> int:
+        """ close all sessions, return count of sessions closed """
+        sessions = sort_sessions(sessions=RequestHandlerMarker().all_sessions)
+        total = len(sessions)
+        if total == 0:
+            return 0
+        steps = max(1, int(self.__period / self.INTERVAL))
+        batch = (total + steps - 1) // steps
+        self.info(msg='[DRAIN] closing %d sessions in %d seconds, %d per batch' % (total, self.__period, batch))
+        closed = 0
+        for start in range(0, total, batch):
+            for session in sessions[start:start + batch]:
+                if session.running:
+                    await session.stop()
+                    closed += 1
+            if start + batch < total:
+                await Runner.sleep(seconds=self.INTERVAL)
+        self.info(msg='[DRAIN] %d sessions closed' % closed)
+        return closed
+
+
+def sort_sessions(sessions: List[ServerSession]) -> List[ServerSession]:
+    """ sessions to be closed first come first """
+
+    def order(session: ServerSession):
+        if session.identifier is None or not session.active:
+            return 0, 0
+        last_active = session.last_active if isinstance(session, ServerSession) else 0
+        return 1, last_active
+
+    return sorted(sessions, key=order)
@@ -138,6 +138,12 @@ class MuteFilter:
         db = self.__database
         return await db.is_muted(sender=sender, receiver=receiver, group=group)
 
+    async def prepare(self, messages: List[ReliableMessage]):
+        """ load mute-lists of all receivers in one round-trip before checking """
+        receivers = list(set([msg.receiver for msg in messages]))
+        db = self.__database
+        await db.get_mute_commands_many(identifiers=receivers)
+
 
 @Singleton
 class FilterManager:
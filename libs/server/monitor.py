@@ -72,6 +72,7 @@ class Monitor(Runner, Logging):
         self.__events = []
         self.__lock = threading.Lock()
         self.__next_time = 0
+        self.__flushing = False
         # recorders
         self.__usr_recorder: Optional[Recorder] = None
         self.__msg_recorder: Optional[Recorder] = None
@@ -107,6 +108,21 @@ class Monitor(Runner, Logging):
             if len(self.__events) > 0:
                 return self.__events.pop(0)
 
+    def _count_events(self) -> int:
+        with self.__lock:
+            return len(self.__events)
+
+    async def flush(self, timeout: float = 10) -> bool:
+        """ handle all pending events and send reports now (before shutdown) """
+        self.__flushing = True
+        expired = time.time() + timeout
+        while self.__flushing and time.time() < expired:
+            await Runner.sleep(seconds=Runner.INTERVAL_SLOW)
+        if self.__flushing:
+            self.error(msg='flush timeout, pending events: %d' % self._count_events())
+            return False
+        return True
+
     def start(self):
         # next time to flush
         self.__next_time = time.time() + self.INTERVAL
@@ -125,7 +141,8 @@ class Monitor(Runner, Logging):
             return False
         # 1. check to flush data
         now = time.time()
-        if now > self.__next_time:
+        flushing = self.__flushing and self._count_events() == 0
+        if now > self.__next_time or flushing:
             users = self.__usr_recorder.extract()
             stats = self.__msg_recorder.extract()
             try:
@@ -134,6 +151,8 @@ class Monitor(Runner, Logging):
                 self.error(msg='failed to send data: %s' % e)
             # flush next time
             self.__next_time = now + self.INTERVAL
+            if flushing:
+                self.__flushing = False
         # 2. check for next event
         event = self._next_event()
         if event is None:
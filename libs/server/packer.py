@@ -27,24 +27,32 @@
     Common extensions for MessagePacker
     ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 """
-from typing import Optional
+import time
+from typing import Optional, List
 
 from dimples import ReliableMessage
-from dimples import CommonFacebook, CommonMessenger
+from dimples import CommonMessenger
 from dimples.server import ServerMessagePacker as SuperPacker
 
-from ..utils.mtp import MTPUtils
+from ..utils import Logging
+from ..utils.mtp import MTPUtils, MTPStatistics, Compressor
 
+from .session import ServerSession
 
-class ServerPacker(SuperPacker):
+
+class ServerPacker(SuperPacker, Logging):
 
     MTP_JSON = 0x01
     MTP_DMTP = 0x02
 
-    def __init__(self, facebook: CommonFacebook, messenger: CommonMessenger):
-        super().__init__(facebook=facebook, messenger=messenger)
-        # Message Transfer Protocol
-        self.mtp_format = self.MTP_JSON
+    # format names in handshake command: 'mtp'
+    MTP_NAMES = {
+        MTP_JSON: 'json',
+        MTP_DMTP: 'dmtp',
+    }
+
+    # preferred formats for capable clients, compact binary first
+    MTP_PREFERRED = [MTP_DMTP, MTP_JSON]
 
     @property
     def messenger(self) -> CommonMessenger:
@@ -52,28 +60,111 @@ class ServerPacker(SuperPacker):
         assert isinstance(transceiver, CommonMessenger), 'messenger error: %s' % transceiver
         return transceiver
 
+    @property
+    def session(self) -> Optional[ServerSession]:
+        session = self.messenger.session
+        if isinstance(session, ServerSession):
+            return session
+
+    @property
+    def mtp_format(self) -> int:
+        """ Message Transfer Protocol negotiated with the remote user, default is JsON """
+        session = self.session
+        if session is None or session.mtp_format is None:
+            return self.MTP_JSON
+        return session.mtp_format
+
+    @mtp_format.setter
+    def mtp_format(self, value: int):
+        session = self.session
+        if session is not None:
+            session.mtp_format = value
+
+    def negotiate(self, formats: List[str]) -> str:
+        """
+        Choose message format with the names supported by client
+
+        :param formats: format names from handshake command, e.g.: ['dmtp', 'json']
+        :return: name of the chosen format
+        """
+        chosen = self.MTP_JSON
+        for mtp in self.MTP_PREFERRED:
+            if self.MTP_NAMES[mtp] in formats:
+                chosen = mtp
+                break
+        self.mtp_format = chosen
+        return self.MTP_NAMES[chosen]
+
+    def negotiate_compression(self, algorithms: List[str], dictionary_id: int = 0) -> Optional[str]:
+        """
+        Choose compression algorithm with the names supported by client
+
+        :param algorithms:    algorithm names from handshake command, e.g.: ['zstd', 'zlib']
+        :param dictionary_id: ID of the shared dictionary in client
+        :return: name of the chosen algorithm, None for no compression
+        """
+        session = self.session
+        if session is None:
+            return None
+        for name in Compressor.algorithms():
+            if name in algorithms:
+                use_dictionary = dictionary_id != 0 and dictionary_id == Compressor.dictionary_id()
+                session.set_compression(algorithm=name, use_dictionary=use_dictionary)
+                return name
+        session.set_compression(algorithm=None)
+
     # Override
     async def serialize_message(self, msg: ReliableMessage) -> bytes:
-        if self.mtp_format == self.MTP_JSON:
+        mtp = self.mtp_format
+        if mtp == self.MTP_JSON:
             # JsON
-            return await super().serialize_message(msg=msg)
+            data = await super().serialize_message(msg=msg)
         else:
             # D-MTP
-            return MTPUtils.serialize_message(msg=msg)
+            data = MTPUtils.serialize_message(msg=msg)
+        MTPStatistics().sent(mtp=self.MTP_NAMES[mtp], data=data, msg=msg)
+        # compress large message
+        session = self.session
+        if session is not None and session.compression is not None and len(data) > Compressor.THRESHOLD:
+            start = time.perf_counter()
+            packed = Compressor.compress(data=data, algorithm=session.compression,
+                                         use_dictionary=session.compress_dict)
+            elapsed = time.perf_counter() - start
+            MTPStatistics().compressed(algorithm=session.compression, size=len(data),
+                                       packed=len(packed), seconds=elapsed)
+            if len(packed) < len(data):
+                data = packed
+        return data
 
     # Override
     async def deserialize_message(self, data: bytes) -> Optional[ReliableMessage]:
         if data is None or len(data) < 2:
             return None
+        # compressed data starts with 0x78 (zlib) or 0x28 (zstd)
+        if Compressor.is_compressed(data=data):
+            start = time.perf_counter()
+            packed = len(data)
+            try:
+                data = Compressor.decompress(data=data)
+            except ValueError as error:
+                self.error(msg='failed to decompress message (%d bytes): %s' % (packed, error))
+                return None
+            elapsed = time.perf_counter() - start
+            MTPStatistics().decompressed(size=len(data), packed=packed, seconds=elapsed)
+        # JsON starts with '{', D-MTP starts with length of the first tag
         if data.startswith(b'{'):
-            # JsON
+            mtp = self.MTP_JSON
             msg = await super().deserialize_message(data=data)
         else:
-            # D-MTP
+            mtp = self.MTP_DMTP
             msg = MTPUtils.deserialize_message(data=data)
-            if msg is not None:
-                # FIXME: just change it when first package received
-                self.mtp_format = self.MTP_DMTP
+            session = self.session
+            if msg is not None and session is not None and session.mtp_format is None:
+                # old client sends D-MTP without negotiation, reply in D-MTP too
+                self.info(msg='client using D-MTP without negotiation: %s' % str(session.remote_address))
+                session.mtp_format = mtp
+        if msg is not None:
+            MTPStatistics().received(mtp=self.MTP_NAMES[mtp], data=data, msg=msg)
         return msg
 
     # # Override
@@ -32,7 +32,7 @@
 """
 
 import time
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, List, Dict
 
 from dimples import ID, ContentType, Envelope, ReliableMessage
 from dimples.server import PushService, BadgeKeeper
@@ -41,6 +41,7 @@ from ..utils import Logging
 from ..utils.localizations import Translations, Locale
 from ..common import CommonFacebook
 from ..common.protocol import PushCommand, PushItem
+from ..database import Database
 
 from .cpu import AnsCommandProcessor
 
@@ -91,8 +92,10 @@ class DefaultPushService(PushService, Logging):
                 self.warning(msg='apns bot not set')
                 return False
             mute_filter = FilterManager().mute_filter
+            await mute_filter.prepare(messages=messages)
             expired = time.time() - self.MESSAGE_EXPIRES
-            items = []
+            # conversation => messages
+            conversations: Dict[Tuple[ID, str], List[Tuple[ReliableMessage, Envelope]]] = {}
             for msg in messages:
                 if msg.time < expired:
                     env = self._origin_envelope(msg=msg)
@@ -104,11 +107,27 @@ class DefaultPushService(PushService, Logging):
                     self.info(msg='muted sender: %s -> %s (group: %s) type: %d'
                                   % (env.sender, msg.receiver, env.group, env.type))
                     continue
-                # build push item for message
-                pi = await self.__build_push_item(msg=msg, badge_keeper=badge_keeper)
+                env = self._origin_envelope(msg=msg)
+                if self._get_template(msg_type=env.type, group=env.group) is None:
+                    self.info(msg='ignore msg type: %s -> %s (group: %s) type: %d'
+                                  % (env.sender, msg.receiver, env.group, env.type))
+                    continue
+                # coalesce messages with same receiver & conversation
+                key = (msg.receiver, _conversation(env=env))
+                array = conversations.get(key)
+                if array is None:
+                    conversations[key] = [(msg, env)]
+                else:
+                    array.append((msg, env))
+            await self.__prepare_documents(conversations=conversations)
+            items = []
+            for array in conversations.values():
+                # build push item for messages
+                pi = await self.__build_push_item(messages=array, badge_keeper=badge_keeper)
                 if pi is not None:
                     items.append(pi)
             if len(items) > 0:
+                self.info(msg='push %d item(s) for %d message(s)' % (len(items), len(messages)))
                 # push items to the bot
                 bot = self.bot
                 if bot is not None:
@@ -119,26 +138,49 @@ class DefaultPushService(PushService, Logging):
             self.error(msg='push %d messages error: %s' % (len(messages), error))
         return True
 
-    async def __build_push_item(self, msg: ReliableMessage, badge_keeper: BadgeKeeper) -> Optional[PushItem]:
-        # 1. check original sender, group & msg type
-        env = self._origin_envelope(msg=msg)
+    async def __prepare_documents(self, conversations: Dict[Tuple[ID, str], List[Tuple[ReliableMessage, Envelope]]]):
+        """ load documents of all senders in one round-trip for avatars """
+        senders = set()
+        for array in conversations.values():
+            _, env = array[-1]
+            senders.add(env.sender)
+        db = self.__facebook.archivist.database
+        if isinstance(db, Database) and len(senders) > 0:
+            await db.get_documents_many(identifiers=list(senders))
+
+    async def __build_push_item(self, messages: List[Tuple[ReliableMessage, Envelope]],
+                                badge_keeper: BadgeKeeper) -> Optional[PushItem]:
+        # 1. check original sender, group & msg type of the last message
+        msg, env = messages[-1]
+        count = len(messages)
         receiver = msg.receiver
         sender = env.sender
         group = env.group
         if group is None and 'GF' in env:
             group = ID.parse(identifier='Hidden@anywhere')
         msg_type = env.type
+        # messages in a group conversation may come from different members
+        senders = len(set(item[1].sender for item in messages))
         # 2. build title & content text
-        title, text = await self._build_message(sender=sender, receiver=receiver, group=group, msg_type=msg_type)
+        title, text = await self._build_message(sender=sender, receiver=receiver, group=group,
+                                                msg_type=msg_type, count=count, senders=senders)
         if text is None:
             self.info(msg='ignore msg type: %s -> %s (group: %s) type: %d' % (sender, receiver, group, msg_type))
             return None
-        # 3. increase badge
-        badge = badge_keeper.increase_badge(identifier=receiver)
-        # 4. get avatar
-        avatar = await self._get_image(identifier=sender)
+        # 3. increase badge for each message
+        badge = 0
+        for _ in range(count):
+            badge = badge_keeper.increase_badge(identifier=receiver)
+        # 4. get avatar (group avatar for messages from different members)
+        if senders > 1 and group is not None:
+            avatar = await self._get_image(identifier=group)
+        else:
+            avatar = await self._get_image(identifier=sender)
+        # 5. notifications in the same conversation replace each other
+        collapse_id = _conversation(env=env)
         # OK
-        return PushItem.create(receiver=receiver, title=title, content=text, image=avatar, badge=badge)
+        return PushItem.create(receiver=receiver, title=title, content=text, image=avatar, badge=badge,
+                               collapse_id=collapse_id)
 
     # noinspection PyMethodMayBeStatic
     def _origin_envelope(self, msg: ReliableMessage) -> Envelope:
@@ -152,34 +194,45 @@ class DefaultPushService(PushService, Logging):
             msg.pop('origin', None)
         return env
 
-    async def _build_message(self, sender: ID, receiver: ID,
-                             group: ID, msg_type: int) -> Tuple[Optional[str], Optional[str]]:
-        """ build title, content for notification """
-        # get title, body template
+    # noinspection PyMethodMayBeStatic
+    def _get_template(self, msg_type: int, group: Optional[ID]) -> Optional[Tuple[str, str]]:
+        """ get title, body template for message type """
         if msg_type == 0:
-            title = 'Message'
-            body = PushTmpl.recv_message if group is None else PushTmpl.grp_recv_message
+            return 'Message', PushTmpl.recv_message if group is None else PushTmpl.grp_recv_message
         elif msg_type == ContentType.TEXT:
-            title = 'Text Message'
-            body = PushTmpl.recv_text if group is None else PushTmpl.grp_recv_text
+            return 'Text Message', PushTmpl.recv_text if group is None else PushTmpl.grp_recv_text
         elif msg_type == ContentType.FILE:
-            title = 'File'
-            body = PushTmpl.recv_file if group is None else PushTmpl.grp_recv_file
+            return 'File', PushTmpl.recv_file if group is None else PushTmpl.grp_recv_file
         elif msg_type == ContentType.IMAGE:
-            title = 'Image'
-            body = PushTmpl.recv_image if group is None else PushTmpl.grp_recv_image
+            return 'Image', PushTmpl.recv_image if group is None else PushTmpl.grp_recv_image
         elif msg_type == ContentType.AUDIO:
-            title = 'Voice'
-            body = PushTmpl.recv_voice if group is None else PushTmpl.grp_recv_voice
+            return 'Voice', PushTmpl.recv_voice if group is None else PushTmpl.grp_recv_voice
         elif msg_type == ContentType.VIDEO:
-            title = 'Video'
-            body = PushTmpl.recv_video if group is None else PushTmpl.grp_recv_video
+            return 'Video', PushTmpl.recv_video if group is None else PushTmpl.grp_recv_video
         elif msg_type in [ContentType.MONEY, ContentType.TRANSFER]:
-            title = 'Money'
-            body = PushTmpl.recv_money if group is None else PushTmpl.grp_recv_money
-        else:
+            return 'Money', PushTmpl.recv_money if group is None else PushTmpl.grp_recv_money
+        # unknown type
+
+    async def _build_message(self, sender: ID, receiver: ID, group: ID, msg_type: int,
+                             count: int = 1, senders: int = 1) -> Tuple[Optional[str], Optional[str]]:
+        """ build title, content for notification """
+        # get title, body template
+        tmpl = self._get_template(msg_type=msg_type, group=group)
+        if tmpl is None:
             # unknown type
             return None, None
+        elif count > 1:
+            # coalesced messages
+            title = 'Messages'
+            if group is None:
+                body = PushTmpl.recv_messages
+            elif senders > 1:
+                # sent by different members, don't name anyone
+                body = PushTmpl.grp_recv_members_messages
+            else:
+                body = PushTmpl.grp_recv_messages
+        else:
+            title, body = tmpl
         # get language
         facebook = self.__facebook
         visa = await facebook.get_visa(user=receiver)
@@ -200,7 +253,19 @@ class DefaultPushService(PushService, Logging):
         params = {
             'sender': from_name,
             'receiver': to_name,
+            'count': str(count),
         }
         if group is not None:
             params['group'] = await facebook.get_name(identifier=group)
         return title, translates.translate(text=body, params=params)
+
+
+def _conversation(env: Envelope) -> str:
+    """ group address for group message, or sender address for personal message """
+    group = env.group
+    if group is not None:
+        return str(group.address)
+    elif 'GF' in env:
+        # message in hidden group, keep it apart from the sender's personal messages
+        return 'hidden:%s' % env.sender.address
+    return str(env.sender.address)
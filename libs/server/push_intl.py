@@ -47,6 +47,11 @@ class PushTmpl:
     grp_recv_video = 'Dear {receiver}: {sender} sent you a video in group "{group}".'
     grp_recv_money = 'Dear {receiver}: {sender} sent you some money in group "{group}".'
 
+    # coalesced notifications
+    recv_messages = 'Dear {receiver}: {sender} sent you {count} messages.'
+    grp_recv_messages = 'Dear {receiver}: {sender} sent you {count} messages in group "{group}".'
+    grp_recv_members_messages = 'Dear {receiver}: you have {count} new messages in group "{group}".'
+
 
 #
 #   Language Packages
@@ -71,6 +76,10 @@ _lang_en_US = {
     PushTmpl.grp_recv_video: 'Dear {receiver}: {sender} sent you a video in group "{group}".',
     PushTmpl.grp_recv_money: 'Dear {receiver}: {sender} sent you some money in group "{group}".',
 
+    PushTmpl.recv_messages: 'Dear {receiver}: {sender} sent you {count} messages.',
+    PushTmpl.grp_recv_messages: 'Dear {receiver}: {sender} sent you {count} messages in group "{group}".',
+    PushTmpl.grp_recv_members_messages: 'Dear {receiver}: you have {count} new messages in group "{group}".',
+
 }
 
 
@@ -92,6 +101,10 @@ _lang_es_ES = {
     PushTmpl.grp_recv_video: 'Estimado/a {receiver}: {sender} le envió un video en el grupo "{group}".',
     PushTmpl.grp_recv_money: 'Estimado/a {receiver}: {sender} le envió algo de dinero en el grupo "{group}".',
 
+    PushTmpl.recv_messages: 'Estimado/a {receiver}: {sender} le envió {count} mensajes.',
+    PushTmpl.grp_recv_messages: 'Estimado/a {receiver}: {sender} le envió {count} mensajes en el grupo "{group}".',
+    PushTmpl.grp_recv_members_messages: 'Estimado/a {receiver}: tiene {count} mensajes nuevos en el grupo "{group}".',
+
 }
 
 
@@ -113,6 +126,10 @@ _lang_fr_FR = {
     PushTmpl.grp_recv_video: 'Cher/Chère {receiver} : {sender} vous a envoyé une vidéo dans le groupe "{group}".',
     PushTmpl.grp_recv_money: 'Cher/Chère {receiver} : {sender} vous a envoyé de l\'argent dans le groupe "{group}".',
 
+    PushTmpl.recv_messages: 'Cher/Chère {receiver} : {sender} vous a envoyé {count} messages.',
+    PushTmpl.grp_recv_messages: 'Cher/Chère {receiver} : {sender} vous a envoyé {count} messages dans le groupe "{group}".',
+    PushTmpl.grp_recv_members_messages: 'Cher/Chère {receiver} : vous avez {count} nouveaux messages dans le groupe "{group}".',
+
 }
 
 
@@ -134,6 +151,10 @@ _lang_de_DE = {
     PushTmpl.grp_recv_video: 'Liebe/Lieber {receiver}: {sender} hat Ihnen ein Video in der Gruppe "{group}" gesendet.',
     PushTmpl.grp_recv_money: 'Liebe/Lieber {receiver}: {sender} hat Ihnen etwas Geld in der Gruppe "{group}" gesendet.',
 
+    PushTmpl.recv_messages: 'Liebe/Lieber {receiver}: {sender} hat Ihnen {count} Nachrichten gesendet.',
+    PushTmpl.grp_recv_messages: 'Liebe/Lieber {receiver}: {sender} hat Ihnen {count} Nachrichten in der Gruppe "{group}" gesendet.',
+    PushTmpl.grp_recv_members_messages: 'Liebe/Lieber {receiver}: Sie haben {count} neue Nachrichten in der Gruppe "{group}".',
+
 }
 
 
@@ -470,6 +491,10 @@ _lang_zh_CN = {
     PushTmpl.grp_recv_video: '亲爱的{receiver}：{sender} 在群组“{group}”中给您发送了一段视频。',
     PushTmpl.grp_recv_money: '亲爱的{receiver}：{sender} 在群组“{group}”中给您发送了一些钱。',
 
+    PushTmpl.recv_messages: '亲爱的{receiver}：{sender} 给您发送了{count}条消息。',
+    PushTmpl.grp_recv_messages: '亲爱的{receiver}：{sender} 在群组“{group}”中给您发送了{count}条消息。',
+    PushTmpl.grp_recv_members_messages: '亲爱的{receiver}：群组“{group}”中有{count}条新消息。',
+
 }
 
 _lang_zh_TW = {
@@ -490,6 +515,10 @@ _lang_zh_TW = {
     PushTmpl.grp_recv_video: '親愛的{receiver}：{sender} 在群組「{group}」中寄了一段影片給您。',
     PushTmpl.grp_recv_money: '親愛的{receiver}：{sender} 在群組「{group}」中寄了一些錢給您。',
 
+    PushTmpl.recv_messages: '親愛的{receiver}：{sender} 寄了{count}則訊息給您。',
+    PushTmpl.grp_recv_messages: '親愛的{receiver}：{sender} 在群組「{group}」中寄了{count}則訊息給您。',
+    PushTmpl.grp_recv_members_messages: '親愛的{receiver}：群組「{group}」中有{count}則新訊息。',
+
 }
 
 
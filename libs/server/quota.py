@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2024 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+"""
+    Session Quota
+    ~~~~~~~~~~~~~
+
+    Limit memory held by each session for outgoing messages
+"""
+
+import threading
+from typing import Dict
+
+from mkm.types import Converter
+from startrek import DeparturePriority
+
+from ..utils import Singleton, Logging, Config
+
+
+@Singleton
+class SessionQuota(Logging):
+    """
+        Session Memory Quota
+        ~~~~~~~~~~~~~~~~~~~~
+
+        Each session counts bytes of its outgoing messages, from appended to
+        the gate keeper's queue, until sent (responded) or failed;
+        when a slow reader exceeds the soft limits, new messages (except the
+        urgent ones) will be refused, they are still kept in the database and
+        will be delivered after the user login again;
+        and the session will be closed when the hard limit exceeded.
+
+        config.ini:
+            [station]
+            session_max_bytes    = 4194304   # refuse new messages, 0 means unlimited
+            session_max_messages = 1024
+            session_close_bytes  = 16777216  # close the session, 0 means never
+    """
+
+    MAX_BYTES = 1 << 22     # 4 MB
+    MAX_MESSAGES = 1024
+    CLOSE_BYTES = 1 << 24   # 16 MB
+
+    ACCEPT = 0
+    REFUSE = 1
+    CLOSE = 2
+
+    def __init__(self):
+        super().__init__()
+        self.__max_bytes = self.MAX_BYTES
+        self.__max_messages = self.MAX_MESSAGES
+        self.__close_bytes = self.CLOSE_BYTES
+        # counters
+        self.__refused = 0
+        self.__refused_bytes = 0
+        self.__closed = 0
+        self.__lock = threading.Lock()
+
+    def load(self, config: Config):
+        """ load limits from config """
+        options = config.get_section(section='station')
+        if options is None:
+            return
+        self.__max_bytes = Converter.get_int(value=options.get('session_max_bytes'), default=self.__max_bytes)
+        self.__max_messages = Converter.get_int(value=options.get('session_max_messages'),
+                                                default=self.__max_messages)
+        self.__close_bytes = Converter.get_int(value=options.get('session_close_bytes'), default=self.__close_bytes)
+        self.info(msg='[QUOTA] session max bytes: %d, max messages: %d, close bytes: %d'
+                      % (self.__max_bytes, self.__max_messages, self.__close_bytes))
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return {
+                'refused': self.__refused,
+                'refused_bytes': self.__refused_bytes,
+                'closed': self.__closed,
+                'max_bytes': self.__max_bytes,
+                'max_messages': self.__max_messages,
+                'close_bytes': self.__close_bytes,
+            }
+
+    def check(self, pending_bytes: int, pending_messages: int, size: int, priority: int) -> int:
+        """
+        Check whether a new message can be queued for the session
+
+        :param pending_bytes:    bytes queued or in flight
+        :param pending_messages: messages queued or in flight
+        :param size:             bytes of the new message
+        :param priority:         priority of the new message
+        :return: ACCEPT, REFUSE or CLOSE
+        """
+        if 0 < self.__close_bytes < pending_bytes + size:
+            with self.__lock:
+                self.__closed += 1
+            return self.CLOSE
+        if priority <= DeparturePriority.URGENT:
+            # responses & handshakes should not be blocked
+            return self.ACCEPT
+        if 0 < self.__max_bytes < pending_bytes + size:
+            pass
+        elif 0 < self.__max_messages <= pending_messages:
+            pass
+        else:
+            return self.ACCEPT
+        with self.__lock:
+            self.__refused += 1
+            self.__refused_bytes += size
+        return self.REFUSE
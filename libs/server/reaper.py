@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2023 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+"""
+    Session Reaper
+    ~~~~~~~~~~~~~~
+
+    Close the sessions from dead clients, before TCP timeouts fire
+"""
+
+import threading
+import time
+from typing import Tuple, Dict
+
+from mkm.types import Converter
+from dimples.server import ServerSession
+
+from ..utils import Singleton, Logging, Config
+from ..utils import Runner
+from ..utils.wheel import TimingWheel
+
+
+@Singleton
+class SessionReaper(Runner, Logging):
+    """
+        Idle Session Reaper
+        ~~~~~~~~~~~~~~~~~~~
+
+        One timing wheel for all sessions, instead of a sleeping task for each;
+        receiving data won't touch the wheel, the deadline is checked again
+        when fired, and rescheduled if the session was active after that:
+            1. handshake deadline - connected, but not login yet;
+            2. idle deadline - nothing received (heartbeats included).
+
+        config.ini:
+            [station]
+            idle_timeout      = 300    # seconds
+            handshake_timeout = 30     # seconds
+    """
+
+    IDLE_TIMEOUT = 300      # seconds
+    HANDSHAKE_TIMEOUT = 30  # seconds
+
+    TICK = 1.0  # seconds
+
+    def __init__(self):
+        super().__init__(interval=self.TICK)
+        self.__wheel: TimingWheel[ServerSession] = TimingWheel(tick=self.TICK, slots=1024)
+        self.__idle_timeout = self.IDLE_TIMEOUT
+        self.__handshake_timeout = self.HANDSHAKE_TIMEOUT
+        # counters
+        self.__added = 0
+        self.__removed = 0
+        self.__rescheduled = 0
+        self.__handshake_closed = 0
+        self.__idle_closed = 0
+        self.__lock = threading.Lock()
+        # auto start
+        self.start()
+
+    def start(self):
+        thr = Runner.async_thread(coro=self.run())
+        thr.start()
+
+    def load(self, config: Config):
+        """ load timeouts from config """
+        options = config.get_section(section='station')
+        if options is None:
+            return
+        value = Converter.get_int(value=options.get('idle_timeout'), default=0)
+        if value > 0:
+            self.__idle_timeout = value
+        value = Converter.get_int(value=options.get('handshake_timeout'), default=0)
+        if value > 0:
+            self.__handshake_timeout = value
+        self.info(msg='[REAPER] idle timeout: %d, handshake timeout: %d'
+                      % (self.__idle_timeout, self.__handshake_timeout))
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return {
+                'sessions': len(self.__wheel),
+                'added': self.__added,
+                'removed': self.__removed,
+                'rescheduled': self.__rescheduled,
+                'handshake_closed': self.__handshake_closed,
+                'idle_closed': self.__idle_closed,
+                'idle_timeout': self.__idle_timeout,
+                'handshake_timeout': self.__handshake_timeout,
+            }
+
+    def add_session(self, session: ServerSession):
+        deadline, _ = self.__deadline(session=session)
+        self.__wheel.schedule(key=session, deadline=deadline)
+        with self.__lock:
+            self.__added += 1
+
+    def remove_session(self, session: ServerSession):
+        if self.__wheel.cancel(key=session):
+            with self.__lock:
+                self.__removed += 1
+
+    def __deadline(self, session: ServerSession) -> Tuple[float, str]:
+        # 'created' & 'last_active' are defined in the station's ServerSession,
+        # which cannot be imported here (imported by the text commands)
+        if session.identifier is None:
+            return session.created + self.__handshake_timeout, 'handshake'
+        return session.last_active + self.__idle_timeout, 'idle'
+
+    # Override
+    async def process(self) -> bool:
+        now = time.time()
+        expired = self.__wheel.expire(now=now)
+        for session in expired:
+            deadline, reason = self.__deadline(session=session)
+            if now < deadline:
+                # active after scheduled
+                self.__wheel.schedule(key=session, deadline=deadline)
+                with self.__lock:
+                    self.__rescheduled += 1
+                continue
+            await self.__close(session=session, reason=reason, now=now)
+        # have a rest until next tick
+        return False
+
+    async def __close(self, session: ServerSession, reason: str, now: float):
+        with self.__lock:
+            if reason == 'handshake':
+                self.__handshake_closed += 1
+            else:
+                self.__idle_closed += 1
+        self.warning(msg='[REAPER] closing session (%s timeout): %s, %s, idle: %d seconds'
+                         % (reason, session.identifier, session.remote_address, now - session.last_active))
+        try:
+            await session.stop()
+        except Exception as error:
+            self.error(msg='[REAPER] failed to close session: %s, %s' % (session, error))
@@ -35,16 +35,33 @@
     for login user
 """
 
-from typing import Optional
+import socket
+import threading
+import time
+import weakref
+from typing import Optional, Union
+
+from startrek import Arrival, Departure, Porter, PorterStatus
+from startrek import BaseConnection, StarPorter
 
 from dimples import DateTime
 from dimples import ID
+from dimples import ReliableMessage
+from dimples.common import SessionDBI
+from dimples.conn import MessageWrapper
 from dimples.server import ServerSession as SuperSession
 
-from ..utils import Runner, Log
-from ..database import Database
+from ..utils import Runner
 
 from .monitor import Monitor
+from .quota import SessionQuota
+from .changes import SessionChangeWriter
+
+
+def _release_pending(ref: weakref.ReferenceType, size: int):
+    session = ref()
+    if session is not None:
+        session._release_bytes(size=size)
 
 
 class ServerSession(SuperSession):
@@ -65,21 +82,165 @@ class ServerSession(SuperSession):
                 After received 'offline' command, it will be set to False;
                 and when received 'online' it will be True again.
                 Only push message when it's True.
+
+        'mtp_format' - Message Transfer Protocol
+                Format for messages sending to the remote user,
+                it will be set when negotiated in handshaking.
+
+        'compression' - Compression Algorithm
+                For large messages sending to the remote user ('zstd', 'zlib'),
+                negotiated in handshaking too, with the shared dictionary
+                if both sides have the same one.
+
+        'pending_bytes' - Outgoing Messages
+                Bytes of messages waiting in the queue, or sent but not
+                responded yet; limited by the session quota.
     """
 
+    def __init__(self, remote: Union[tuple, str], sock: socket.socket, database: SessionDBI):
+        super().__init__(remote=remote, sock=sock, database=database)
+        self.__mtp_format: Optional[int] = None
+        self.__compression: Optional[str] = None
+        self.__compress_dict = False
+        self.__last_received = time.time()
+        self.__created = self.__last_received
+        self.__porter: Optional[weakref.ReferenceType] = None
+        # outgoing messages: ship => finalizer (releases the size when the ship is gone)
+        self.__pending: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.__pending_bytes = 0
+        self.__closing = False
+        self.__lock = threading.RLock()
+
+    @property
+    def mtp_format(self) -> Optional[int]:
+        """ negotiated format, None means not negotiated yet """
+        return self.__mtp_format
+
+    @mtp_format.setter
+    def mtp_format(self, value: int):
+        self.__mtp_format = value
+
+    @property
+    def compression(self) -> Optional[str]:
+        """ negotiated compression algorithm, None means not compress """
+        return self.__compression
+
+    @property
+    def compress_dict(self) -> bool:
+        """ whether compress with the shared dictionary """
+        return self.__compress_dict
+
+    def set_compression(self, algorithm: Optional[str], use_dictionary: bool = False):
+        self.__compression = algorithm
+        self.__compress_dict = use_dictionary
+
+    @property
+    def created(self) -> float:
+        """ time of the connection accepted """
+        return self.__created
+
+    @property
+    def last_received(self) -> float:
+        """ time of the last package received from remote user """
+        return self.__last_received
+
+    @property
+    def last_active(self) -> float:
+        """ time of the last data received from remote user, including heartbeats """
+        last = self.__last_received
+        ref = self.__porter
+        porter = None if ref is None else ref()
+        if isinstance(porter, StarPorter):
+            conn = porter.connection
+            if isinstance(conn, BaseConnection) and conn.last_received_time > last:
+                last = conn.last_received_time
+        return last
+
+    @property
+    def pending_bytes(self) -> int:
+        """ bytes of messages queued or in flight """
+        return self.__pending_bytes
+
+    @property
+    def pending_messages(self) -> int:
+        """ count of messages queued or in flight """
+        return len(self.__pending)
+
+    # Override
+    def _queue_append(self, msg: ReliableMessage, ship: Departure) -> bool:
+        size = 0
+        for fra in ship.fragments:
+            size += len(fra)
+        with self.__lock:
+            if self.__closing:
+                return False
+            quota = SessionQuota()
+            action = quota.check(pending_bytes=self.__pending_bytes, pending_messages=len(self.__pending),
+                                 size=size, priority=ship.priority)
+            if action == SessionQuota.ACCEPT:
+                if not super()._queue_append(msg=msg, ship=ship):
+                    # duplicated
+                    return False
+                # the finalizer also releases ships dropped without callback
+                # (send failed, expired, or the session closed)
+                self.__pending[ship] = weakref.finalize(ship, _release_pending, weakref.ref(self), size)
+                self.__pending_bytes += size
+                return True
+            elif action == SessionQuota.CLOSE:
+                self.__closing = True
+        if action == SessionQuota.REFUSE:
+            self.warning(msg='[QUOTA] message refused: %s -> %s, %d bytes, pending: %d bytes, %d messages, %s'
+                             % (msg.sender, msg.receiver, size, self.__pending_bytes, len(self.__pending),
+                                self.remote_address))
+        else:
+            self.error(msg='[QUOTA] closing session: %s, pending: %d bytes, %d messages, %s'
+                           % (self.identifier, self.__pending_bytes, len(self.__pending), self.remote_address))
+            Runner.async_task(coro=self.stop())
+        return False
+
+    def __release(self, ship: Departure):
+        if isinstance(ship, MessageWrapper):
+            ship = ship.ship
+        with self.__lock:
+            finalizer = self.__pending.pop(ship, None)
+        if finalizer is not None:
+            finalizer()
+
+    def _release_bytes(self, size: int):
+        with self.__lock:
+            self.__pending_bytes -= size
+
+    # Override
+    async def porter_sent(self, ship: Departure, porter: Porter):
+        self.__release(ship=ship)
+        await super().porter_sent(ship=ship, porter=porter)
+
+    # Override
+    async def porter_failed(self, error: IOError, ship: Departure, porter: Porter):
+        self.__release(ship=ship)
+        await super().porter_failed(error=error, ship=ship, porter=porter)
+
+    # Override
+    async def porter_status_changed(self, previous: PorterStatus, current: PorterStatus, porter: Porter):
+        self.__porter = weakref.ref(porter)
+        await super().porter_status_changed(previous=previous, current=current, porter=porter)
+
+    # Override
+    async def porter_received(self, ship: Arrival, porter: Porter):
+        self.__last_received = time.time()
+        await super().porter_received(ship=ship, porter=porter)
+
     # Override
     def set_identifier(self, identifier: ID) -> bool:
         old = self.identifier
         if super().set_identifier(identifier=identifier):
-            coro = session_change_id(session=self, new_id=identifier, old_id=old)
-            Runner.async_task(coro=coro)
+            SessionChangeWriter().id_changed(session=self, new_id=identifier, old_id=old)
             return True
 
     # Override
     def set_active(self, active: bool, when: float = None) -> bool:
         if super().set_active(active=active, when=when):
-            coro = session_change_active(session=self, active=active)
-            Runner.async_task(coro=coro)
+            SessionChangeWriter().active_changed(session=self, active=active)
             identifier = self.identifier
             self.info(msg='user active changed: %s, %s' % (identifier, active))
             if identifier is not None:
@@ -93,33 +254,3 @@ class ServerSession(SuperSession):
                 else:
                     monitor.user_offline(sender=identifier, remote_address=self.remote_address, when=when)
             return True
-
-
-async def session_change_id(session: ServerSession, new_id: ID, old_id: Optional[ID]):
-    remote = session.remote_address
-    db = session.database
-    assert isinstance(db, Database), 'database error: %s' % db
-    if old_id is not None:
-        # remove socket address for old user
-        await db.remove_socket_address(identifier=old_id, address=remote)
-    if new_id is not None:  # and session.active:
-        # store socket address for new user
-        Log.info(msg='store socket address for new user: %s, %s' % (new_id, remote))
-        return await db.add_socket_address(identifier=new_id, address=remote)
-
-
-async def session_change_active(session: ServerSession, active: bool):
-    identifier = session.identifier
-    if identifier is None:
-        # user not login yet
-        return False
-    remote = session.remote_address
-    db = session.database
-    assert isinstance(db, Database), 'database error: %s' % db
-    if active:
-        # store socket address for this user
-        Log.info(msg='store socket address for this user: %s, %s' % (identifier, remote))
-        return await db.add_socket_address(identifier=identifier, address=remote)
-    else:
-        # remove socket address for this user
-        return await db.remove_socket_address(identifier=identifier, address=remote)
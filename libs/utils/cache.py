@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+#
+#   Memory Cache: Bounded Pools
+#
+#                                Written in 2021 by Moky <albert.moky@gmail.com>
+#
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2021 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Any, Tuple, Set, List, Dict
+
+from aiou.mem import CachePool, CacheHolder
+from aiou.mem.cache import K, V
+
+from mkm.types import Converter
+
+from dimples.utils import Singleton, Runner
+from dimples.utils import Logging
+from dimples.utils import Config
+
+
+class BoundedCachePool(CachePool):
+    """
+        Bounded Cache Pool
+        ~~~~~~~~~~~~~~~~~~
+
+        Same as CachePool (time-based expiry), and bounded with capacity
+        and estimated bytes, the least recently used holders will be
+        evicted when exceeded.
+
+        Erased keys leave tombstones for a while, so the values loaded
+        before erased (maybe stale) won't be cached by the loaders.
+    """
+
+    TOMBSTONE_EXPIRES = 300  # seconds
+
+    def __init__(self, name: str, max_items: int = 0, max_bytes: int = 0):
+        super().__init__()
+        self.__name = name
+        self.__max_items = max_items  # 0 means unlimited
+        self.__max_bytes = max_bytes  # 0 means unlimited, and sizes won't be estimated
+        # key -> (holder, estimated bytes), least recently used first
+        self.__holders: OrderedDict[K, Tuple[CacheHolder[V], int]] = OrderedDict()
+        self.__bytes = 0
+        # key -> time erased
+        self.__tombstones: Dict[K, float] = {}
+        # statistics
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__expirations = 0
+        # probes avoided by missing values cached
+        self.__avoided_redis = 0
+        self.__avoided_storage = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def max_items(self) -> int:
+        return self.__max_items
+
+    @property
+    def max_bytes(self) -> int:
+        return self.__max_bytes
+
+    def __len__(self) -> int:
+        return len(self.__holders)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return {
+                'items': len(self.__holders),
+                'bytes': self.__bytes,
+                'hits': self.__hits,
+                'misses': self.__misses,
+                'evictions': self.__evictions,
+                'expirations': self.__expirations,
+                'avoided_redis': self.__avoided_redis,
+                'avoided_storage': self.__avoided_storage,
+                'max_items': self.__max_items,
+                'max_bytes': self.__max_bytes,
+            }
+
+    def avoided(self, redis: int = 0, storage: int = 0):
+        """ count the Redis/storage probes avoided by missing values cached """
+        with self.__lock:
+            self.__avoided_redis += redis
+            self.__avoided_storage += storage
+
+    def hot_items(self, now: float, limit: int = 0) -> List[Tuple[K, Optional[V]]]:
+        """ alive (key, value) pairs, most recently used first (value is None for missing) """
+        with self.__lock:
+            holders = [(key, pair[0]) for key, pair in reversed(self.__holders.items())]
+        items = []
+        for key, holder in holders:
+            if 0 < limit <= len(items):
+                break
+            elif holder.is_alive(now=now):
+                items.append((key, holder.value))
+        return items
+
+    # Override
+    def all_keys(self) -> Set[K]:
+        with self.__lock:
+            return set(self.__holders.keys())
+
+    # Override
+    def update(self, key: K, holder: CacheHolder[V] = None,
+               value: V = None, life_span: float = 3600, now: float = None) -> CacheHolder[V]:
+        if life_span is None:
+            life_span = 3600
+        if holder is None:
+            holder = CacheHolder(value=value, life_span=life_span, now=now)
+        size = estimate_size(holder.value) if self.__max_bytes > 0 else 0
+        with self.__lock:
+            old = self.__holders.pop(key, None)
+            if old is not None:
+                self.__bytes -= old[1]
+            self.__holders[key] = (holder, size)
+            self.__bytes += size
+            self.__evict()
+        return holder
+
+    def __evict(self):
+        holders = self.__holders
+        max_items = self.__max_items
+        max_bytes = self.__max_bytes
+        # never evict the last one (just updated)
+        while len(holders) > 1:
+            if 0 < max_items < len(holders):
+                pass
+            elif 0 < max_bytes < self.__bytes:
+                pass
+            else:
+                break
+            _, (_, size) = holders.popitem(last=False)
+            self.__bytes -= size
+            self.__evictions += 1
+
+    def erased_since(self, key: K, when: float) -> bool:
+        """ check whether the key was erased after the time (loading started) """
+        with self.__lock:
+            erased = self.__tombstones.get(key)
+        return erased is not None and erased >= when
+
+    # Override
+    def erase(self, key: K, now: float = None) -> Tuple[Optional[V], Optional[CacheHolder[V]]]:
+        with self.__lock:
+            self.__tombstones[key] = time.time()
+            pair = self.__holders.pop(key, None)
+            if pair is None:
+                return None, None
+            holder, size = pair
+            self.__bytes -= size
+        if now is None:
+            return None, None
+        elif holder.is_alive(now=now):
+            return holder.value, holder
+        return None, holder
+
+    # Override
+    def fetch(self, key: K, now: float = None) -> Tuple[Optional[V], Optional[CacheHolder[V]]]:
+        with self.__lock:
+            pair = self.__holders.get(key)
+            if pair is None:
+                # holder not found
+                self.__misses += 1
+                return None, None
+            holder = pair[0]
+            if holder.is_alive(now=now):
+                self.__hits += 1
+                self.__holders.move_to_end(key)
+                return holder.value, holder
+            # holder expired
+            self.__misses += 1
+            return None, holder
+
+    # Override
+    def purge(self, now: float = None) -> int:
+        if now is None:
+            now = time.time()
+        with self.__lock:
+            expired = [key for key, pair in self.__holders.items() if pair[0].is_deprecated(now=now)]
+            for key in expired:
+                _, size = self.__holders.pop(key)
+                self.__bytes -= size
+            self.__expirations += len(expired)
+            deprecated = now - self.TOMBSTONE_EXPIRES
+            for key in [key for key, when in self.__tombstones.items() if when < deprecated]:
+                self.__tombstones.pop(key)
+        return len(expired)
+
+
+def estimate_size(value: Any, depth: int = 8) -> int:
+    """ rough memory size of the cached value (containers, strings & mappings) """
+    if value is None or depth < 0:
+        return 0
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)):
+        return size
+    # Dictionary (Document, Meta, Command, ...) wraps a dict
+    inner = getattr(value, 'dictionary', None)
+    if isinstance(inner, Dict):
+        return size + estimate_size(inner, depth=depth - 1)
+    if isinstance(value, Dict):
+        for k, v in value.items():
+            size += estimate_size(k, depth=depth - 1) + estimate_size(v, depth=depth - 1)
+        return size
+    if isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, depth=depth - 1)
+        return size
+    # slotted object (DeviceInfo, ...)
+    for name in getattr(type(value), '__slots__', ()):
+        size += estimate_size(getattr(value, name, None), depth=depth - 1)
+    return size
+
+
+@Singleton
+class MemoryCacheManager(Runner, Logging):
+    """
+        Bounded pools for database tables, instead of SharedCacheManager
+
+        config.ini:
+            [memory]
+            max_items           = 131072    # default for all pools
+            max_bytes           = 67108864
+            documents_max_items = 262144    # for pool 'documents'
+            documents_max_bytes = 134217728
+    """
+
+    SECTION = 'memory'
+
+    MAX_ITEMS = 1 << 17  # 131072
+    MAX_BYTES = 1 << 26  # 64 MB
+
+    PURGE_INTERVAL = 300  # seconds
+
+    def __init__(self):
+        super().__init__(interval=2.0)
+        self.__pools: Dict[str, BoundedCachePool] = {}
+        self.__lock = threading.Lock()
+        self.__next_time = 0
+        self.start()
+
+    def start(self):
+        Runner.async_task(coro=self.run())
+
+    # Override
+    async def process(self) -> bool:
+        now = time.time()
+        if now < self.__next_time:
+            return False
+        else:
+            self.__next_time = now + self.PURGE_INTERVAL
+        try:
+            count = self.purge(now=now)
+            self.info(msg='[MEM] purge %d item(s) from bounded pools' % count)
+        except Exception as error:
+            self.error(msg='[MEM] failed to purge bounded pools: %s' % error)
+
+    def get_pool(self, name: str, config: Optional[Config] = None,
+                 max_items: int = None, max_bytes: int = None) -> BoundedCachePool:
+        """
+        Get pool with name, create it with limits from config if not exists
+
+        :param name:      pool name
+        :param config:    options in section 'memory': '{name}_max_items', '{name}_max_bytes'
+        :param max_items: default capacity for this pool
+        :param max_bytes: default bytes for this pool
+        :return: bounded pool
+        """
+        with self.__lock:
+            pool = self.__pools.get(name)
+            if pool is None:
+                options = _memory_options(config=config, section=self.SECTION)
+                max_items = _get_limit(options=options, name=name, option='max_items', default=max_items,
+                                       fallback=self.MAX_ITEMS)
+                max_bytes = _get_limit(options=options, name=name, option='max_bytes', default=max_bytes,
+                                       fallback=self.MAX_BYTES)
+                pool = BoundedCachePool(name=name, max_items=max_items, max_bytes=max_bytes)
+                self.__pools[name] = pool
+                self.info(msg='[MEM] bounded pool created: "%s", max items: %d, max bytes: %d'
+                              % (name, max_items, max_bytes))
+            return pool
+
+    def all_pools(self) -> Dict[str, BoundedCachePool]:
+        with self.__lock:
+            return self.__pools.copy()
+
+    def purge(self, now: float) -> int:
+        count = 0
+        for pool in self.all_pools().values():
+            count += pool.purge(now=now)
+        return count
+
+    def statistics(self) -> Dict[str, Dict[str, int]]:
+        """ pool name => {'items', 'bytes', 'hits', 'misses', 'evictions', ...} """
+        return {name: pool.stats for name, pool in self.all_pools().items()}
+
+
+def _memory_options(config: Optional[Config], section: str) -> Dict[str, str]:
+    info = None if config is None else config.dictionary
+    options = None if info is None else info.get(section)
+    return {} if options is None else options
+
+
+def _get_limit(options: Dict[str, str], name: str, option: str, default: Optional[int], fallback: int) -> int:
+    # 1. '{name}_max_items' for this pool
+    value = Converter.get_int(value=options.get('%s_%s' % (name, option)), default=0)
+    if value > 0:
+        return value
+    # 2. default limit from code
+    if default is not None:
+        return default
+    # 3. 'max_items' for all pools
+    value = Converter.get_int(value=options.get(option), default=0)
+    if value > 0:
+        return value
+    return fallback
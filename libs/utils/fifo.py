@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+#   FIFO: Wakeup Signal
+#
+#                                Written in 2021 by Moky <albert.moky@gmail.com>
+#
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2021 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+import asyncio
+import errno
+import os
+import tempfile
+from typing import Optional
+
+
+def fifo_path(key: int) -> str:
+    """ named pipe for the shared memory with same key """
+    return os.path.join(tempfile.gettempdir(), 'dim_ipc_%08X.fifo' % key)
+
+
+def create_fifo(path: str, mode: int):
+    try:
+        os.mkfifo(path, mode)
+    except FileExistsError:
+        pass
+
+
+class FifoSignal:
+    """
+        Wakeup Signal
+        ~~~~~~~~~~~~~
+
+        A named pipe between two processes, the sender writes one byte after
+        data pushed into the shared memory, and the receiver blocks on reading
+        until that byte arrives, instead of polling the shared memory.
+
+        The receiver opens the pipe for reading & writing, so it never gets EOF
+        when the sender exits, and the sender can open it without blocking.
+    """
+
+    MODE = 0o644
+
+    def __init__(self, key: int):
+        super().__init__()
+        self.__path = fifo_path(key=key)
+        self.__reader: Optional[int] = None
+        self.__writer: Optional[int] = None
+        create_fifo(path=self.__path, mode=self.MODE)
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    def __str__(self) -> str:
+        cname = self.__class__.__name__
+        return '<%s path="%s" />' % (cname, self.__path)
+
+    def __repr__(self) -> str:
+        cname = self.__class__.__name__
+        return '<%s path="%s" />' % (cname, self.__path)
+
+    def __get_reader(self) -> int:
+        fd = self.__reader
+        if fd is None:
+            fd = os.open(self.__path, os.O_RDWR | os.O_NONBLOCK)
+            self.__reader = fd
+        return fd
+
+    def __get_writer(self) -> Optional[int]:
+        fd = self.__writer
+        if fd is None:
+            try:
+                fd = os.open(self.__path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as error:
+                if error.errno == errno.ENXIO:
+                    # receiver not running yet, it will read the shared memory
+                    # when started, so no need to wake it up
+                    return None
+                raise error
+            self.__writer = fd
+        return fd
+
+    def notify(self):
+        """ called by sender after data pushed """
+        fd = self.__get_writer()
+        if fd is None:
+            return
+        try:
+            os.write(fd, b'\1')
+        except BlockingIOError:
+            # pipe is full, the receiver has enough signals to wake up
+            pass
+        except BrokenPipeError:
+            # receiver exited, reopen next time
+            self.__writer = None
+            os.close(fd)
+
+    def clear(self):
+        """ drain all pending signals """
+        fd = self.__get_reader()
+        try:
+            while len(os.read(fd, 4096)) == 4096:
+                pass
+        except BlockingIOError:
+            pass
+
+    async def wait(self, timeout: float) -> bool:
+        """
+        Called by receiver to wait for signal
+
+        :param timeout: max seconds to wait
+        :return: False on timeout
+        """
+        fd = self.__get_reader()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        loop.add_reader(fd, lambda: future.done() or future.set_result(True))
+        try:
+            await asyncio.wait_for(future, timeout=timeout)
+            signaled = True
+        except asyncio.TimeoutError:
+            signaled = False
+        finally:
+            loop.remove_reader(fd)
+        if signaled:
+            self.clear()
+        return signaled
+
+    def close(self):
+        fd = self.__reader
+        if fd is not None:
+            self.__reader = None
+            os.close(fd)
+        fd = self.__writer
+        if fd is not None:
+            self.__writer = None
+            os.close(fd)
+
+    def destroy(self):
+        self.close()
+        try:
+            os.remove(self.__path)
+        except FileNotFoundError:
+            pass
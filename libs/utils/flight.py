@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#
+#   Single Flight: Request Coalescing
+#
+#                                Written in 2021 by Moky <albert.moky@gmail.com>
+#
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2021 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+import asyncio
+import threading
+from typing import Generic, TypeVar, Optional, Any, Callable, Awaitable, List, Tuple, Dict
+
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+
+class Flight:
+    """ Loading task for one key """
+
+    def __init__(self):
+        super().__init__()
+        # waiting futures, with their event loops
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+
+class SingleFlight(Generic[K, V]):
+    """
+        Single Flight
+        ~~~~~~~~~~~~~
+
+        Only one loader for each key, others await the result of it.
+
+        The waiters may run in other threads (with their own event loops),
+        or in the same event loop with the loader, so the results are sent
+        back with 'call_soon_threadsafe()'.
+
+        If the loader is cancelled (e.g. its connection closed), the waiters
+        get RETRY instead of the cancellation, and one of them loads again.
+    """
+
+    # result for waiters when the loader was cancelled
+    RETRY = object()
+
+    def __init__(self):
+        super().__init__()
+        self.__flights: Dict[K, Flight] = {}
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """ count of flights """
+        with self.__lock:
+            return len(self.__flights)
+
+    def acquire(self, key: K) -> Optional[asyncio.Future]:
+        """
+        Start loading for the key
+
+        :param key: cache key
+        :return: None for the caller to be the loader, or a future to await
+        """
+        with self.__lock:
+            flight = self.__flights.get(key)
+            if flight is None:
+                self.__flights[key] = Flight()
+                return None
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            flight.waiters.append((loop, future))
+            return future
+
+    def release(self, key: K, value: Optional[V] = None, error: Optional[BaseException] = None):
+        """ Finish loading, send the result (or error) to all waiters """
+        if isinstance(error, asyncio.CancelledError):
+            # the loader was cancelled, not the waiters
+            value = self.RETRY
+            error = None
+        with self.__lock:
+            flight = self.__flights.pop(key, None)
+        if flight is None:
+            return
+        for loop, future in flight.waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future, value, error)
+            except RuntimeError:
+                # event loop closed
+                pass
+
+    async def run(self, key: K, loader: Callable[[], Awaitable[V]]) -> Optional[V]:
+        """ Load value with the loader, or wait for the one loading now """
+        while True:
+            future = self.acquire(key=key)
+            if future is None:
+                # this is the loader
+                break
+            value = await future
+            if value is not self.RETRY:
+                return value
+        try:
+            value = await loader()
+        except BaseException as error:
+            self.release(key=key, error=error)
+            raise error
+        self.release(key=key, value=value)
+        return value
+
+
+def _resolve(future: asyncio.Future, value: Any, error: Optional[BaseException]):
+    if future.done():
+        # cancelled
+        return
+    elif error is None:
+        future.set_result(value)
+    else:
+        future.set_exception(error)
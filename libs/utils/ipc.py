@@ -28,39 +28,149 @@
 # SOFTWARE.
 # ==============================================================================
 
+import json
 import threading
+import time
 from abc import ABC
-from typing import Optional, Tuple, Any
+from typing import Optional, Union, Tuple, List, Dict, Any
 
+from mkm.types import Converter
 from startrek.skywalker import Runner
 
-from ipx import Arrow, SharedMemoryArrow
+from dimples.utils import Config
+
+from ipx import SharedMemoryArrow
 # from ipx.shm.mmap import MmapSharedMemoryController as DefaultController
 # from ipx.shm.mp import MpSharedMemoryController as DefaultController
 from .sysv import SysvSharedMemoryController as DefaultController
+from .sysv import key_from_name
+from .fifo import FifoSignal
+
+
+class RawController(DefaultController):
+    """ shift raw data, arrows decode it themselves """
+
+    # Override
+    def _decode(self, data: Union[bytes, bytearray]) -> Any:
+        return data
+
+
+class ArrowCounter:
+    """ Traffic counters of an arrow """
+
+    def __init__(self):
+        super().__init__()
+        self.objects = 0  # objects sent/received
+        self.frames = 0   # frames sent/received, one frame may contain many objects
+        self.bytes = 0    # bytes sent/received
+        self.drops = 0    # objects dropped
+
+    def __str__(self) -> str:
+        cname = self.__class__.__name__
+        return '<%s objects=%d frames=%d bytes=%d drops=%d />' % (cname, self.objects, self.frames,
+                                                                   self.bytes, self.drops)
+
+    def __repr__(self) -> str:
+        cname = self.__class__.__name__
+        return '<%s objects=%d frames=%d bytes=%d drops=%d />' % (cname, self.objects, self.frames,
+                                                                   self.bytes, self.drops)
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            'objects': self.objects,
+            'frames': self.frames,
+            'bytes': self.bytes,
+            'drops': self.drops,
+        }
 
 
 # noinspection PyAbstractClass
 class AutoArrow(Runner, ABC):
 
-    # Memory cache size: 64KB
+    # default memory cache size: 64KB
     SHM_SIZE = 1 << 16
 
-    def __init__(self, name: str):
+    # default max frames waiting for the shared memory
+    MAX_PENDING = 65536
+
+    # max objects in one frame
+    MAX_BATCH = 256
+
+    # frame contains a list of objects: '\x1e' + JsON array
+    BATCH_PREFIX = b'\x1e'
+
+    # wake up the receiver when data sent, instead of polling every 100 ms
+    WAKEUP_ENABLED = True
+
+    # max seconds to wait for wakeup signal when idle
+    IDLE_TIMEOUT = 2.0
+
+    def __init__(self, name: str, size: int = 0, max_pending: int = 0):
+        """
+        Create arrow with shared memory
+
+        :param name:        shared memory key: '0xD1350101'
+        :param size:        shared memory size, must be same in both processes
+        :param max_pending: max frames waiting for the shared memory
+        """
         super().__init__(interval=Runner.INTERVAL_SLOW)
-        controller = DefaultController.new(size=self.SHM_SIZE, name=name)
-        self.__arrow = SharedMemoryArrow(controller=controller)
+        if size <= 0:
+            size = self.SHM_SIZE
+        if max_pending <= 0:
+            max_pending = self.MAX_PENDING
+        controller = RawController.new(size=size, name=name)
+        self.__arrow = SharedMemoryArrow(controller=controller, max_departures=max_pending)
+        self.__max_pending = max_pending
+        self.__counter = ArrowCounter()
+        if self.WAKEUP_ENABLED:
+            self.__signal = FifoSignal(key=key_from_name(name=name))
+        else:
+            self.__signal = None
 
     @property  # protected
-    def arrow(self) -> Arrow:
+    def arrow(self) -> SharedMemoryArrow:
         return self.__arrow
 
+    @property  # protected
+    def signal(self) -> Optional[FifoSignal]:
+        return self.__signal
+
+    @property
+    def max_pending(self) -> int:
+        return self.__max_pending
+
+    @property
+    def counter(self) -> ArrowCounter:
+        return self.__counter
+
+    # protected
+    @classmethod
+    def _encode(cls, obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    # protected
+    @classmethod
+    def _encode_batch(cls, objects: List[Any]) -> bytes:
+        return cls.BATCH_PREFIX + cls._encode(obj=objects)
+
+    # protected
+    @classmethod
+    def _decode(cls, data: Union[bytes, bytearray]) -> List[Any]:
+        """ decode frame to objects """
+        try:
+            if data[:1] == cls.BATCH_PREFIX:
+                return json.loads(data[1:])
+            return [json.loads(data)]
+        except ValueError:
+            # not json, return the raw data
+            return [data]
+
 
 class IncomeArrow(AutoArrow):
     """ auto receiving """
 
-    def __init__(self, name: str):
-        super().__init__(name=name)
+    def __init__(self, name: str, size: int = 0, max_pending: int = 0):
+        super().__init__(name=name, size=size, max_pending=max_pending)
         self.__lock = threading.Lock()
         self.__pool = []
 
@@ -69,45 +179,176 @@ class IncomeArrow(AutoArrow):
             if len(self.__pool) > 0:
                 return self.__pool.pop(0)
 
+    def receive_batch(self, max_count: int = 0) -> List[Any]:
+        """ receive objects in the pool, all when max_count is 0 """
+        with self.__lock:
+            pool = self.__pool
+            if max_count <= 0 or max_count >= len(pool):
+                self.__pool = []
+                return pool
+            objects = pool[:max_count]
+            self.__pool = pool[max_count:]
+            return objects
+
     # Override
     async def process(self) -> bool:
-        # drive the arrow to receive objects
-        obj = self.arrow.receive()
-        if obj is None:
+        # drive the arrow to receive frames
+        data = self.arrow.receive()
+        if data is None:
             return False
+        elif isinstance(data, (bytes, bytearray)):
+            objects = self._decode(data=data)
+            size = len(data)
+        else:
+            # decoded by controller
+            objects = [data]
+            size = 0
         with self.__lock:
-            self.__pool.append(obj)
+            self.__pool.extend(objects)
+            counter = self.counter
+            counter.objects += len(objects)
+            counter.frames += 1
+            counter.bytes += size
         return True
 
+    async def wait(self, timeout: float) -> bool:
+        """ wait for sender's signal, False on timeout """
+        signal = self.signal
+        if signal is None:
+            await self.sleep(seconds=self.interval)
+            return False
+        return await signal.wait(timeout=timeout)
+
+    # Override
+    async def _idle(self):
+        await self.wait(timeout=self.IDLE_TIMEOUT)
+
 
 class OutgoArrow(AutoArrow):
     """ auto sending """
 
-    def __init__(self, name: str):
-        super().__init__(name=name)
+    # max seconds to wait in blocking mode
+    SEND_TIMEOUT = 8.0
+
+    # seconds to sleep while waiting for the receiver
+    BLOCKING_INTERVAL = 0.01
+
+    def __init__(self, name: str, size: int = 0, max_pending: int = 0, blocking: bool = False):
+        """
+        Create outgoing arrow
+
+        :param blocking: True to wait (up to SEND_TIMEOUT seconds) for the receiver
+                         when too many frames pending, instead of dropping them;
+                         caller will be blocked, so don't enable it in event loop
+        """
+        super().__init__(name=name, size=size, max_pending=max_pending)
+        self.__blocking = blocking
         self.__lock = threading.Lock()
+        self.__pending = 0  # count of delayed frames
+
+    @property
+    def blocking(self) -> bool:
+        return self.__blocking
+
+    @property
+    def pending(self) -> int:
+        """ count of frames waiting to be re-sent """
+        return self.__pending
 
     def send(self, obj: Optional[Any]) -> int:
         """ return -1 on failed """
-        with self.__lock:
+        if obj is None:
+            # drive the arrow to re-send delay frames
+            with self.__lock:
+                return self.__send(data=None, count=0)
+        try:
+            data = self._encode(obj=obj)
+        except Exception as error:
+            print('[IPC] failed to encode: %s, %s' % (obj, error))
+            return -1
+        return self.__send_frame(data=data, count=1)
+
+    def send_batch(self, objects: List[Any]) -> int:
+        """ send objects in frames of MAX_BATCH, return -1 on failed """
+        cnt = 0
+        for start in range(0, len(objects), self.MAX_BATCH):
+            frame = objects[start:start + self.MAX_BATCH]
             try:
-                cnt = self.arrow.send(obj=obj)
-                if cnt < 0:
-                    print('[IPC] waiting queue is full, dropped: %s' % obj)
-                return cnt
+                data = self._encode_batch(objects=frame)
             except Exception as error:
-                print('[IPC] failed to send: %s, %s' % (obj, error))
+                print('[IPC] failed to encode %d objects: %s' % (len(frame), error))
                 return -1
+            cnt = self.__send_frame(data=data, count=len(frame))
+            if cnt < 0:
+                return cnt
+        return cnt
+
+    def __send_frame(self, data: bytes, count: int) -> int:
+        if self.__blocking and not self.__wait():
+            with self.__lock:
+                self.counter.drops += count
+            print('[IPC] receiver too slow, dropped %d object(s) after %f seconds, pending: %d'
+                  % (count, self.SEND_TIMEOUT, self.__pending))
+            return -1
+        with self.__lock:
+            return self.__send(data=data, count=count)
+
+    def __wait(self) -> bool:
+        """ wait for pending frames sent """
+        expired = time.time() + self.SEND_TIMEOUT
+        while True:
+            with self.__lock:
+                cnt = self.__send(data=None, count=0)
+            if 0 <= cnt < self.max_pending:
+                return True
+            elif time.time() > expired:
+                return False
+            time.sleep(self.BLOCKING_INTERVAL)
+
+    def __send(self, data: Optional[bytes], count: int) -> int:
+        counter = self.counter
+        controller = self.arrow.controller
+        writes = controller.writes
+        try:
+            cnt = self.arrow.send(obj=data)
+        except Exception as error:
+            print('[IPC] failed to send %d object(s): %s' % (count, error))
+            counter.drops += count
+            return -1
+        if controller.writes != writes:
+            # new packages (or chunks of giant data) pushed into the shared memory
+            self.__notify()
+        if cnt < 0:
+            print('[IPC] waiting queue is full, dropped %d object(s), pending: %d' % (count, self.__pending))
+            counter.drops += count
+            return cnt
+        self.__pending = cnt
+        if data is not None:
+            counter.objects += count
+            counter.frames += 1
+            counter.bytes += len(data)
+        return cnt
+
+    def __notify(self):
+        signal = self.signal
+        if signal is not None:
+            try:
+                signal.notify()
+            except OSError as error:
+                print('[IPC] failed to wake up receiver: %s, %s' % (signal, error))
 
     # Override
     async def process(self) -> bool:
-        # send None to drive the arrow to re-send delay objects
+        # send None to drive the arrow to re-send delay frames
         self.send(obj=None)
         return False
 
 
 class Pipe(Runner):
 
+    # config section for pipes
+    SECTION = 'ipc'
+
     def __init__(self, arrows: Tuple[Optional[IncomeArrow], Optional[OutgoArrow]]):
         super().__init__(interval=Runner.INTERVAL_SLOW)
         self.__income_arrow = arrows[0]
@@ -116,9 +357,29 @@ class Pipe(Runner):
     def send(self, obj: Optional[Any]) -> int:
         return self.__outgo_arrow.send(obj=obj)
 
+    def send_batch(self, objects: List[Any]) -> int:
+        return self.__outgo_arrow.send_batch(objects=objects)
+
     def receive(self) -> Optional[Any]:
         return self.__income_arrow.receive()
 
+    def receive_batch(self, max_count: int = 0) -> List[Any]:
+        return self.__income_arrow.receive_batch(max_count=max_count)
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """ traffic counters: 'sent' & 'received' """
+        info = {}
+        outgoing = self.__outgo_arrow
+        if outgoing is not None:
+            sent = outgoing.counter.to_dict()
+            sent['pending'] = outgoing.pending
+            info['sent'] = sent
+        incoming = self.__income_arrow
+        if incoming is not None:
+            info['received'] = incoming.counter.to_dict()
+        return info
+
     # Override
     async def process(self) -> bool:
         incoming = self.__income_arrow
@@ -130,6 +391,51 @@ class Pipe(Runner):
         if incoming is not None:
             return await incoming.process()
 
+    # Override
+    async def _idle(self):
+        incoming = self.__income_arrow
+        outgoing = self.__outgo_arrow
+        if incoming is None:
+            # nothing to receive, re-send delay objects later
+            await self.sleep(seconds=self.interval)
+        elif outgoing is not None and outgoing.pending > 0:
+            # wake up in time to re-send delay objects
+            await incoming.wait(timeout=self.interval)
+        else:
+            await incoming.wait(timeout=incoming.IDLE_TIMEOUT)
+
+    @classmethod
+    def create_arrows(cls, config: Optional[Config], name: str,
+                      income_key: Optional[str], outgo_key: Optional[str]):
+        """
+        Create arrows with options in config section '[ipc]':
+
+            {name}_size        - shared memory size (bytes) for each direction
+            {name}_max_pending - max frames waiting for the shared memory
+
+        the senders run in event loops, so the outgoing arrows never block
+
+        :param config:     config
+        :param name:       pipe name: 'receptionist', 'archivist', ...
+        :param income_key: shared memory key for incoming arrow
+        :param outgo_key:  shared memory key for outgoing arrow
+        :return: arrows
+        """
+        options = None if config is None else config.get_section(section=cls.SECTION)
+        if options is None:
+            options = {}
+        size = Converter.get_int(value=options.get('%s_size' % name), default=0)
+        max_pending = Converter.get_int(value=options.get('%s_max_pending' % name), default=0)
+        if income_key is None:
+            incoming = None
+        else:
+            incoming = IncomeArrow(name=income_key, size=size, max_pending=max_pending)
+        if outgo_key is None:
+            outgoing = None
+        else:
+            outgoing = OutgoArrow(name=outgo_key, size=size, max_pending=max_pending)
+        return incoming, outgoing
+
 
 class SHM:
     """
@@ -162,73 +468,77 @@ class ReceptionistPipe(Pipe):
     """ arrows between router and receptionist """
 
     @classmethod
-    def primary(cls) -> Pipe:  # arrows for router
-        incoming = IncomeArrow(name=SHM.RECEPTIONIST_KEY2)
-        outgoing = OutgoArrow(name=SHM.RECEPTIONIST_KEY1)
-        return cls(arrows=(incoming, outgoing))
+    def primary(cls, config: Config = None) -> Pipe:  # arrows for router
+        arrows = cls.create_arrows(config=config, name='receptionist',
+                                   income_key=SHM.RECEPTIONIST_KEY2, outgo_key=SHM.RECEPTIONIST_KEY1)
+        return cls(arrows=arrows)
 
     @classmethod
-    def secondary(cls) -> Pipe:  # arrows for receptionist
-        incoming = IncomeArrow(name=SHM.RECEPTIONIST_KEY1)
-        outgoing = OutgoArrow(name=SHM.RECEPTIONIST_KEY2)
-        return cls(arrows=(incoming, outgoing))
+    def secondary(cls, config: Config = None) -> Pipe:  # arrows for receptionist
+        arrows = cls.create_arrows(config=config, name='receptionist',
+                                   income_key=SHM.RECEPTIONIST_KEY1, outgo_key=SHM.RECEPTIONIST_KEY2)
+        return cls(arrows=arrows)
 
 
 class ArchivistPipe(Pipe):
     """ arrows between router and archivist """
 
     @classmethod
-    def primary(cls) -> Pipe:  # arrows for router
-        incoming = IncomeArrow(name=SHM.ARCHIVIST_KEY2)
-        outgoing = OutgoArrow(name=SHM.ARCHIVIST_KEY1)
-        return cls(arrows=(incoming, outgoing))
+    def primary(cls, config: Config = None) -> Pipe:  # arrows for router
+        arrows = cls.create_arrows(config=config, name='archivist',
+                                   income_key=SHM.ARCHIVIST_KEY2, outgo_key=SHM.ARCHIVIST_KEY1)
+        return cls(arrows=arrows)
 
     @classmethod
-    def secondary(cls) -> Pipe:  # arrows for archivist
-        incoming = IncomeArrow(name=SHM.ARCHIVIST_KEY1)
-        outgoing = OutgoArrow(name=SHM.ARCHIVIST_KEY2)
-        return cls(arrows=(incoming, outgoing))
+    def secondary(cls, config: Config = None) -> Pipe:  # arrows for archivist
+        arrows = cls.create_arrows(config=config, name='archivist',
+                                   income_key=SHM.ARCHIVIST_KEY1, outgo_key=SHM.ARCHIVIST_KEY2)
+        return cls(arrows=arrows)
 
 
 class OctopusPipe(Pipe):
     """ arrows between router and bridge """
 
     @classmethod
-    def primary(cls) -> Pipe:  # arrows for router
-        incoming = IncomeArrow(name=SHM.OCTOPUS_KEY2)
-        outgoing = OutgoArrow(name=SHM.OCTOPUS_KEY1)
-        return cls(arrows=(incoming, outgoing))
+    def primary(cls, config: Config = None) -> Pipe:  # arrows for router
+        arrows = cls.create_arrows(config=config, name='octopus',
+                                   income_key=SHM.OCTOPUS_KEY2, outgo_key=SHM.OCTOPUS_KEY1)
+        return cls(arrows=arrows)
 
     @classmethod
-    def secondary(cls) -> Pipe:  # arrows for octopus
-        incoming = IncomeArrow(name=SHM.OCTOPUS_KEY1)
-        outgoing = OutgoArrow(name=SHM.OCTOPUS_KEY2)
-        return cls(arrows=(incoming, outgoing))
+    def secondary(cls, config: Config = None) -> Pipe:  # arrows for octopus
+        arrows = cls.create_arrows(config=config, name='octopus',
+                                   income_key=SHM.OCTOPUS_KEY1, outgo_key=SHM.OCTOPUS_KEY2)
+        return cls(arrows=arrows)
 
 
 class PusherPipe(Pipe):
     """ arrow from router(dispatcher) to pusher """
 
     @classmethod
-    def primary(cls) -> Pipe:  # arrow for router(dispatcher)
-        outgoing = OutgoArrow(name=SHM.PUSHER_KEY)
-        return cls(arrows=(None, outgoing))
+    def primary(cls, config: Config = None) -> Pipe:  # arrow for router(dispatcher)
+        arrows = cls.create_arrows(config=config, name='pusher',
+                                   income_key=None, outgo_key=SHM.PUSHER_KEY)
+        return cls(arrows=arrows)
 
     @classmethod
-    def secondary(cls) -> Pipe:  # arrow for pusher
-        incoming = IncomeArrow(name=SHM.PUSHER_KEY)
-        return cls(arrows=(incoming, None))
+    def secondary(cls, config: Config = None) -> Pipe:  # arrow for pusher
+        arrows = cls.create_arrows(config=config, name='pusher',
+                                   income_key=SHM.PUSHER_KEY, outgo_key=None)
+        return cls(arrows=arrows)
 
 
 class MonitorPipe(Pipe):
     """ arrow from router(dispatcher) to monitor """
 
     @classmethod
-    def primary(cls) -> Pipe:  # arrow for router(dispatcher)
-        outgoing = OutgoArrow(name=SHM.MONITOR_KEY)
-        return cls(arrows=(None, outgoing))
+    def primary(cls, config: Config = None) -> Pipe:  # arrow for router(dispatcher)
+        arrows = cls.create_arrows(config=config, name='monitor',
+                                   income_key=None, outgo_key=SHM.MONITOR_KEY)
+        return cls(arrows=arrows)
 
     @classmethod
-    def secondary(cls) -> Pipe:  # arrow for monitor
-        incoming = IncomeArrow(name=SHM.MONITOR_KEY)
-        return cls(arrows=(incoming, None))
+    def secondary(cls, config: Config = None) -> Pipe:  # arrow for monitor
+        arrows = cls.create_arrows(config=config, name='monitor',
+                                   income_key=SHM.MONITOR_KEY, outgo_key=None)
+        return cls(arrows=arrows)
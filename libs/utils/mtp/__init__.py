@@ -11,6 +11,8 @@ from .contact import *
 from .manager import *
 from .server import *
 from .utils import *
+from .stats import MTPStatistics
+from .compress import Compressor
 
 
 __all__ = [
@@ -22,4 +24,6 @@ __all__ = [
 
     'Server',
     'MTPUtils',
+    'MTPStatistics',
+    'Compressor',
 ]
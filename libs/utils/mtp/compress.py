@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+import zlib
+from typing import Optional, Union, List
+
+try:
+    import zstandard  # 'zstandard' is optional
+except ImportError:
+    zstandard = None
+
+
+class Compressor:
+    """
+        Message Compression
+        ~~~~~~~~~~~~~~~~~~~
+
+        Compressed data can be told apart from JsON ('{') and D-MTP (0x01)
+        by the first byte, so no extra header is needed:
+            zlib - 0x78
+            zstd - 0x28 (magic number: 0xFD2FB528, little-endian)
+
+        A shared dictionary trained with typical envelopes can be loaded,
+        it will be used only when the remote side has the same one
+        (same 'dictionary_id').
+    """
+
+    ZLIB = 'zlib'
+    ZSTD = 'zstd'
+
+    ZLIB_LEVEL = 6
+    ZSTD_LEVEL = 3
+
+    # compress only when data is larger than this
+    THRESHOLD = 1024
+
+    # max size after decompressed
+    MAX_SIZE = 1 << 24  # 16 MB
+
+    # shared dictionary
+    __dictionary: Optional[bytes] = None
+    __dictionary_id: int = 0
+    __zstd_dict = None  # trained dictionary for zstd
+
+    @classmethod
+    def algorithms(cls) -> List[str]:
+        """ supported algorithms, preferred first """
+        if zstandard is None:
+            return [cls.ZLIB]
+        return [cls.ZSTD, cls.ZLIB]
+
+    @classmethod
+    def dictionary_id(cls) -> int:
+        """ adler32 of the shared dictionary, 0 means no dictionary """
+        return cls.__dictionary_id
+
+    @classmethod
+    def set_dictionary(cls, data: Optional[bytes]):
+        if data is None or len(data) == 0:
+            cls.__dictionary = None
+            cls.__dictionary_id = 0
+            cls.__zstd_dict = None
+            return
+        cls.__dictionary = data
+        cls.__dictionary_id = zlib.adler32(data)
+        if zstandard is None:
+            cls.__zstd_dict = None
+        else:
+            # only a trained dictionary has ID in zstd frames,
+            # raw content can be used by zlib only
+            dict_data = zstandard.ZstdCompressionDict(data)
+            cls.__zstd_dict = dict_data if dict_data.dict_id() != 0 else None
+
+    @classmethod
+    def train_dictionary(cls, samples: List[bytes], size: int = 16384) -> bytes:
+        """ build dictionary from serialized messages """
+        if zstandard is not None and len(samples) >= 8:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        # zlib: strings at the end of dictionary are used more cheaply,
+        #       so put the most common samples at last
+        data = b''
+        for item in samples:
+            if len(data) + len(item) > size:
+                continue
+            data = item + data
+        return data
+
+    @classmethod
+    def is_compressed(cls, data: Union[bytes, bytearray]) -> bool:
+        ch = data[0]
+        return ch == 0x78 or ch == 0x28
+
+    @classmethod
+    def compress(cls, data: Union[bytes, bytearray], algorithm: str, use_dictionary: bool = False) -> bytes:
+        if algorithm == cls.ZSTD:
+            assert zstandard is not None, 'zstd not supported'
+            dict_data = cls.__zstd_dict if use_dictionary else None
+            if dict_data is None:
+                compressor = zstandard.ZstdCompressor(level=cls.ZSTD_LEVEL)
+            else:
+                compressor = zstandard.ZstdCompressor(level=cls.ZSTD_LEVEL, dict_data=dict_data)
+            return compressor.compress(data)
+        assert algorithm == cls.ZLIB, 'compression algorithm error: %s' % algorithm
+        dictionary = cls.__dictionary if use_dictionary else None
+        if dictionary is None:
+            return zlib.compress(data, cls.ZLIB_LEVEL)
+        compressor = zlib.compressobj(level=cls.ZLIB_LEVEL, zdict=dictionary)
+        return compressor.compress(data) + compressor.flush()
+
+    @classmethod
+    def decompress(cls, data: Union[bytes, bytearray]) -> bytes:
+        """ decompress data, raise ValueError on error """
+        ch = data[0]
+        if ch == 0x78:
+            return cls.__zlib_decompress(data=data)
+        elif ch == 0x28:
+            return cls.__zstd_decompress(data=data)
+        raise ValueError('data not compressed: %s' % data[:8])
+
+    @classmethod
+    def __zlib_decompress(cls, data: Union[bytes, bytearray]) -> bytes:
+        if data[1] & 0x20:
+            # FDICT
+            dictionary = cls.__dictionary
+            if dictionary is None:
+                raise ValueError('zlib dictionary not found')
+            decompressor = zlib.decompressobj(zdict=dictionary)
+        else:
+            decompressor = zlib.decompressobj()
+        try:
+            plain = decompressor.decompress(data, cls.MAX_SIZE)
+        except zlib.error as error:
+            raise ValueError('zlib error: %s' % error)
+        if decompressor.unconsumed_tail:
+            raise ValueError('zlib data too large: > %d' % cls.MAX_SIZE)
+        return plain
+
+    @classmethod
+    def __zstd_decompress(cls, data: Union[bytes, bytearray]) -> bytes:
+        if zstandard is None:
+            raise ValueError('zstd not supported')
+        try:
+            params = zstandard.get_frame_parameters(data)
+            if params.content_size > cls.MAX_SIZE:
+                raise ValueError('zstd data too large: %d' % params.content_size)
+            if params.dict_id == 0:
+                decompressor = zstandard.ZstdDecompressor()
+            else:
+                dict_data = cls.__zstd_dict
+                if dict_data is None or dict_data.dict_id() != params.dict_id:
+                    raise ValueError('zstd dictionary not found: %d' % params.dict_id)
+                decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+            return decompressor.decompress(data, max_output_size=cls.MAX_SIZE)
+        except zstandard.ZstdError as error:
+            raise ValueError('zstd error: %s' % error)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from typing import List, Dict
+
+from dimples import ReliableMessage
+from dimples import json_encode
+from dimples.utils import Singleton
+
+
+@Singleton
+class MTPStatistics:
+    """
+        Traffic counters for each message format ('json', 'dmtp')
+
+        The size of a message in JsON is sampled every SAMPLE_RATE messages,
+        to estimate how many bytes saved by the compact formats.
+    """
+
+    SAMPLE_RATE = 16
+
+    def __init__(self):
+        super().__init__()
+        # format name => [messages, bytes, sampled bytes, sampled bytes in JsON]
+        self.__sent: Dict[str, List[int]] = {}
+        self.__received: Dict[str, List[int]] = {}
+        # algorithm name => [messages, bytes, compressed bytes, seconds]
+        self.__compressed: Dict[str, List[float]] = {}
+        self.__decompressed: List[float] = [0, 0, 0, 0]
+        self.__lock = threading.Lock()
+
+    def sent(self, mtp: str, data: bytes, msg: ReliableMessage):
+        self.__count(table=self.__sent, mtp=mtp, data=data, msg=msg)
+
+    def received(self, mtp: str, data: bytes, msg: ReliableMessage):
+        self.__count(table=self.__received, mtp=mtp, data=data, msg=msg)
+
+    def compressed(self, algorithm: str, size: int, packed: int, seconds: float):
+        with self.__lock:
+            counters = self.__compressed.get(algorithm)
+            if counters is None:
+                counters = self.__compressed[algorithm] = [0, 0, 0, 0.0]
+            _add_counters(counters=counters, size=size, packed=packed, seconds=seconds)
+
+    def decompressed(self, size: int, packed: int, seconds: float):
+        with self.__lock:
+            _add_counters(counters=self.__decompressed, size=size, packed=packed, seconds=seconds)
+
+    def __count(self, table: Dict[str, List[int]], mtp: str, data: bytes, msg: ReliableMessage):
+        with self.__lock:
+            counters = table.get(mtp)
+            if counters is None:
+                counters = table[mtp] = [0, 0, 0, 0]
+            counters[0] += 1
+            counters[1] += len(data)
+            if mtp == 'json' or counters[0] % self.SAMPLE_RATE != 1:
+                return
+        json_size = len(json_encode(obj=msg.dictionary).encode('utf-8'))
+        with self.__lock:
+            counters[2] += len(data)
+            counters[3] += json_size
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """
+        Get counters for each format
+
+        :return: {'sent': {'dmtp': {'messages': 1, 'bytes': 2, 'saved': 3}}, 'received': ...,
+                  'compressed': {'zlib': {'messages': 1, 'bytes': 2, 'saved': 1, 'cpu_ms': 0.1}},
+                  'decompressed': {'messages': 1, 'bytes': 2, 'saved': 1, 'cpu_ms': 0.1}}
+        """
+        with self.__lock:
+            return {
+                'sent': _summary(table=self.__sent),
+                'received': _summary(table=self.__received),
+                'compressed': {
+                    name: _compression_summary(counters=counters) for name, counters in self.__compressed.items()
+                },
+                'decompressed': _compression_summary(counters=self.__decompressed),
+            }
+
+
+def _summary(table: Dict[str, List[int]]) -> Dict[str, Dict[str, int]]:
+    info = {}
+    for mtp, counters in table.items():
+        messages, size, sampled, sampled_json = counters
+        if sampled > 0 and sampled_json > 0:
+            # estimate bytes in JsON with the sampled ratio
+            saved = int(size * sampled_json / sampled) - size
+        else:
+            saved = 0
+        info[mtp] = {
+            'messages': messages,
+            'bytes': size,
+            'saved': saved,
+        }
+    return info
+
+
+def _add_counters(counters: List[float], size: int, packed: int, seconds: float):
+    counters[0] += 1
+    counters[1] += size
+    counters[2] += packed
+    counters[3] += seconds
+
+
+def _compression_summary(counters: List[float]) -> Dict[str, float]:
+    messages, size, packed, seconds = counters
+    return {
+        'messages': messages,
+        'bytes': size,
+        'saved': size - packed,
+        'cpu_ms': seconds * 1000,
+    }
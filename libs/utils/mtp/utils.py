@@ -1,15 +1,12 @@
 # -*- coding: utf-8 -*-
 
-from typing import Optional, Union
+import binascii
+from typing import Optional, Union, List
 
-from udp.ba import ByteArray, Data, MutableData, VarIntData
+from udp.ba import ByteArray, Data
 from udp.mtp import DataType, TransactionID, Header, Package
 
-from dmtp import Message
-from dmtp import StringValue, BinaryValue
-
-from dimples import base64_encode, base64_decode
-from dimples import utf8_decode, utf8_encode
+from dimples import utf8_encode
 from dimples import json_encode, json_decode
 from dimples import ReliableMessage
 
@@ -33,7 +30,28 @@ class MTPUtils:
 
     @classmethod
     def serialize_message(cls, msg: ReliableMessage) -> bytes:
+        """
+        Encode message fields straight into the D-MTP buffer,
+        without modifying the message dictionary
+        """
         info = msg.dictionary
+        fields = []
+        #
+        #  envelope
+        #
+        _append_field(fields, _TAG_SENDER, utf8_encode(string=str(info.get('sender'))))
+        _append_field(fields, _TAG_RECEIVER, utf8_encode(string=str(info.get('receiver'))))
+        msg_time = info.get('time')
+        if msg_time is not None:
+            # uint32, seconds
+            _append_field(fields, _TAG_TIME, int(msg_time).to_bytes(length=4, byteorder='big'))
+        msg_type = info.get('type')
+        if msg_type is not None:
+            # uint8
+            _append_field(fields, _TAG_TYPE, bytes([int(msg_type) & 0xFF]))
+        group = info.get('group')
+        if group is not None:
+            _append_field(fields, _TAG_GROUP, utf8_encode(string=str(group)))
         #
         #  body
         #
@@ -42,14 +60,14 @@ class MTPUtils:
             assert isinstance(content, str), 'reliable message content error: %s' % content
             if content.startswith('{'):
                 # JsON
-                info['data'] = utf8_encode(string=content)
+                _append_field(fields, _TAG_CONTENT, utf8_encode(string=content))
             else:
                 # Base64
-                info['data'] = base64_decode(string=content)
+                _append_field(fields, _TAG_CONTENT, binascii.a2b_base64(content))
         signature = info.get('signature')
         if signature is not None:
             assert isinstance(signature, str), 'reliable message signature error: %s' % signature
-            info['signature'] = base64_decode(string=signature)
+            _append_field(fields, _TAG_SIGNATURE, binascii.a2b_base64(signature))
         # symmetric key/keys
         key = info.get('key')
         if key is None:
@@ -57,10 +75,10 @@ class MTPUtils:
             if keys is not None:
                 assert isinstance(keys, dict), 'reliable message keys error: %s' % keys
                 # DMTP store both 'keys' and 'key' in 'key'
-                info['key'] = b'KEYS:' + build_keys(keys=keys)
+                _append_field(fields, _TAG_KEY, b'KEYS:' + build_keys(keys=keys))
         else:
             assert isinstance(key, str), 'reliable message key error: %s' % key
-            info['key'] = base64_decode(string=key)
+            _append_field(fields, _TAG_KEY, binascii.a2b_base64(key))
         #
         #  attachments
         #
@@ -68,111 +86,200 @@ class MTPUtils:
         if meta is not None:
             # dict to JSON
             assert isinstance(meta, dict), 'meta error: %s' % meta
-            js = json_encode(obj=meta)
-            js = utf8_encode(string=js)
-            info['meta'] = js
+            _append_field(fields, _TAG_META, utf8_encode(string=json_encode(obj=meta)))
         visa = info.get('visa')
         if visa is not None:
             # dict to JSON
             assert isinstance(visa, dict), 'visa error: %s' % visa
-            js = json_encode(obj=visa)
-            js = utf8_encode(string=js)
-            info['visa'] = js
-
-        # create as message
-        msg = Message.new(info=info)
-        return msg.get_bytes()
+            _append_field(fields, _TAG_VISA, utf8_encode(string=json_encode(obj=visa)))
+        # join all fields into one buffer
+        return b''.join(fields)
 
     @classmethod
-    def deserialize_message(cls, data: bytes) -> Optional[ReliableMessage]:
-        msg = Message.parse(data=data)
-        if msg is None or msg.sender is None or msg.receiver is None:
+    def deserialize_message(cls, data: Union[bytes, bytearray, memoryview]) -> Optional[ReliableMessage]:
+        """
+        Decode D-MTP fields from a memoryview of the data,
+        only known fields will be converted
+        """
+        info = {}
+        view = memoryview(data)
+        total = len(view)
+        pos = 0
+        try:
+            while pos < total:
+                # tag: VarInt length + name
+                size, pos = _read_varint(view, pos)
+                tag = view[pos:pos + size].tobytes()
+                pos += size
+                # value: VarInt length + data
+                size, pos = _read_varint(view, pos)
+                end = pos + size
+                if end > total:
+                    raise ValueError('field length error: %s, %d > %d' % (tag, end, total))
+                decoder = _FIELD_DECODERS.get(tag)
+                if decoder is not None:
+                    decoder(info, view[pos:end])
+                pos = end
+        except (IndexError, UnicodeDecodeError) as error:
+            raise ValueError('failed to deserialize data: %s, %s' % (error, data))
+        if info.get('sender') is None or info.get('receiver') is None:
             raise ValueError('failed to deserialize data: %s' % data)
-        #
-        #  envelope
-        #
-        info = {
-            'sender': msg.sender,
-            'receiver': msg.receiver,
-            'time': msg.time,
-        }
-        msg_type = msg.type
-        if msg_type is not None and msg_type > 0:
-            info['type'] = msg_type
-        group = msg.group
-        if group is not None:
-            info['group'] = group
-        #
-        #  body
-        #
-        content = msg.content
-        if content is not None:
-            if content.startswith(b'{'):
-                # JsON
-                info['data'] = utf8_decode(data=content)
-            else:
-                # Base64
-                info['data'] = base64_encode(data=content)
-        signature = msg.signature
-        if signature is not None:
-            info['signature'] = base64_encode(data=signature)
-        # symmetric key/keys
-        key = msg.key
-        if key is not None and len(key) > 5:
-            if key[:5] == b'KEYS:':
-                info['keys'] = parse_keys(data=key[5:])
-            else:
-                info['key'] = base64_encode(data=key)
-        #
-        #  attachments
-        #
-        meta = msg.meta
-        if meta is not None and len(meta) > 0:
-            # JSON to dict
-            js = utf8_decode(data=meta)
-            js = json_decode(string=js)
-            info['meta'] = js
-        visa = msg.visa
-        if visa is not None and len(visa) > 0:
-            # JSON to dict
-            js = utf8_decode(data=visa)
-            js = json_decode(string=js)
-            info['visa'] = js
-
+        if 'time' not in info:
+            info['time'] = 0
         # create reliable message
         return ReliableMessage.parse(msg=info)
 
 
-def parse_keys(data: ByteArray) -> dict:
+#
+#   D-MTP fields: VarInt(tag length) + tag + VarInt(value length) + value
+#
+
+def _field_tag(name: str) -> bytes:
+    return _varint(len(name)) + name.encode('utf-8')
+
+
+def _varint(value: int) -> bytes:
+    """ LEB128 """
+    array = bytearray()
+    while value > 0x7F:
+        array.append((value & 0x7F) | 0x80)
+        value >>= 7
+    array.append(value)
+    return bytes(array)
+
+
+def _read_varint(view: memoryview, pos: int) -> (int, int):
+    """ return value & next position """
+    value = 0
+    shift = 0
+    while True:
+        ch = view[pos]
+        pos += 1
+        value |= (ch & 0x7F) << shift
+        if ch & 0x80 == 0:
+            return value, pos
+        shift += 7
+
+
+def _append_field(fields: List[bytes], tag: bytes, value: bytes):
+    fields.append(tag)
+    fields.append(_varint(len(value)))
+    fields.append(value)
+
+
+_TAG_SENDER = _field_tag(name='F')     # From (sender id)
+_TAG_RECEIVER = _field_tag(name='T')   # To (receiver id)
+_TAG_TIME = _field_tag(name='W')       # When (message time)
+_TAG_TYPE = _field_tag(name='Y')       # message tYpe
+_TAG_GROUP = _field_tag(name='G')      # Group id
+_TAG_CONTENT = _field_tag(name='D')    # message content Data
+_TAG_SIGNATURE = _field_tag(name='S')  # Signature for verifying content data
+_TAG_KEY = _field_tag(name='K')        # Key(s) encrypted by receiver's public key
+_TAG_META = _field_tag(name='M')       # meta info
+_TAG_VISA = _field_tag(name='V')       # visa info
+
+
+def _base64(value: memoryview) -> str:
+    return binascii.b2a_base64(value, newline=False).decode('ascii')
+
+
+def _decode_type(info: dict, value: memoryview):
+    if len(value) > 0 and value[0] > 0:
+        info['type'] = value[0]
+
+
+def _decode_content(info: dict, value: memoryview):
+    if value[:1] == b'{':
+        # JsON
+        info['data'] = str(value, 'utf-8')
+    else:
+        # Base64
+        info['data'] = _base64(value)
+
+
+def _decode_key(info: dict, value: memoryview):
+    if len(value) > 5:
+        if value[:5] == b'KEYS:':
+            info['keys'] = parse_keys(data=value[5:])
+        else:
+            info['key'] = _base64(value)
+
+
+def _decode_json(info: dict, name: str, value: memoryview):
+    if len(value) > 0:
+        # JSON to dict
+        info[name] = json_decode(string=str(value, 'utf-8'))
+
+
+_FIELD_DECODERS = {
+    # envelope
+    b'F': lambda info, value: info.__setitem__('sender', str(value, 'utf-8')),
+    b'T': lambda info, value: info.__setitem__('receiver', str(value, 'utf-8')),
+    b'W': lambda info, value: info.__setitem__('time', int.from_bytes(value, byteorder='big')),
+    b'Y': _decode_type,
+    b'G': lambda info, value: info.__setitem__('group', str(value, 'utf-8')),
+    # body
+    b'D': _decode_content,
+    b'S': lambda info, value: info.__setitem__('signature', _base64(value)),
+    b'K': _decode_key,
+    # attachments
+    b'M': lambda info, value: _decode_json(info, 'meta', value),
+    b'V': lambda info, value: _decode_json(info, 'visa', value),
+}
+
+
+def parse_keys(data: Union[bytes, bytearray, memoryview, ByteArray]) -> dict:
+    """
+    Parse keys table in one pass:
+
+        VarInt(name length) + name + VarInt(key length) + key
+        ...
+
+    :param data: keys table
+    :return: ID string => base64 key
+    """
+    if isinstance(data, ByteArray):
+        view = memoryview(data.buffer)[data.offset:data.offset + data.size]
+    else:
+        view = memoryview(data)
     keys = {}
-    while data.length > 0:
-        # get key length
-        size = VarIntData.from_data(data=data)
-        data = data.slice(start=size.size)
+    total = len(view)
+    pos = 0
+    while pos < total:
         # get key name
-        name = StringValue.parse(data=data.slice(end=size.value))
-        data = data.slice(start=size.value)
-        # get value length
-        size = VarIntData.from_data(data=data)
-        data = data.slice(start=size.size)
+        size, pos = _read_varint(view, pos)
+        end = pos + size
+        assert size > 0, 'key name empty'
+        name = str(view[pos:end], 'utf-8')
         # get value
-        value = BinaryValue(data=data.slice(end=size.value))
-        data = data.slice(start=size.value)
-        assert name.length > 0, 'key name empty'
-        if value.size > 0:
-            keys[name.string] = base64_encode(data=value.get_bytes())
+        size, pos = _read_varint(view, end)
+        end = pos + size
+        if end > total:
+            raise ValueError('keys table error: %d > %d' % (end, total))
+        if size > 0:
+            keys[name] = _base64(view[pos:end])
+        pos = end
     return keys
 
 
 def build_keys(keys: dict) -> bytes:
-    data = MutableData(capacity=512)
+    """ build keys table in a buffer sized for all entries """
+    entries = []
+    total = 0
     for identifier in keys:
-        id_value = StringValue.new(string=identifier)
+        name = utf8_encode(string=str(identifier))
         base64 = keys[identifier]
-        if id_value.size > 0 and base64 is not None and len(base64) > 0:
-            key_value = BinaryValue(data=base64_decode(string=base64))
-            data.append(VarIntData.from_int(value=id_value.size))
-            data.append(id_value)
-            data.append(VarIntData.from_int(value=key_value.size))
-            data.append(key_value)
-    return data.get_bytes()
+        if len(name) > 0 and base64 is not None and len(base64) > 0:
+            value = binascii.a2b_base64(base64)
+            name_size = _varint(len(name))
+            value_size = _varint(len(value))
+            entries.append((name_size, name, value_size, value))
+            total += len(name_size) + len(name) + len(value_size) + len(value)
+    data = bytearray(total)
+    pos = 0
+    for entry in entries:
+        for part in entry:
+            end = pos + len(part)
+            data[pos:end] = part
+            pos = end
+    return bytes(data)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+#
+#   Serializer: JsON & MessagePack
+#
+#                                Written in 2021 by Moky <albert.moky@gmail.com>
+#
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2021 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+import json
+from abc import ABC, abstractmethod
+from typing import Optional, Union, List, Dict
+
+from dimples.utils import Config
+
+try:
+    import orjson  # 'orjson' is optional
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack  # 'msgpack' is optional
+except ImportError:
+    msgpack = None
+
+
+class Serializer(ABC):
+    """
+        Object Serializer
+        ~~~~~~~~~~~~~~~~~
+
+        Convert JsON-like object (dict/list) to bytes and back in one step,
+        instead of json_encode + utf8_encode
+    """
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        raise NotImplemented
+
+    @abstractmethod
+    def encode(self, obj: Union[Dict, List]) -> bytes:
+        raise NotImplemented
+
+    @abstractmethod
+    def decode(self, data: Union[bytes, bytearray, memoryview]) -> Union[Dict, List, None]:
+        raise NotImplemented
+
+
+class StdJSONSerializer(Serializer):
+    """ stdlib 'json' """
+
+    @property  # Override
+    def name(self) -> str:
+        return 'json'
+
+    # Override
+    def encode(self, obj: Union[Dict, List]) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+    # Override
+    def decode(self, data: Union[bytes, bytearray, memoryview]) -> Union[Dict, List, None]:
+        return json.loads(bytes(data))
+
+
+class OrJSONSerializer(StdJSONSerializer):
+    """
+        'orjson', output is compact JsON, so it can be read by others;
+        falls back to stdlib for values it won't handle (e.g.: big integers)
+    """
+
+    @property  # Override
+    def name(self) -> str:
+        return 'orjson'
+
+    # Override
+    def encode(self, obj: Union[Dict, List]) -> bytes:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            return super().encode(obj=obj)
+
+    # Override
+    def decode(self, data: Union[bytes, bytearray, memoryview]) -> Union[Dict, List, None]:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return super().decode(data=data)
+
+
+class MsgPackSerializer(Serializer):
+    """
+        'msgpack', smaller & faster, but not readable by old versions;
+        values written in JsON (starts with '{' or '[') can still be decoded,
+        so the caches can be switched without flushing
+    """
+
+    def __init__(self, fallback: Serializer):
+        super().__init__()
+        self.__fallback = fallback
+
+    @property  # Override
+    def name(self) -> str:
+        return 'msgpack'
+
+    # Override
+    def encode(self, obj: Union[Dict, List]) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    # Override
+    def decode(self, data: Union[bytes, bytearray, memoryview]) -> Union[Dict, List, None]:
+        ch = data[0]
+        if ch == 0x7B or ch == 0x5B:
+            # '{' or '['
+            return self.__fallback.decode(data=data)
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class Serializers:
+    """
+        Serializers for local storage & Redis caches
+
+        config.ini:
+            [database]
+            serializer = orjson   # json, orjson
+            [redis]
+            serializer = msgpack  # json, orjson, msgpack
+    """
+
+    JSON = 'json'
+    ORJSON = 'orjson'
+    MSGPACK = 'msgpack'
+
+    __json = StdJSONSerializer()
+    __orjson = None if orjson is None else OrJSONSerializer()
+    __best_json = __json if __orjson is None else __orjson
+    __msgpack = None if msgpack is None else MsgPackSerializer(fallback=__best_json)
+
+    # serializer for JsON files (must be JsON)
+    STORAGE: Serializer = __best_json
+
+    # serializer for values in Redis; JsON by default, because the stations
+    # sharing the same Redis should understand each other
+    CACHE: Serializer = __best_json
+
+    @classmethod
+    def available(cls) -> List[str]:
+        names = [cls.JSON]
+        if cls.__orjson is not None:
+            names.append(cls.ORJSON)
+        if cls.__msgpack is not None:
+            names.append(cls.MSGPACK)
+        return names
+
+    @classmethod
+    def get(cls, name: str) -> Optional[Serializer]:
+        if name == cls.JSON:
+            return cls.__json
+        elif name == cls.ORJSON:
+            return cls.__orjson
+        elif name == cls.MSGPACK:
+            return cls.__msgpack
+
+    @classmethod
+    def load(cls, config: Config) -> List[str]:
+        """ load serializers from config, return errors """
+        errors = []
+        name = config.get_string(section='database', option='serializer')
+        if name is not None and len(name) > 0:
+            serializer = cls.get(name=name)
+            if serializer is None or name == cls.MSGPACK:
+                errors.append('storage serializer not supported: %s' % name)
+            else:
+                cls.STORAGE = serializer
+        name = config.get_string(section='redis', option='serializer')
+        if name is not None and len(name) > 0:
+            serializer = cls.get(name=name)
+            if serializer is None:
+                errors.append('cache serializer not supported: %s' % name)
+            else:
+                cls.CACHE = serializer
+        return errors
@@ -37,17 +37,33 @@ from ipx import SharedMemory
 from ipx import SharedMemoryController
 
 
+def key_from_name(name: str) -> int:
+    """ get IPC key from name: '0xD1350101' """
+    pos = name.index('0x') + 2
+    return int(name[pos:], 16)
+
+
 def create_shared_memory(size: int, key: int) -> sysv_ipc.SharedMemory:
     return sysv_ipc.SharedMemory(key=key, flags=sysv_ipc.IPC_CREAT, mode=SysvSharedMemory.MODE, size=size)
 
 
 class SysvSharedMemory(SharedMemory):
+    """
+        SysV Shared Memory
+        ~~~~~~~~~~~~~~~~~~
+
+        Access the attached segment through a memoryview, so reading/writing
+        bytes won't issue a syscall each time, and slices can be accessed
+        without copying; falls back to shm.read/shm.write if the buffer
+        protocol is not supported by 'sysv_ipc'.
+    """
 
     MODE = 0o644
 
     def __init__(self, size: int, key: int):
         super().__init__()
         self.__shm = create_shared_memory(size=size, key=key)
+        self.__buffer = _memory_view(shm=self.__shm)
 
     @property
     def shm(self) -> sysv_ipc.SharedMemory:
@@ -83,31 +99,61 @@ class SysvSharedMemory(SharedMemory):
     def size(self) -> int:
         return self.shm.size
 
+    def view(self, start: int = 0, end: int = None) -> Union[memoryview, bytes, None]:
+        """ get slice with range [start, end) without copying,
+            the view is invalid after detached
+        """
+        if end is None:
+            end = self.size
+        if 0 <= start < end <= self.size:
+            buffer = self.__buffer
+            if buffer is None:
+                return self.shm.read(end - start, offset=start)
+            return buffer[start:end]
+
     # Override
     def detach(self):
+        self.__release()
         self.shm.detach()
 
     # Override
     def destroy(self):
+        self.__release()
         self.shm.remove()
 
+    def __release(self):
+        buffer = self.__buffer
+        if buffer is not None:
+            self.__buffer = None
+            buffer.release()
+
     # Override
     def get_byte(self, index: int) -> int:
-        data = self.shm.read(1, offset=index)
-        return data[0]
+        buffer = self.__buffer
+        if buffer is None:
+            data = self.shm.read(1, offset=index)
+            return data[0]
+        return buffer[index]
 
     # Override
     def get_bytes(self, start: int = 0, end: int = None) -> Optional[bytes]:
         if end is None:
             end = self.size
         if 0 <= start < end <= self.size:
-            return self.shm.read(end - start, offset=start)
+            buffer = self.__buffer
+            if buffer is None:
+                return self.shm.read(end - start, offset=start)
+            return buffer[start:end].tobytes()
 
     # Override
     def set_byte(self, index: int, value: int):
-        data = bytearray(1)
-        data[0] = value
-        self.shm.write(data, offset=index)
+        buffer = self.__buffer
+        if buffer is None:
+            data = bytearray(1)
+            data[0] = value
+            self.shm.write(data, offset=index)
+        else:
+            buffer[index] = value
 
     # Override
     def update(self, index: int, source: Union[bytes, bytearray], start: int = 0, end: int = None):
@@ -116,17 +162,55 @@ class SysvSharedMemory(SharedMemory):
             end = src_len
         if start < end:
             if 0 < start or end < src_len:
-                source = source[start:end]
-            self.shm.write(source, offset=index)
+                source = memoryview(source)[start:end]
+            buffer = self.__buffer
+            if buffer is None:
+                self.shm.write(source, offset=index)
+            else:
+                buffer[index:index + end - start] = source
+
+
+def _memory_view(shm: sysv_ipc.SharedMemory) -> Optional[memoryview]:
+    try:
+        return memoryview(shm)
+    except TypeError:
+        # buffer protocol not supported
+        return None
+
+
+class SysvGiantQueue(GiantQueue):
+    """ count packages (chunks) wrote into the shared memory """
+
+    def __init__(self, memory: SharedMemory):
+        super().__init__(memory=memory)
+        self.__writes = 0
+
+    @property
+    def writes(self) -> int:
+        """ how many packages wrote, including chunks of giant data """
+        return self.__writes
+
+    # Override
+    def write(self, data: Union[bytes, bytearray]) -> bool:
+        if super().write(data=data):
+            self.__writes += 1
+            return True
+        return False
 
 
 class SysvSharedMemoryController(SharedMemoryController):
 
+    @property
+    def writes(self) -> int:
+        """ how many packages wrote into the shared memory """
+        queue = self.queue
+        assert isinstance(queue, SysvGiantQueue), 'queue error: %s' % queue
+        return queue.writes
+
     @classmethod
     def new(cls, size: int, name: str = None, key: int = 0):
         if key == 0:
-            pos = name.index('0x') + 2
-            key = int(name[pos:], 16)
+            key = key_from_name(name=name)
         shm = SysvSharedMemory(size=size, key=key)
-        queue = GiantQueue(memory=shm)
+        queue = SysvGiantQueue(memory=shm)
         return cls(queue=queue)
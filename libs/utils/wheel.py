@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+#   Timing Wheel: Deadlines
+#
+#                                Written in 2021 by Moky <albert.moky@gmail.com>
+#
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2021 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+import math
+import threading
+import time
+from typing import TypeVar, Generic, Optional, Tuple, List, Dict
+
+
+K = TypeVar('K')
+
+
+class TimingWheel(Generic[K]):
+    """
+        Hashed Timing Wheel
+        ~~~~~~~~~~~~~~~~~~~
+
+        One timer structure for many deadlines, instead of a sleeping task
+        for each of them; scheduling & cancelling cost O(1), and each tick
+        only checks the slots passed since last tick.
+
+        Deadlines later than one round stay in their slots, and will be
+        checked again when the wheel comes back.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 512, now: float = None):
+        super().__init__()
+        assert tick > 0 and slots > 0, 'timing wheel error: %s, %d' % (tick, slots)
+        if now is None:
+            now = time.time()
+        self.__tick = tick
+        self.__slots: List[Dict[K, float]] = [{} for _ in range(slots)]
+        # key => (deadline, slot index)
+        self.__deadlines: Dict[K, Tuple[float, int]] = {}
+        # last tick number expired
+        self.__current = int(now // tick)
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__deadlines)
+
+    def deadline(self, key: K) -> Optional[float]:
+        with self.__lock:
+            pair = self.__deadlines.get(key)
+            if pair is not None:
+                return pair[0]
+
+    def schedule(self, key: K, deadline: float):
+        """ set deadline for the key (replace the old one) """
+        with self.__lock:
+            self.__remove(key=key)
+            index = int(math.ceil(deadline / self.__tick))
+            if index <= self.__current:
+                # expired already, fire at next tick
+                index = self.__current + 1
+            index %= len(self.__slots)
+            self.__slots[index][key] = deadline
+            self.__deadlines[key] = (deadline, index)
+
+    def cancel(self, key: K) -> bool:
+        with self.__lock:
+            return self.__remove(key=key)
+
+    def __remove(self, key: K) -> bool:
+        pair = self.__deadlines.pop(key, None)
+        if pair is None:
+            return False
+        self.__slots[pair[1]].pop(key, None)
+        return True
+
+    def expire(self, now: float) -> List[K]:
+        """ advance to now, remove & return the keys expired """
+        expired = []
+        with self.__lock:
+            target = int(now // self.__tick)
+            current = self.__current
+            if target <= current:
+                return expired
+            slots = self.__slots
+            count = len(slots)
+            # at most one round
+            for index in range(current + 1, current + 1 + min(target - current, count)):
+                bucket = slots[index % count]
+                if len(bucket) == 0:
+                    continue
+                for key, deadline in list(bucket.items()):
+                    if deadline <= now:
+                        bucket.pop(key)
+                        self.__deadlines.pop(key, None)
+                        expired.append(key)
+            self.__current = target
+        return expired
@@ -34,9 +34,9 @@
 import time
 from typing import Optional, Union, List
 
-from dimples import ContentType, Content, ReliableMessage
+from dimples import ContentType, Content, TextContent, ReliableMessage
 from dimples import ContentProcessor, ContentProcessorCreator
-from dimples import BaseCommandProcessor
+from dimples import BaseContentProcessor, BaseCommandProcessor
 from dimples import Facebook, Messenger
 from dimples.client.cpu import ClientContentProcessorCreator
 from dimples.utils import Log, Runner
@@ -56,6 +56,7 @@ from libs.client.cpu import ReportCommandProcessor
 from libs.client import ClientProcessor
 
 from libs.push import PushNotificationClient
+from libs.push import DeviceFeedback
 from libs.push import ApplePushNotificationService
 from libs.push import AndroidPushNotificationService
 
@@ -84,8 +85,40 @@ class PushCommandProcessor(BaseCommandProcessor, Logging):
         return []
 
 
+class PushStatsProcessor(BaseContentProcessor, Logging):
+    """ text command: 'push stats' """
+
+    # Override
+    async def process_content(self, content: Content, r_msg: ReliableMessage) -> List[Content]:
+        assert isinstance(content, TextContent), 'text content error: %s' % content
+        text = content.text
+        if text is None or text.strip().lower() != 'push stats':
+            return []
+        self.info(msg='received text command from %s: "%s"' % (r_msg.sender, text))
+        stats = DeviceFeedback().pruned_stats()
+        text = 'Device Tokens Pruned\n'
+        text += '\n'
+        text += '| Day | Tokens |\n'
+        text += '|-----|--------|\n'
+        for day in sorted(stats.keys(), reverse=True):
+            text += '| %s | %d |\n' % (day, stats[day])
+        text += '\n'
+        text += 'Invalid tokens are removed after %d failures.' % DeviceFeedback.MAX_FAILURES
+        res = TextContent.create(text=text)
+        res['format'] = 'markdown'
+        return [res]
+
+
 class BotContentProcessorCreator(ClientContentProcessorCreator):
 
+    # Override
+    def create_content_processor(self, msg_type: Union[int, ContentType]) -> Optional[ContentProcessor]:
+        # text commands
+        if msg_type == ContentType.TEXT.value:
+            return PushStatsProcessor(facebook=self.facebook, messenger=self.messenger)
+        # others
+        return super().create_content_processor(msg_type=msg_type)
+
     # Override
     def create_command_processor(self, msg_type: Union[int, ContentType], cmd: str) -> Optional[ContentProcessor]:
         # push
@@ -110,6 +143,9 @@ class BotMessageProcessor(ClientProcessor):
 def create_apns(config: Config, database: Database):
     pnc = PushNotificationClient()
     pnc.delegate = database
+    # remove invalid device tokens
+    feedback = DeviceFeedback()
+    feedback.delegate = database
     # 1. add push service: APNs
     credentials = config.get_string(section='announcer', option='apns_credentials')
     use_sandbox = config.get_boolean(section='announcer', option='apns_use_sandbox')
@@ -39,7 +39,7 @@ from libs.utils import Singleton
 from libs.utils import Config
 from libs.common import ExtensionLoader
 from libs.common import CommonFacebook
-from libs.database import Database
+from libs.database import Database, CacheInvalidator
 
 from libs.client import ClientArchivist, ClientFacebook
 from libs.client import ClientSession, ClientMessenger
@@ -147,6 +147,8 @@ async def create_database(config: Config) -> Database:
     """ create database with directories """
     db = Database(config=config)
     db.show_info()
+    # evict memory caches in other processes after saved
+    CacheInvalidator().start(config=config)
     return db
 
 
@@ -22,6 +22,33 @@ function restart() {
     start "$1" "$2"
 }
 
+# reload "name" "path/to/script.py"
+#   1. ask the old process to write cache snapshot (SIGUSR1);
+#   2. start the new process on the same port (SO_REUSEPORT);
+#   3. ask the old process to stop accepting and drain sessions (SIGTERM).
+# the new process starts with '--reload', so it won't clear the online users
+# stored by the old one.
+# NOTICE: connections still waiting in the old process's accept backlog
+#         are reset when its listening socket closed, clients will reconnect
+#         (to the new process).
+function reload() {
+    old=$(pgrep -f "python3 .*${root}/$2")
+    for pid in ${old}
+    do
+        kill -USR1 $((pid))
+    done
+    sleep 1
+    log=/tmp/$1-$(date +%Y%m%d-%H%M%S).log
+    echo "starting $2 >> ${log}"
+    python3 "${root}/$2" --reload >> "${log}" 2>&1 &
+    sleep 5
+    for pid in ${old}
+    do
+        echo "draining $2 ($((pid)))"
+        kill -TERM $((pid))
+    done
+}
+
 function title() {
     echo ""
     echo "    >>> $1 <<<"
@@ -29,7 +56,16 @@ function title() {
 }
 
 
-if [[ "$*" == "restart" ]]
+if [[ "$*" == "reload" ]]
+then
+    # zero-downtime restart for station only
+    echo "========================"
+    echo "    Reloading ..."
+    echo "========================"
+    title "DIM Station"
+    reload "dims" "station/start.py"
+    exit 0
+elif [[ "$*" == "restart" ]]
 then
     launch="restart"
     echo "========================"
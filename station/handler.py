@@ -34,7 +34,7 @@ import traceback
 from socketserver import StreamRequestHandler
 
 from libs.utils import Logging, Runner
-from libs.server import ServerSession, SessionCenter
+from libs.server import ServerSession, SessionCenter, SessionReaper
 from libs.server.cpu.text import RequestHandlerMarker
 
 from station.shared import GlobalVariable
@@ -85,14 +85,17 @@ async def _start_session(handler: RequestHandler):
     marker.link_session(session=session, handler=handler)
     messenger = create_messenger(facebook=shared.facebook, database=shared.mdb, session=session)
     center = SessionCenter()
+    reaper = SessionReaper()
     # setup
     center.add_session(session=session)
+    reaper.add_session(session=session)
     try:
         # handle
         await session.run()
         # await session.stop()
     finally:
         # finish
+        reaper.remove_session(session=session)
         center.remove_session(session=session)
         await Runner.sleep(seconds=2.0)
     return messenger
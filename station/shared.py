@@ -33,12 +33,13 @@ from dimples import AccountDBI, MessageDBI, SessionDBI
 from dimples.common import ProviderInfo
 from dimples.group import SharedGroupManager
 
-from libs.utils import Path, Log
+from libs.utils import Path, File, Log
 from libs.utils import Singleton
 from libs.utils import Config
+from libs.utils.mtp import Compressor
 from libs.common import ExtensionLoader
 from libs.common import CommonFacebook
-from libs.database import Database
+from libs.database import Database, CacheInvalidator, CacheSnapshot
 
 from libs.server import ServerArchivist
 from libs.server import ServerChecker
@@ -49,7 +50,7 @@ from libs.server import ServerSession
 from libs.server import PushCenter, DefaultPushService
 from libs.server import MessageDeliver, Roamer
 from libs.server import Dispatcher, BlockFilter, MuteFilter
-from libs.server import ServerEmitter, Monitor
+from libs.server import ServerEmitter, Monitor, SessionReaper, SessionQuota
 
 
 @Singleton
@@ -65,6 +66,8 @@ class GlobalVariable:
         self.__facebook: Optional[ServerFacebook] = None
         self.__messenger: Optional[ServerMessenger] = None  # only for entity checker
         self.__emitter: Optional[ServerEmitter] = None
+        # started by './start_all.sh reload', the old station is still running
+        self.reloading = False
         # load extensions
         ExtensionLoader().run()
 
@@ -116,10 +119,11 @@ class GlobalVariable:
             # load ANS records from 'config.ini'
             CommonFacebook.ans.fix(records=ans_records)
         self.__config = config
+        await load_compression(config=config)
         #
         #  Step 1: create database
         #
-        database = await create_database(config=config)
+        database = await create_database(config=config, reloading=self.reloading)
         self.__adb = database
         self.__mdb = database
         self.__sdb = database
@@ -162,6 +166,16 @@ class GlobalVariable:
         #
         monitor = Monitor()
         monitor.emitter = emitter
+        #
+        #  Step 7: prepare session reaper
+        #
+        reaper = SessionReaper()
+        reaper.load(config=config)
+        #
+        #  Step 8: prepare session quota
+        #
+        quota = SessionQuota()
+        quota.load(config=config)
 
     async def login(self, current_user: ID):
         facebook = self.facebook
@@ -182,12 +196,35 @@ class GlobalVariable:
         await facebook.set_current_user(user=user)
 
 
-async def create_database(config: Config) -> Database:
+async def load_compression(config: Config):
+    """ load message compression options from 'config.ini' """
+    threshold = config.get_integer(section='station', option='compress_threshold')
+    if threshold > 0:
+        Compressor.THRESHOLD = threshold
+    path = config.get_string(section='station', option='compress_dict')
+    if path is None or len(path) == 0:
+        return
+    data = await File(path=path).read()
+    if data is None:
+        Log.error(msg='compression dictionary not found: %s' % path)
+        return
+    Compressor.set_dictionary(data=data)
+    Log.info(msg='compression dictionary loaded: %s, %d bytes, id: %d'
+                 % (path, len(data), Compressor.dictionary_id()))
+
+
+async def create_database(config: Config, reloading: bool = False) -> Database:
     """ create database with directories """
     db = Database(config=config)
     db.show_info()
-    # clear before station start
-    await db.clear_socket_addresses()
+    # evict memory caches in other processes after saved
+    CacheInvalidator().start(config=config)
+    # hot entries written by last shutdown
+    CacheSnapshot().load(config=config)
+    # clear before station start, but not when reloading, because the old station
+    # is still serving (it will remove its own addresses while draining)
+    if not reloading:
+        await db.clear_socket_addresses()
     # filters
     man = FilterManager()
     man.block_filter = BlockFilter(database=db)
@@ -227,11 +264,12 @@ def show_help(app_name: str, default_config: str):
     print('    %s' % app_name)
     print('')
     print('usages:')
-    print('    %s [--config=<FILE>]' % cmd)
+    print('    %s [--config=<FILE>] [--reload]' % cmd)
     print('    %s [-h|--help]' % cmd)
     print('')
     print('optional arguments:')
     print('    --config        config file path (default: "%s")' % default_config)
+    print('    --reload        started while the old process still running (zero-downtime reload)')
     print('    --help, -h      show this help message and exit')
     print('')
 
@@ -241,7 +279,7 @@ async def create_config(app_name: str, default_config: str) -> Config:
     try:
         opts, args = getopt.getopt(args=sys.argv[1:],
                                    shortopts='hf:',
-                                   longopts=['help', 'config='])
+                                   longopts=['help', 'config=', 'reload'])
     except getopt.GetoptError:
         show_help(app_name=app_name, default_config=default_config)
         sys.exit(1)
@@ -250,6 +288,8 @@ async def create_config(app_name: str, default_config: str) -> Config:
     for opt, arg in opts:
         if opt == '--config':
             ini_file = arg
+        elif opt == '--reload':
+            GlobalVariable().reloading = True
         else:
             show_help(app_name=app_name, default_config=default_config)
             sys.exit(0)
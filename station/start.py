@@ -31,6 +31,9 @@
     DIM network server node
 """
 
+import signal
+import socket
+import threading
 from socketserver import ThreadingTCPServer
 
 from dimples.utils import Log
@@ -44,6 +47,9 @@ Path.add(path=path)
 
 from libs.utils.mtp import Server as UDPServer
 
+from libs.database import CacheSnapshot
+from libs.server import Monitor, SessionDrainer, SessionChangeWriter
+
 from station.shared import GlobalVariable
 from station.shared import create_config
 from station.handler import RequestHandler
@@ -57,6 +63,63 @@ Log.LEVEL = Log.DEVELOP
 
 DEFAULT_CONFIG = '/etc/dim/station.ini'
 
+# seconds to close all sessions after SIGTERM
+DRAIN_PERIOD = 60
+
+
+class StationServer(ThreadingTCPServer):
+    """
+        TCP server sharing the port with the new station while restarting,
+        the old one stops accepting after SIGTERM, and closes its sessions
+        progressively, so the clients will reconnect to the new one.
+    """
+
+    draining = False
+
+    # Override
+    def server_bind(self):
+        if hasattr(socket, 'SO_REUSEPORT'):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def drain(self):
+        """ stop accepting, called by signal handler """
+        if self.draining:
+            return
+        self.draining = True
+        # 'shutdown()' waits for 'serve_forever()' to stop, so call it in another thread
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+
+def set_signals(server: StationServer):
+    """
+        SIGTERM - graceful drain
+        SIGUSR1 - write cache snapshot now (for the new station before SIGTERM)
+    """
+
+    # noinspection PyUnusedLocal
+    def on_term(signum, frame):
+        Log.warning(msg='>>> signal %d received, draining ...' % signum)
+        server.drain()
+
+    # noinspection PyUnusedLocal
+    def on_usr1(signum, frame):
+        Log.warning(msg='>>> signal %d received, writing cache snapshot ...' % signum)
+        CacheSnapshot().save()
+
+    signal.signal(signal.SIGTERM, on_term)
+    signal.signal(signal.SIGUSR1, on_usr1)
+
+
+async def drain_sessions(period: int):
+    """ close sessions progressively, and flush the pending events """
+    if period <= 0:
+        period = DRAIN_PERIOD
+    drainer = SessionDrainer(period=period)
+    await drainer.drain()
+    await SessionChangeWriter().flush()
+    await Monitor().flush()
+
 
 async def async_main():
     # create global variable
@@ -87,18 +150,34 @@ async def async_main():
     #
     try:
         # ThreadingTCPServer.allow_reuse_address = True
-        server = ThreadingTCPServer(server_address=server_address,
-                                    RequestHandlerClass=RequestHandler,
-                                    bind_and_activate=False)
+        server = StationServer(server_address=server_address,
+                               RequestHandlerClass=RequestHandler,
+                               bind_and_activate=False)
         Log.info(msg='>>> TCP server %s starting...' % str(server_address))
         server.allow_reuse_address = True
         server.server_bind()
         server.server_activate()
+        set_signals(server=server)
         server.serve_forever()
+        if server.draining:
+            # stop accepting, new connections will go to the new station;
+            # NOTICE: connections accepted by the kernel but still waiting in this
+            #         socket's backlog will be reset, the clients should reconnect
+            server.socket.close()
+            Log.info(msg='>>> TCP server %s closed, draining ...' % str(server_address))
+            period = config.get_integer(section='station', option='drain_period')
+            await drain_sessions(period=period)
+            # wait for the request handlers to finish
+            server.server_close()
     except KeyboardInterrupt as ex:
         Log.info(msg='~~~~~~~~ %s' % ex)
     finally:
         g_udp_server.stop()
+        # the request handlers are joined now, commit their last session changes
+        # before the writer's daemon thread dies with the process
+        await SessionChangeWriter().flush()
+        # hot entries for next startup
+        CacheSnapshot().save()
         Log.info(msg='======== station shutdown!')
 
 
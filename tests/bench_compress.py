@@ -0,0 +1,190 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2019 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+"""
+    Compression Benchmark
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Bandwidth & CPU trade-off of the message compression, for typical
+    envelopes (JsON & D-MTP):
+        1. personal message with meta/visa attached;
+        2. group message with a big 'keys' map;
+        3. document (visa) response.
+
+    The shared dictionary is trained with other samples, and can be saved
+    for 'compress_dict' in 'config.ini'.
+
+    Usage:
+        ./bench_compress.py [COUNT] [DICT_FILE]
+"""
+
+import os
+import sys
+import time
+from typing import List
+
+from dimples import ReliableMessage
+from dimples import base64_encode
+from dimples import utf8_encode, json_encode
+from dimples.utils import Path
+
+path = Path.abs(path=__file__)
+path = Path.dir(path=path)
+path = Path.dir(path=path)
+Path.add(path=path)
+
+from libs.utils.mtp import MTPUtils, Compressor
+from libs.common import ExtensionLoader
+
+
+def random_base64(size: int) -> str:
+    # encrypted data & signatures are random
+    return base64_encode(data=os.urandom(size))
+
+
+def create_meta(seed: str) -> dict:
+    return {
+        'type': 1,
+        'key': {
+            'algorithm': 'RSA',
+            'data': '-----BEGIN PUBLIC KEY-----\n%s\n-----END PUBLIC KEY-----' % random_base64(size=162),
+        },
+        'seed': seed,
+        'fingerprint': random_base64(size=128),
+    }
+
+
+def create_visa(identifier: str) -> dict:
+    data = {
+        'ID': identifier,
+        'name': 'User %s' % identifier[:8],
+        'avatar': 'https://s3.dim.chat/avatar/%s.jpg' % random_base64(size=12),
+        'key': {
+            'algorithm': 'RSA',
+            'data': '-----BEGIN PUBLIC KEY-----\n%s\n-----END PUBLIC KEY-----' % random_base64(size=162),
+        },
+        'app': {'chat.dim.sechat': {'language': 'en', 'locale': 'en_US'}},
+    }
+    return {
+        'ID': identifier,
+        'type': 'visa',
+        'data': json_encode(obj=data),
+        'signature': random_base64(size=128),
+    }
+
+
+def create_message(kind: str, sn: int) -> ReliableMessage:
+    sender = 'user%d@4DnqXWdTV8wuZgfqSCX9GjE2kNq7HJrUgQ' % sn
+    info = {
+        'sender': sender,
+        'receiver': 'hulk@4YeVEN3aUnvC1DNUufCq1bs9zoBSJTzVEj',
+        'time': int(time.time()),
+        'type': 1,
+        'data': random_base64(size=240),
+        'signature': random_base64(size=128),
+    }
+    if kind == 'personal':
+        info['key'] = random_base64(size=128)
+        info['meta'] = create_meta(seed='user%d' % sn)
+        info['visa'] = create_visa(identifier=sender)
+    elif kind == 'group':
+        info['receiver'] = 'everyone@everywhere'
+        info['group'] = 'Group-1280719982@7oMeWadRw4qat2sL4mTdcQSDAqZSo7LH5G'
+        info['keys'] = {
+            'member%d@4YeVEN3aUnvC1DNUufCq1bs9zoBSJTzVEj' % i: random_base64(size=128)
+            for i in range(64)
+        }
+    else:
+        assert kind == 'document', 'message kind error: %s' % kind
+        info['key'] = random_base64(size=128)
+        # document command (encrypted, so it's random) with meta & visa attached
+        info['data'] = random_base64(size=1200)
+        info['meta'] = create_meta(seed='user%d' % sn)
+        info['visa'] = create_visa(identifier=sender)
+    return ReliableMessage.parse(msg=info)
+
+
+def serialize(msg: ReliableMessage, mtp: str) -> bytes:
+    if mtp == 'json':
+        return utf8_encode(string=json_encode(obj=msg.dictionary))
+    return MTPUtils.serialize_message(msg=msg)
+
+
+def bench(name: str, samples: List[bytes], algorithm: str, use_dictionary: bool, count: int):
+    raw_size = sum([len(item) for item in samples])
+    packed = [Compressor.compress(data=item, algorithm=algorithm, use_dictionary=use_dictionary) for item in samples]
+    size = sum([len(item) for item in packed])
+    for item, plain in zip(packed, samples):
+        assert Compressor.decompress(data=item) == plain, 'compression error'
+    start = time.perf_counter()
+    for _ in range(count):
+        for item in samples:
+            Compressor.compress(data=item, algorithm=algorithm, use_dictionary=use_dictionary)
+    compress_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(count):
+        for item in packed:
+            Compressor.decompress(data=item)
+    decompress_time = time.perf_counter() - start
+    rounds = count * len(samples)
+    print('%16s: %6d -> %6d bytes (%5.1f%%), compress %7.2f us, decompress %6.2f us'
+          % (name, raw_size, size, size * 100.0 / raw_size,
+             compress_time * 1e6 / rounds, decompress_time * 1e6 / rounds))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    dict_file = sys.argv[2] if len(sys.argv) > 2 else None
+    ExtensionLoader().run()
+    kinds = ['personal', 'group', 'document']
+    # train dictionary with other messages
+    training = []
+    for sn in range(64):
+        for kind in kinds:
+            msg = create_message(kind=kind, sn=sn + 1000)
+            training.append(serialize(msg=msg, mtp='json'))
+            training.append(serialize(msg=msg, mtp='dmtp'))
+    dictionary = Compressor.train_dictionary(samples=training)
+    Compressor.set_dictionary(data=dictionary)
+    print('dictionary: %d bytes, id: %d, algorithms: %s' % (len(dictionary), Compressor.dictionary_id(),
+                                                            Compressor.algorithms()))
+    if dict_file is not None:
+        with open(dict_file, 'wb') as file:
+            file.write(dictionary)
+        print('dictionary saved: %s' % dict_file)
+    for kind in kinds:
+        messages = [create_message(kind=kind, sn=sn) for sn in range(16)]
+        for mtp in ['json', 'dmtp']:
+            samples = [serialize(msg=msg, mtp=mtp) for msg in messages]
+            print('%s message (%s), %d samples x %d rounds:' % (kind, mtp, len(samples), count))
+            for algorithm in Compressor.algorithms():
+                bench(name=algorithm, samples=samples, algorithm=algorithm, use_dictionary=False, count=count)
+                bench(name='%s + dict' % algorithm, samples=samples, algorithm=algorithm, use_dictionary=True,
+                      count=count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2019 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+"""
+    Database Read Path Benchmark
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Block-filter hot path (UserTable.get_block_command) with values already
+    in memory cache, compare allocations & latency of:
+        1. creating a task for each call (old path);
+        2. probing the memory cache first (new path).
+
+    Usage:
+        ./bench_db_read.py [COUNT]
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Awaitable, List
+
+from dimples import ID, BlockCommand
+from dimples.utils import Path
+
+path = Path.abs(path=__file__)
+path = Path.dir(path=path)
+path = Path.dir(path=path)
+Path.add(path=path)
+
+from libs.utils import Runner
+from libs.utils import Config
+from libs.common import ExtensionLoader
+from libs.database.t_user import UserTable
+
+
+async def create_table(count: int) -> (UserTable, List[ID]):
+    root = tempfile.mkdtemp(prefix='dim_bench_')
+    config_path = '%s/config.ini' % root
+    with open(config_path, 'w') as file:
+        file.write('[database]\nroot = %s\npublic = %s/public\nprotected = %s/protected\nprivate = %s/private\n'
+                   % (root, root, root, root))
+    config = Config()
+    await config.load(path=config_path)
+    table = UserTable(config=config)
+    users = []
+    for i in range(count):
+        user = ID.parse(identifier='user%d@4DnqXWdTV8wuZgfqSCX9GjE2kNq7HJrUgQ' % i)
+        users.append(user)
+        if i % 2 == 0:
+            # half of the users have block-list
+            cmd = BlockCommand(content={'type': 0x88, 'command': 'block', 'list': ['spammer@anywhere']})
+            table._cmd_block.update(key=user, value=cmd, life_span=3600)
+        else:
+            # others are cached as missing
+            table._cmd_block.update(key=user, value=None, life_span=3600)
+    return table, users
+
+
+async def bench(title: str, func: Callable[[ID], Awaitable], users: List[ID]):
+    # latency
+    start = time.perf_counter()
+    for user in users:
+        await func(user)
+    elapsed = time.perf_counter() - start
+    # transient memory per call
+    tracemalloc.start()
+    peak_bytes = 0
+    for user in users:
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        await func(user)
+        _, peak = tracemalloc.get_traced_memory()
+        peak_bytes += peak - current
+    tracemalloc.stop()
+    count = len(users)
+    print('%24s: %.2f us/call, peak %d bytes/call'
+          % (title, elapsed * 1000000 / count, peak_bytes // count))
+
+
+async def async_main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    table, users = await create_table(count=count)
+
+    # noinspection PyUnusedLocal
+    async def empty_call(user: ID):
+        return None
+
+    async def task_path(user: ID):
+        task = table._new_blo_task(user=user)
+        return await task.load()
+
+    async def probe_path(user: ID):
+        return await table.get_block_command(identifier=user)
+
+    print('%d users, block-list cached in memory' % count)
+    await bench(title='empty coroutine (base)', func=empty_call, users=users)
+    await bench(title='task per call (old)', func=task_path, users=users)
+    await bench(title='cache probe (new)', func=probe_path, users=users)
+
+
+def main():
+    ExtensionLoader().run()
+    Runner.sync_run(main=async_main())
+
+
+if __name__ == '__main__':
+    main()
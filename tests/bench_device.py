@@ -0,0 +1,148 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2019 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+"""
+    Device Info Benchmark
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Compare memory & latency of the dict-wrapped device info (old)
+    with the slotted device info (new)
+
+    Usage:
+        ./bench_device.py [COUNT]
+"""
+
+import sys
+import time
+import tracemalloc
+from typing import Optional, Any, List, Dict
+
+from mkm.types import Converter
+from dimples import DateTime
+from dimples.utils import Path
+
+path = Path.abs(path=__file__)
+path = Path.dir(path=path)
+path = Path.dir(path=path)
+Path.add(path=path)
+
+from libs.database import DeviceInfo
+
+
+class DictDeviceInfo:
+    """ device info before slotted """
+
+    def __init__(self, info: Dict[str, Any]):
+        super().__init__()
+        self.__info = info
+
+    @property
+    def token(self) -> str:
+        value = self.__info.get('token')
+        if value is None:
+            value = self.__info.get('device_token')
+            if value is None:
+                device = self.__info.get('device')
+                if isinstance(device, Dict):
+                    value = device.get('token')
+        return value
+
+    @property
+    def time(self) -> Optional[DateTime]:
+        value = self.__info.get('time')
+        return Converter.get_datetime(value=value, default=None)
+
+    @property
+    def platform(self) -> Optional[str]:
+        return self.__info.get('platform')
+
+    @property
+    def channel(self) -> Optional[str]:
+        return self.__info.get('channel')
+
+
+def create_records(count: int) -> List[Dict[str, Any]]:
+    records = []
+    now = time.time()
+    for i in range(count):
+        if i % 2 == 0:
+            records.append({
+                'device_token': '%064x' % i,
+                'topic': 'chat.dim.sechat',
+                'sandbox': False,
+                'time': now,
+                'model': 'iPhone',
+                'platform': 'iOS',
+                'system': 'iOS 16.3',
+            })
+        else:
+            records.append({
+                'device': {'token': 'fcm:%060x' % i},
+                'time': now,
+                'model': 'Pixel 7',
+                'platform': 'Android',
+                'system': 'Android 13',
+                'channel': 'Firebase',
+            })
+    return records
+
+
+def bench(clazz, records: List[Dict[str, Any]]):
+    # memory
+    tracemalloc.start()
+    devices = [clazz(info) for info in records]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # parsing
+    start = time.perf_counter()
+    devices = [clazz(info) for info in records]
+    parse_time = time.perf_counter() - start
+    # latency: push path reads token/platform/channel, find_device reads token
+    start = time.perf_counter()
+    for _ in range(3):
+        for item in devices:
+            _ = item.token
+            _ = item.platform
+            _ = item.channel
+    read_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for item in devices:
+        _ = item.time
+    time_time = time.perf_counter() - start
+    print('%16s: parse %.3fs, memory %.1f MB (%d bytes/device), read x3 %.3fs, time %.3fs'
+          % (clazz.__name__, parse_time, size / 1024.0 / 1024.0, size // len(devices), read_time, time_time))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print('creating %d device records...' % count)
+    records = create_records(count=count)
+    bench(clazz=DictDeviceInfo, records=records)
+    bench(clazz=DeviceInfo, records=records)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2019 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+
+"""
+    IPC Latency Benchmark
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Compare end-to-end latency of shared memory arrows,
+    receiver polling every 100 ms (old) vs. waked up by FIFO signal (new)
+
+    Usage:
+        ./bench_ipc.py [COUNT]
+"""
+
+import multiprocessing
+import random
+import sys
+import time
+from typing import List
+
+from dimples.utils import Path
+
+path = Path.abs(path=__file__)
+path = Path.dir(path=path)
+path = Path.dir(path=path)
+Path.add(path=path)
+
+from libs.utils.ipc import IncomeArrow, OutgoArrow
+
+
+BENCH_KEY = '0x%X' % 0xD13509F1
+
+
+class PollingIncomeArrow(IncomeArrow):
+    WAKEUP_ENABLED = False
+
+
+class PollingOutgoArrow(OutgoArrow):
+    WAKEUP_ENABLED = False
+
+
+class BenchIncomeArrow(IncomeArrow):
+
+    def __init__(self, name: str, tag: str, count: int, results: multiprocessing.Queue):
+        super().__init__(name=name)
+        self.__tag = tag
+        self.__count = count
+        self.__results = results
+        self.__latencies: List[float] = []
+
+    # Override
+    async def process(self) -> bool:
+        if not await super().process():
+            return False
+        obj = self.receive()
+        now = time.time()
+        if obj.get('tag') != self.__tag:
+            # left in the shared memory by last run
+            return True
+        self.__latencies.append(now - obj['time'])
+        if len(self.__latencies) >= self.__count:
+            self.__results.put(self.__latencies)
+            await self.stop()
+        return True
+
+
+class BenchPollingIncomeArrow(BenchIncomeArrow):
+    WAKEUP_ENABLED = False
+
+
+def receiver(polling: bool, tag: str, count: int, results: multiprocessing.Queue):
+    clazz = BenchPollingIncomeArrow if polling else BenchIncomeArrow
+    arrow = clazz(name=BENCH_KEY, tag=tag, count=count, results=results)
+    arrow.sync_run(main=arrow.run())
+
+
+def bench(polling: bool, count: int):
+    results = multiprocessing.Queue()
+    tag = '%08x' % random.getrandbits(32)
+    outgoing = PollingOutgoArrow(name=BENCH_KEY) if polling else OutgoArrow(name=BENCH_KEY)
+    child = multiprocessing.Process(target=receiver, args=(polling, tag, count, results), daemon=True)
+    child.start()
+    time.sleep(0.5)
+    for i in range(count):
+        # random gaps, so messages arrive at any phase of the polling interval
+        time.sleep(random.uniform(0.01, 0.05))
+        outgoing.send(obj={'tag': tag, 'sn': i, 'time': time.time()})
+    latencies = sorted(results.get(timeout=30))
+    child.join(timeout=5)
+    total = len(latencies)
+    print('%10s: avg %7.3f ms, p50 %7.3f ms, p99 %7.3f ms, max %7.3f ms'
+          % ('polling' if polling else 'wakeup',
+             sum(latencies) * 1000 / total,
+             latencies[total // 2] * 1000,
+             latencies[min(total - 1, total * 99 // 100)] * 1000,
+             latencies[-1] * 1000))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print('sending %d objects through shared memory...' % count)
+    bench(polling=True, count=count)
+    bench(polling=False, count=count)
+
+
+if __name__ == '__main__':
+    main()
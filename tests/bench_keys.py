@@ -0,0 +1,150 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2019 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+
+"""
+    Keys Table Benchmark
+    ~~~~~~~~~~~~~~~~~~~~
+
+    1. check parse_keys(build_keys(keys)) == keys with random key tables;
+    2. compare the slicing parser & regrowing builder (old) with the
+       single-pass parser & presized builder (new) for a group of 10k members.
+
+    Usage:
+        ./bench_keys.py [MEMBERS] [ROUNDS]
+"""
+
+import random
+import string
+import sys
+import time
+from typing import Dict
+
+from udp.ba import ByteArray, Data, MutableData, VarIntData
+from dmtp import StringValue, BinaryValue
+
+from dimples import base64_encode, base64_decode
+from dimples.utils import Path
+
+path = Path.abs(path=__file__)
+path = Path.dir(path=path)
+path = Path.dir(path=path)
+Path.add(path=path)
+
+from libs.utils.mtp.utils import parse_keys, build_keys
+from libs.common import ExtensionLoader
+
+
+def legacy_parse_keys(data: ByteArray) -> dict:
+    """ parse_keys before (with 'length' & 'slice' fixed for current udp.ba) """
+    keys = {}
+    while data.size > 0:
+        size = VarIntData.from_data(data=data)
+        data = data.slice(start=size.size)
+        name = StringValue.parse(data=data.slice(start=0, end=size.value))
+        data = data.slice(start=size.value)
+        size = VarIntData.from_data(data=data)
+        data = data.slice(start=size.size)
+        value = BinaryValue(data=data.slice(start=0, end=size.value))
+        data = data.slice(start=size.value)
+        if value.size > 0:
+            keys[name.string] = base64_encode(data=value.get_bytes())
+    return keys
+
+
+def legacy_build_keys(keys: dict) -> bytes:
+    """ build_keys before """
+    data = MutableData(capacity=512)
+    for identifier in keys:
+        id_value = StringValue.new(string=identifier)
+        base64 = keys[identifier]
+        if id_value.size > 0 and base64 is not None and len(base64) > 0:
+            key_value = BinaryValue(data=base64_decode(string=base64))
+            data.append(VarIntData.from_int(value=id_value.size))
+            data.append(id_value)
+            data.append(VarIntData.from_int(value=key_value.size))
+            data.append(key_value)
+    return data.get_bytes()
+
+
+def random_name() -> str:
+    # names around the VarInt boundary (127/128 bytes), with non-ascii chars
+    size = random.choice([1, 8, 42, 127, 128, 129, 300])
+    chars = string.ascii_letters + string.digits + '@._-' + '中文é'
+    return ''.join(random.choice(chars) for _ in range(size))
+
+
+def random_keys(count: int) -> Dict[str, str]:
+    keys = {}
+    for _ in range(count):
+        size = random.choice([0, 1, 16, 127, 128, 256, 16384])
+        keys[random_name()] = base64_encode(data=random.randbytes(size)) if size > 0 else ''
+    return keys
+
+
+def check(rounds: int):
+    for _ in range(rounds):
+        keys = random_keys(count=random.randint(0, 32))
+        expected = {name: value for name, value in keys.items() if len(value) > 0}
+        data = build_keys(keys=keys)
+        assert data == legacy_build_keys(keys=keys), 'keys table not compatible'
+        assert parse_keys(data=data) == expected, 'keys table error: %s' % keys
+        assert parse_keys(data=Data(buffer=data)) == expected, 'keys table error: %s' % keys
+    print('checked %d random key tables' % rounds)
+
+
+def bench(members: int, rounds: int):
+    keys = {
+        'member%d@4YeVEN3aUnvC1DNUufCq1bs9zoBSJTzVEj' % i: base64_encode(data=random.randbytes(128))
+        for i in range(members)
+    }
+    data = build_keys(keys=keys)
+    print('%d members, keys table: %d bytes' % (members, len(data)))
+    for name, builder, parser in [
+        ('old', legacy_build_keys, lambda d: legacy_parse_keys(data=Data(buffer=d))),
+        ('new', build_keys, parse_keys),
+    ]:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            builder(keys=keys)
+        build_time = (time.perf_counter() - start) / rounds
+        start = time.perf_counter()
+        for _ in range(rounds):
+            parser(data)
+        parse_time = (time.perf_counter() - start) / rounds
+        print('%6s: build %8.2f ms, parse %8.2f ms' % (name, build_time * 1000, parse_time * 1000))
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    ExtensionLoader().run()
+    check(rounds=200)
+    bench(members=members, rounds=rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2019 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+
+"""
+    D-MTP Benchmark
+    ~~~~~~~~~~~~~~~
+
+    Round-trip (serialize + deserialize) a reliable message through:
+        1. the JsON path of ServerPacker;
+        2. the D-MTP path built on dmtp.Message (old);
+        3. the D-MTP codec in MTPUtils (new).
+
+    Usage:
+        ./bench_mtp.py [COUNT]
+"""
+
+import sys
+import time
+from typing import Optional
+
+from dmtp import Message
+
+from dimples import ReliableMessage
+from dimples import base64_encode, base64_decode
+from dimples import utf8_encode, utf8_decode
+from dimples import json_encode, json_decode
+from dimples.utils import Path
+
+path = Path.abs(path=__file__)
+path = Path.dir(path=path)
+path = Path.dir(path=path)
+Path.add(path=path)
+
+from libs.utils.mtp import MTPUtils
+from libs.utils.mtp.utils import parse_keys, build_keys
+from libs.common import ExtensionLoader
+from libs.server import ServerPacker, ServerSession
+
+
+class LegacyMTPUtils:
+    """ D-MTP path before the codec """
+
+    @classmethod
+    def serialize_message(cls, msg: ReliableMessage) -> bytes:
+        info = msg.copy_dictionary()
+        content = info.get('data')
+        if content.startswith('{'):
+            info['data'] = utf8_encode(string=content)
+        else:
+            info['data'] = base64_decode(string=content)
+        info['signature'] = base64_decode(string=info['signature'])
+        key = info.get('key')
+        if key is None:
+            keys = info.get('keys')
+            if keys is not None:
+                info['key'] = b'KEYS:' + build_keys(keys=keys)
+        else:
+            info['key'] = base64_decode(string=key)
+        for name in ['meta', 'visa']:
+            value = info.get(name)
+            if value is not None:
+                info[name] = utf8_encode(string=json_encode(obj=value))
+        return Message.new(info=info).get_bytes()
+
+    @classmethod
+    def deserialize_message(cls, data: bytes) -> ReliableMessage:
+        msg = Message.parse(data=data)
+        info = {
+            'sender': msg.sender,
+            'receiver': msg.receiver,
+            'time': msg.time,
+        }
+        msg_type = msg.type
+        if msg_type is not None and msg_type > 0:
+            info['type'] = msg_type
+        group = msg.group
+        if group is not None:
+            info['group'] = group
+        content = msg.content
+        if content.startswith(b'{'):
+            info['data'] = utf8_decode(data=content)
+        else:
+            info['data'] = base64_encode(data=content)
+        info['signature'] = base64_encode(data=msg.signature)
+        key = msg.key
+        if key is not None and len(key) > 5:
+            if key[:5] == b'KEYS:':
+                info['keys'] = parse_keys(data=key[5:])
+            else:
+                info['key'] = base64_encode(data=key)
+        for name, value in [('meta', msg.meta), ('visa', msg.visa)]:
+            if value is not None and len(value) > 0:
+                info[name] = json_decode(string=utf8_decode(data=value))
+        return ReliableMessage.parse(msg=info)
+
+
+def run_coroutine(coro):
+    """ run coroutine which never suspends, without event loop overhead """
+    try:
+        coro.send(None)
+    except StopIteration as result:
+        return result.value
+    raise AssertionError('coroutine suspended')
+
+
+class FakeTwins:
+    """ facebook & messenger for packer """
+    pass
+
+
+class BenchPacker(ServerPacker):
+    """ packer without messenger & session, so the format is always JsON """
+
+    @property  # Override
+    def session(self) -> Optional[ServerSession]:
+        return None
+
+
+def create_message(group: bool) -> ReliableMessage:
+    info = {
+        'sender': 'moky@4DnqXWdTV8wuZgfqSCX9GjE2kNq7HJrUgQ',
+        'receiver': 'hulk@4YeVEN3aUnvC1DNUufCq1bs9zoBSJTzVEj',
+        'time': int(time.time()),
+        'type': 1,
+        'data': base64_encode(data=bytes(range(256)) * 2),
+        'signature': base64_encode(data=bytes(range(256))),
+        'meta': {
+            'type': 1,
+            'key': {
+                'algorithm': 'RSA',
+                'data': '-----BEGIN PUBLIC KEY-----\n%s\n-----END PUBLIC KEY-----' % ('A' * 216),
+            },
+            'seed': 'moky',
+            'fingerprint': base64_encode(data=bytes(range(128))),
+        },
+    }
+    if group:
+        info['receiver'] = 'everyone@everywhere'
+        info['group'] = 'Group-1280719982@7oMeWadRw4qat2sL4mTdcQSDAqZSo7LH5G'
+        info['keys'] = {
+            'member%d@4YeVEN3aUnvC1DNUufCq1bs9zoBSJTzVEj' % i: base64_encode(data=bytes(range(128)))
+            for i in range(8)
+        }
+    else:
+        info['key'] = base64_encode(data=bytes(range(128)))
+    return ReliableMessage.parse(msg=info)
+
+
+def bench(name: str, encode, decode, msg: ReliableMessage, count: int):
+    data = encode(msg)
+    start = time.perf_counter()
+    for _ in range(count):
+        data = encode(msg)
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(count):
+        decode(data)
+    decode_time = time.perf_counter() - start
+    print('%8s: %5d bytes, serialize %6.2f us, deserialize %6.2f us, round-trip %6.2f us'
+          % (name, len(data), encode_time * 1e6 / count, decode_time * 1e6 / count,
+             (encode_time + decode_time) * 1e6 / count))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    ExtensionLoader().run()
+    twins = FakeTwins()
+    packer = BenchPacker(facebook=twins, messenger=twins)
+    for group in [False, True]:
+        msg = create_message(group=group)
+        print('%s message, %d rounds:' % ('group' if group else 'personal', count))
+        # check compatibility
+        data = MTPUtils.serialize_message(msg=msg)
+        assert data == LegacyMTPUtils.serialize_message(msg=msg), 'D-MTP codec not compatible'
+        assert MTPUtils.deserialize_message(data=data).dictionary == msg.dictionary, 'D-MTP codec error'
+        bench(name='JsON',
+              encode=lambda m: run_coroutine(packer.serialize_message(msg=m)),
+              decode=lambda d: run_coroutine(packer.deserialize_message(data=d)),
+              msg=msg, count=count)
+        bench(name='D-MTP v0',
+              encode=LegacyMTPUtils.serialize_message, decode=LegacyMTPUtils.deserialize_message,
+              msg=msg, count=count)
+        bench(name='D-MTP',
+              encode=MTPUtils.serialize_message, decode=MTPUtils.deserialize_message,
+              msg=msg, count=count)
+
+
+if __name__ == '__main__':
+    main()
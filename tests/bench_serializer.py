@@ -0,0 +1,176 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2019 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+"""
+    Serializer Benchmark
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Encode & decode realistic documents, commands and device lists with:
+        1. json_encode + utf8_encode (old path);
+        2. each serializer available (json, orjson, msgpack);
+    and read/write JsON files through Storage.
+
+    Usage:
+        ./bench_serializer.py [COUNT]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Any
+
+from dimples import base64_encode
+from dimples import utf8_encode, utf8_decode
+from dimples import json_encode, json_decode
+from dimples.utils import Path
+
+path = Path.abs(path=__file__)
+path = Path.dir(path=path)
+path = Path.dir(path=path)
+Path.add(path=path)
+
+from libs.utils import Runner
+from libs.utils.serializer import Serializers
+from libs.common import ExtensionLoader
+from libs.database import Storage
+
+
+def random_base64(size: int) -> str:
+    return base64_encode(data=os.urandom(size))
+
+
+def create_document() -> dict:
+    identifier = 'moky@4DnqXWdTV8wuZgfqSCX9GjE2kNq7HJrUgQ'
+    data = {
+        'ID': identifier,
+        'name': 'Albert Moky',
+        'avatar': 'https://s3.dim.chat/avatar/%s.jpg' % random_base64(size=12),
+        'key': {
+            'algorithm': 'RSA',
+            'data': '-----BEGIN PUBLIC KEY-----\n%s\n-----END PUBLIC KEY-----' % random_base64(size=162),
+        },
+        'app': {'chat.dim.sechat': {'language': 'en', 'locale': 'en_US'}},
+    }
+    return {
+        'ID': identifier,
+        'type': 'visa',
+        'data': json_encode(obj=data),
+        'signature': random_base64(size=128),
+        'time': time.time(),
+    }
+
+
+def create_command() -> dict:
+    return {
+        'type': 0x88,
+        'sn': 1234567890,
+        'time': time.time(),
+        'command': 'block',
+        'list': ['user%d@4YeVEN3aUnvC1DNUufCq1bs9zoBSJTzVEj' % i for i in range(100)],
+    }
+
+
+def create_devices() -> list:
+    now = time.time()
+    return [{
+        'device_token': os.urandom(32).hex(),
+        'topic': 'chat.dim.sechat',
+        'sandbox': False,
+        'time': now,
+        'model': 'iPhone',
+        'platform': 'iOS',
+        'system': 'iOS 16.3',
+    } for _ in range(4)]
+
+
+def old_encode(obj: Any) -> bytes:
+    return utf8_encode(string=json_encode(obj=obj))
+
+
+def old_decode(data: bytes) -> Any:
+    return json_decode(string=utf8_decode(data=data))
+
+
+def bench(name: str, encode: Callable, decode: Callable, obj: Any, count: int):
+    data = encode(obj)
+    assert decode(data) == obj, 'serializer error: %s' % name
+    start = time.perf_counter()
+    for _ in range(count):
+        encode(obj)
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(count):
+        decode(data)
+    decode_time = time.perf_counter() - start
+    print('%16s: %5d bytes, encode %6.2f us, decode %6.2f us'
+          % (name, len(data), encode_time * 1e6 / count, decode_time * 1e6 / count))
+
+
+async def bench_storage(obj: Any, count: int):
+    directory = tempfile.mkdtemp(prefix='dim_bench_')
+    filename = os.path.join(directory, 'test.js')
+    for name in Serializers.available():
+        serializer = Serializers.get(name=name)
+        if name == Serializers.MSGPACK:
+            continue
+        Serializers.STORAGE = serializer
+        start = time.perf_counter()
+        for _ in range(count):
+            await Storage.write_json(container=obj, path=filename)
+        write_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(count):
+            await Storage.read_json(path=filename)
+        read_time = time.perf_counter() - start
+        assert await Storage.read_json(path=filename) == obj, 'storage error'
+        print('%16s: write %6.2f us, read %6.2f us' % (name, write_time * 1e6 / count, read_time * 1e6 / count))
+    os.remove(filename)
+    os.rmdir(directory)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    ExtensionLoader().run()
+    print('serializers: %s' % Serializers.available())
+    samples = [
+        ('document', create_document()),
+        ('block command', create_command()),
+        ('devices', create_devices()),
+    ]
+    for title, obj in samples:
+        print('%s, %d rounds:' % (title, count))
+        bench(name='json_encode', encode=old_encode, decode=old_decode, obj=obj, count=count)
+        for name in Serializers.available():
+            serializer = Serializers.get(name=name)
+            bench(name=name, encode=serializer.encode, decode=serializer.decode, obj=obj, count=count)
+    title, obj = samples[0]
+    print('Storage (%s), %d rounds:' % (title, count // 10))
+    Runner.sync_run(main=bench_storage(obj=obj, count=count // 10))
+
+
+if __name__ == '__main__':
+    main()
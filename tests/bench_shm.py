@@ -0,0 +1,135 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2019 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+
+"""
+    Shared Memory Benchmark
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    Compare queue throughput of the SysV shared memory accessed with one
+    syscall per byte/slice (old) and through memoryview (new)
+
+    Usage:
+        ./bench_shm.py [MEGABYTES]
+"""
+
+import sys
+import time
+from typing import Optional, Union
+
+import sysv_ipc
+
+from ipx import GiantQueue
+from ipx import SharedMemory
+
+from dimples.utils import Path
+
+path = Path.abs(path=__file__)
+path = Path.dir(path=path)
+path = Path.dir(path=path)
+Path.add(path=path)
+
+from libs.utils.sysv import SysvSharedMemory
+from libs.utils.sysv import create_shared_memory
+
+
+SHM_SIZE = 1 << 16
+
+
+class SyscallSharedMemory(SharedMemory):
+    """ shared memory before memoryview """
+
+    def __init__(self, size: int, key: int):
+        super().__init__()
+        self.__shm = create_shared_memory(size=size, key=key)
+
+    @property
+    def size(self) -> int:
+        return self.__shm.size
+
+    def detach(self):
+        self.__shm.detach()
+
+    def destroy(self):
+        self.__shm.remove()
+
+    def get_byte(self, index: int) -> int:
+        data = self.__shm.read(1, offset=index)
+        return data[0]
+
+    def get_bytes(self, start: int = 0, end: int = None) -> Optional[bytes]:
+        if end is None:
+            end = self.size
+        if 0 <= start < end <= self.size:
+            return self.__shm.read(end - start, offset=start)
+
+    def set_byte(self, index: int, value: int):
+        data = bytearray(1)
+        data[0] = value
+        self.__shm.write(data, offset=index)
+
+    def update(self, index: int, source: Union[bytes, bytearray], start: int = 0, end: int = None):
+        src_len = len(source)
+        if end is None:
+            end = src_len
+        if start < end:
+            if 0 < start or end < src_len:
+                source = source[start:end]
+            self.__shm.write(source, offset=index)
+
+
+def bench(clazz, key: int, payload: int, total: int):
+    # remove segment left by last run
+    try:
+        sysv_ipc.remove_shared_memory(sysv_ipc.SharedMemory(key=key).id)
+    except sysv_ipc.ExistentialError:
+        pass
+    shm = clazz(size=SHM_SIZE, key=key)
+    queue = GiantQueue(memory=shm)
+    data = bytes(range(256)) * (payload // 256 + 1)
+    data = data[:payload]
+    count = total // payload
+    start = time.perf_counter()
+    for _ in range(count):
+        # push one & shift one, as the receiver keeps up with the sender
+        assert queue.push(data=data), 'failed to push'
+        assert queue.shift() == data, 'data error'
+    elapsed = time.perf_counter() - start
+    shm.destroy()
+    print('%20s: payload %6d bytes, %7d objects, %8.2f MB/s, %8.0f objects/s'
+          % (clazz.__name__, payload, count, count * payload / elapsed / 1024 / 1024, count / elapsed))
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    total = megabytes * 1024 * 1024
+    for payload in [128, 1024, 16384]:
+        bench(clazz=SyscallSharedMemory, key=0xD13509D1, payload=payload, total=total)
+        bench(clazz=SysvSharedMemory, key=0xD13509D2, payload=payload, total=total)
+
+
+if __name__ == '__main__':
+    main()
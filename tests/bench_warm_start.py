@@ -0,0 +1,162 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# MIT License
+#
+# Copyright (c) 2019 Albert Moky
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# ==============================================================================
+
+"""
+    Warm-start Benchmark
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Time-to-steady-state after restarted: all users reconnect at once,
+    and the station loads devices & block/mute lists for each of them,
+    compare:
+        1. cold start, empty memory pools (load from local storage);
+        2. warm start, memory pools reloaded from cache snapshot.
+
+    Usage:
+        ./bench_warm_start.py [COUNT]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+from dimples import ID, BlockCommand, MuteCommand
+from dimples.utils import Path
+
+path = Path.abs(path=__file__)
+path = Path.dir(path=path)
+path = Path.dir(path=path)
+Path.add(path=path)
+
+from libs.utils import Runner
+from libs.utils import Config
+from libs.utils.cache import MemoryCacheManager
+from libs.common import ExtensionLoader
+from libs.database import DeviceInfo, CacheSnapshot
+from libs.database.t_device import DeviceTable
+from libs.database.t_user import UserTable
+
+
+# concurrent logins
+BATCH = 256
+
+
+async def create_config() -> Config:
+    root = tempfile.mkdtemp(prefix='dim_bench_')
+    config_path = '%s/config.ini' % root
+    with open(config_path, 'w') as file:
+        file.write('[database]\nroot = %s\npublic = %s/public\nprotected = %s/protected\nprivate = %s/private\n'
+                   % (root, root, root, root))
+        file.write('[memory]\nsnapshot = %s/cache.snapshot\nsnapshot_max_items = 1000000\n' % root)
+    config = Config()
+    await config.load(path=config_path)
+    return config
+
+
+async def create_users(devices: DeviceTable, users: UserTable, count: int) -> List[ID]:
+    array = []
+    for i in range(count):
+        user = ID.parse(identifier='user%d@4DnqXWdTV8wuZgfqSCX9GjE2kNq7HJrUgQ' % i)
+        array.append(user)
+        info = DeviceInfo(info={'device_token': '%064x' % i, 'topic': 'chat.dim.sechat', 'platform': 'iOS'})
+        await devices.save_devices(devices=[info], identifier=user)
+        if i % 2 == 0:
+            # half of the users have block-list & mute-list
+            cmd = BlockCommand(content={'type': 0x88, 'command': 'block', 'list': ['spammer@anywhere']})
+            await users.save_block_command(content=cmd, identifier=user)
+            cmd = MuteCommand(content={'type': 0x88, 'command': 'mute', 'list': ['noisy@anywhere']})
+            await users.save_mute_command(content=cmd, identifier=user)
+    return array
+
+
+def clear_pools():
+    """ restarted """
+    for pool in MemoryCacheManager().all_pools().values():
+        for key in pool.all_keys():
+            pool.erase(key=key)
+
+
+async def reconnect(devices: DeviceTable, users: UserTable, identifiers: List[ID]) -> (float, List[float]):
+    """ login all users, return (time to steady state, latencies) """
+
+    async def login(user: ID) -> float:
+        begin = time.perf_counter()
+        await devices.get_devices(identifier=user)
+        await users.get_block_command(identifier=user)
+        await users.get_mute_command(identifier=user)
+        return time.perf_counter() - begin
+
+    latencies = []
+    start = time.perf_counter()
+    for i in range(0, len(identifiers), BATCH):
+        latencies.extend(await asyncio.gather(*[login(user=user) for user in identifiers[i:i + BATCH]]))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def show(title: str, elapsed: float, latencies: List[float]):
+    count = len(latencies)
+    p50 = latencies[count // 2]
+    p99 = latencies[min(count - 1, count * 99 // 100)]
+    print('%24s: steady in %.3fs, login p50 %.1f us, p99 %.1f us'
+          % (title, elapsed, p50 * 1000000, p99 * 1000000))
+
+
+async def async_main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    config = await create_config()
+    snapshot = CacheSnapshot()
+    snapshot.load(config=config)  # no snapshot yet, only options loaded
+    devices = DeviceTable(config=config)
+    users = UserTable(config=config)
+    print('creating %d users...' % count)
+    identifiers = await create_users(devices=devices, users=users, count=count)
+    # 1. cold start
+    clear_pools()
+    elapsed, latencies = await reconnect(devices=devices, users=users, identifiers=identifiers)
+    show(title='cold start', elapsed=elapsed, latencies=latencies)
+    # 2. warm start
+    start = time.perf_counter()
+    snapshot.save()
+    save_time = time.perf_counter() - start
+    size = os.path.getsize(snapshot.path)
+    clear_pools()
+    start = time.perf_counter()
+    snapshot.load(config=config)
+    load_time = time.perf_counter() - start
+    elapsed, latencies = await reconnect(devices=devices, users=users, identifiers=identifiers)
+    show(title='warm start (snapshot)', elapsed=elapsed, latencies=latencies)
+    print('%24s: write %.3fs, map %.3fs, %.1f MB' % ('snapshot', save_time, load_time, size / 1024.0 / 1024.0))
+
+
+def main():
+    ExtensionLoader().run()
+    Runner.sync_run(main=async_main())
+
+
+if __name__ == '__main__':
+    main()
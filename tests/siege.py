@@ -42,7 +42,7 @@ from dimples import EntityType, ID
 from dimples import Station
 from dimples.common import SessionDBI
 
-from dimples.utils import Path
+from dimples.utils import Path, File
 
 path = Path.abs(path=__file__)
 path = Path.dir(path=path)
@@ -52,6 +52,7 @@ Path.add(path=path)
 from libs.utils import Log, Logging
 from libs.utils import Runner
 from libs.utils import Config
+from libs.utils.mtp import Compressor
 from libs.database import Storage
 from libs.client import Terminal
 from libs.client import ClientFacebook
@@ -64,6 +65,10 @@ class Soldier(Terminal, Logging):
 
     ATTACK_DURATION = 32
 
+    # options for sending: '--mtp', '--compress'
+    MTP_FORMAT = ClientPacker.MTP_JSON
+    COMPRESSION: Optional[str] = None
+
     def __init__(self, facebook: ClientFacebook, database: SessionDBI):
         super().__init__(facebook=facebook, database=database)
         self.__user: Optional[ID] = None
@@ -97,7 +102,11 @@ class Soldier(Terminal, Logging):
 
     # Override
     def _create_packer(self, facebook: ClientFacebook, messenger: ClientMessenger) -> ClientPacker:
-        return ClientPacker(facebook=facebook, messenger=messenger)
+        packer = ClientPacker(facebook=facebook, messenger=messenger)
+        packer.mtp_format = self.MTP_FORMAT
+        packer.compression = self.COMPRESSION
+        packer.compress_dict = Compressor.dictionary_id() != 0
+        return packer
 
     # Override
     def _create_processor(self, facebook: ClientFacebook, messenger: ClientMessenger) -> ClientProcessor:
@@ -283,13 +292,18 @@ def show_help(app_name: str, default_config: str):
     print('    %s' % app_name)
     print('')
     print('usages:')
-    print('    %s [--config=<FILE>]' % cmd)
+    print('    %s [--config=<FILE>] [--mtp=json|dmtp] [--compress=zlib|zstd] [--dict=<FILE>]' % cmd)
     print('    %s [-h|--help]' % cmd)
     print('')
     print('optional arguments:')
     print('    --config        config file path (default: "%s")' % default_config)
+    print('    --mtp           message format for sending (default: "json")')
+    print('    --compress      compress messages larger than %d bytes' % Compressor.THRESHOLD)
+    print('    --dict          shared dictionary for compression (same as the station)')
     print('    --help, -h      show this help message and exit')
     print('')
+    print('bandwidth & CPU for each option can be compared with "mtp stats" on the station.')
+    print('')
 
 
 async def create_config(app_name: str, default_config: str) -> Config:
@@ -297,7 +311,7 @@ async def create_config(app_name: str, default_config: str) -> Config:
     try:
         opts, args = getopt.getopt(args=sys.argv[1:],
                                    shortopts='hf:',
-                                   longopts=['help', 'config='])
+                                   longopts=['help', 'config=', 'mtp=', 'compress=', 'dict='])
     except getopt.GetoptError:
         show_help(app_name=app_name, default_config=default_config)
         sys.exit(1)
@@ -306,6 +320,13 @@ async def create_config(app_name: str, default_config: str) -> Config:
     for opt, arg in opts:
         if opt == '--config':
             ini_file = arg
+        elif opt == '--mtp' and arg in ['json', 'dmtp']:
+            Soldier.MTP_FORMAT = ClientPacker.MTP_DMTP if arg == 'dmtp' else ClientPacker.MTP_JSON
+        elif opt == '--compress' and arg in Compressor.algorithms():
+            Soldier.COMPRESSION = arg
+        elif opt == '--dict':
+            data = await File(path=arg).read()
+            Compressor.set_dictionary(data=data)
         else:
             show_help(app_name=app_name, default_config=default_config)
             sys.exit(0)